@@ -25,6 +25,7 @@ try:
         Session, ReleaseReference, AreaReference, MetricReference, ReleaseCategory
     )
     from __app__.data_registration import set_file_releaseid
+    from __app__.utilities.schema import coerce_schema, validate_schema
 except ImportError:
     from storage import StorageClient
     from db_etl.processors.rolling import change_by_sum
@@ -36,6 +37,7 @@ except ImportError:
         deploy_preprocessed_long, get_partition_id, create_partition, trim_sides
     )
     from data_registration import set_file_releaseid
+    from utilities.schema import coerce_schema, validate_schema
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -64,7 +66,7 @@ class Payload(NamedTuple):
 
 def get_data(path: str, fp):
     with StorageClient(container="rawdbdata", path=path) as cli:
-        cli.download().readinto(fp)
+        cli.download_to(fp)
 
     fp.seek(0)
 
@@ -74,7 +76,7 @@ def get_dataset(payload: Payload) -> DataFrame:
         get_data(payload.data_path, fp)
         result = read_parquet(fp)
 
-    return result
+    return coerce_schema(result)
 
 
 def get_release_id(datestamp: datetime, process_name: str) -> Tuple[int, datetime]:
@@ -170,6 +172,8 @@ def process(data: DataFrame) -> DataFrame:
             var_name="metric",
             value_name="payload"
         )
+        .pipe(coerce_schema)
+        .pipe(validate_schema, stage="melt")
     )
 
     if not data.areaType.str.contains("msoa").all():
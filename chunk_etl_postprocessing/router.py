@@ -8,9 +8,10 @@ from typing import Dict, Callable, Union, Any
 # 3rd party:
 
 # Internal:
-from .vaccinations import process_vaccinations
-from .testing import process_testing
-from .timestamp_boxplots import process as process_boxplots
+try:
+    from __app__.lazy_handlers import HandlerRegistry, LazyHandler
+except ImportError:
+    from lazy_handlers import HandlerRegistry, LazyHandler
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -22,12 +23,27 @@ ProcessorType = Dict[str, Callable[[Dict[str, Any]], str]]
 HandlerType = Union[ProcessorType, Dict[str, ProcessorType]]
 
 
+# Handlers are imported on first dispatch.
+handlers = HandlerRegistry(__package__, {
+    "boxplots": LazyHandler(
+        ".timestamp_boxplots", "process",
+        dependencies=["pandas", "matplotlib.figure", "sqlalchemy"]
+    ),
+    "vaccination": LazyHandler(
+        ".vaccinations", "process_vaccinations",
+        dependencies=["pandas", "sqlalchemy"]
+    ),
+    # "tests": LazyHandler(".testing", "process_testing")  # ToDo: Deprecated - to be removed.
+})
+
+handlers.warm_up()
+
+
 def main(payload):
     # ToDo: This needs to be implemented as a piping process.
 
-    handlers: HandlerType = {
-        "vaccination": process_vaccinations,
-        # "tests": process_testing  # ToDo: Deprecated - to be removed.
+    processors: HandlerType = {
+        "vaccination": handlers["vaccination"],
     }
 
     category = payload["category"]
@@ -36,14 +52,14 @@ def main(payload):
     logging.info(f"Chunk postprocessor triggered for: '{category}:{subcategory}'.")
 
     try:
-        process_boxplots(payload)
+        handlers["boxplots"](payload)
     except Exception as err:
         logging.error(err)
         logging.info(f"FAILED: Unable to create boxplot for category {category}.")
 
     handler = None
-    if category in handlers:
-        handler = handlers[category]
+    if category in processors:
+        handler = processors[category]
 
     if isinstance(handler, dict) and subcategory in handler:
         handler = handler[subcategory]
@@ -14,21 +14,27 @@ Contributors:  Pouria Hadjibagheri
 # Python:
 from io import BytesIO
 from datetime import datetime
+from functools import lru_cache
+from threading import Lock
+from typing import Union
 import re
 
 # 3rd party:
-from matplotlib.pyplot import subplots, close
+from matplotlib.figure import Figure
 from sqlalchemy import text
-from pandas import DataFrame
 
 # Internal:
 try:
-    from chunk_etl_postprocessing.timestamp_boxplots.queries import CATEGORY_TIMESTAMPS
+    from chunk_etl_postprocessing.timestamp_boxplots.queries import (
+        UPDATE_SUMMARY, CLAIM_RENDER, RELEASE_RENDER
+    )
     from __app__.db_tables.covid19 import Session
     from __app__.storage import StorageClient
     from __app__.utilities.data_files import category_label
 except ImportError:
-    from chunk_etl_postprocessing.timestamp_boxplots.queries import CATEGORY_TIMESTAMPS
+    from chunk_etl_postprocessing.timestamp_boxplots.queries import (
+        UPDATE_SUMMARY, CLAIM_RENDER, RELEASE_RENDER
+    )
     from db_tables.covid19 import Session
     from storage import StorageClient
     from utilities.data_files import category_label
@@ -46,6 +52,11 @@ __all__ = [
 ]
 
 
+# Figures are not thread-safe - the template is
+# shared by all renders in the process.
+render_lock = Lock()
+
+
 def to_mins(timestamp: datetime):
     """
     Calculates n minutes from midnight.
@@ -68,28 +79,92 @@ def store_graph(data: BytesIO, category, timestamp):
     return True
 
 
-def get_data(category: str, timestamp):
-    query = text(CATEGORY_TIMESTAMPS)
-
+def execute(query: str, **params):
     session = Session()
     conn = session.connection()
     try:
-        resp = conn.execute(query, category=category, timestamp=timestamp)
-        raw_data = resp.fetchall()
+        resp = conn.execute(text(query), **params)
+        raw_data = resp.fetchall() if resp.returns_rows else None
     except Exception as err:
         session.rollback()
         raise err
     finally:
         session.close()
 
-    df = DataFrame(raw_data, columns=['timestamp'])
+    return raw_data
 
-    df.timestamp = (
-        df
-        .timestamp.map(to_mins)
-        .astype({"timestamp": int})
-    )
-    return df
+
+def claim_summary(category: str, timestamp: datetime) -> Union[dict, None]:
+    """
+    Brings the release timing summary of the category up to date,
+    and claims the rendering of its graph for the release.
+
+    Returns
+    -------
+    Union[dict, None]
+        Statistics of the boxplot, or ``None`` if the graph has already
+        been rendered for the release or there are no earlier releases.
+    """
+    execute(UPDATE_SUMMARY, category=category, timestamp=timestamp)
+
+    raw_data = execute(CLAIM_RENDER, category=category, timestamp=timestamp)
+
+    if not raw_data:
+        return None
+
+    (q1, median, q3, whislo, whishi, fliers), = raw_data
+
+    return dict(q1=q1, med=median, q3=q3, whislo=whislo, whishi=whishi, fliers=fliers)
+
+
+@lru_cache(maxsize=1)
+def get_template():
+    fig = Figure(figsize=[4, .5])
+    ax = fig.subplots()
+
+    return fig, ax
+
+
+def render(stats: dict, ts_num: int) -> BytesIO:
+    colour = "g"
+    if ts_num > stats["q3"]:
+        colour = "r"
+
+    with render_lock:
+        fig, ax = get_template()
+        ax.clear()
+
+        bax = ax.bxp(
+            [stats],
+            vert=False,
+            widths=[.06],
+            patch_artist=True,
+            flierprops=dict(marker='.', markersize=1),
+            boxprops=dict(linewidth=1),
+            medianprops=dict(lw=2, c='w'),
+        )
+        ax.scatter([ts_num], [1], marker="o", s=60, c=colour, zorder=40, edgecolors='w')
+        ax.set_ylim([.95, 1.05])
+        ax.axis('off')
+
+        for cap in bax['caps']:
+            cap.set_ydata(cap.get_ydata() + (-.015, +.015))
+
+        for box in bax['boxes']:
+            box.set_facecolor('k')
+
+        fp = BytesIO()
+        fig.savefig(
+            fp,
+            format='png',
+            dpi=150,
+            transparent=True,
+            pil_kwargs={'progressive': True}
+        )
+
+    fp.seek(0)
+
+    return fp
 
 
 def process(payload):
@@ -99,46 +174,20 @@ def process(payload):
     if category is None:
         return f"Nothing to process: {payload['timestamp']}"
 
-    ts_num = to_mins(datetime.fromisoformat(payload["timestamp"]))
-    df = get_data(category, datetime.fromisoformat(payload["timestamp"]))
-
-    colour = "g"
-    if ts_num > df.loc[:, "timestamp"].quantile(0.75):
-        colour = "r"
+    timestamp = datetime.fromisoformat(payload["timestamp"])
 
-    fig, ax = subplots(figsize=[4, .5])
-    bax = ax.boxplot(
-        df.timestamp,
-        vert=False,
-        widths=[.06],
-        patch_artist=True,
-        flierprops=dict(marker='.', markersize=1),
-        boxprops=dict(linewidth=1),
-        medianprops=dict(lw=2, c='w'),
-    )
-    ax.scatter([ts_num], [1], marker="o", s=60, c=colour, zorder=40, edgecolors='w')
-    ax.set_ylim([.95, 1.05])
-    ax.axis('off')
-
-    for cap in bax['caps']:
-        cap.set_ydata(cap.get_ydata() + (-.015, +.015))
-
-    for box in bax['boxes']:
-        box.set_facecolor('k')
-
-    fp = BytesIO()
-    fig.savefig(
-        fp,
-        format='png',
-        dpi=150,
-        transparent=True,
-        pil_kwargs={'progressive': True}
-    )
-    fp.seek(0)
+    stats = claim_summary(category, timestamp)
 
-    store_graph(fp, category, payload['timestamp'].split("T")[0])
+    if stats is None:
+        return f"DONE: box already generated {payload['timestamp']}:{category}"
 
-    close(fig)
+    try:
+        fp = render(stats, to_mins(timestamp))
+        store_graph(fp, category, payload['timestamp'].split("T")[0])
+    except Exception as err:
+        # Allows another run to render the graph.
+        execute(RELEASE_RENDER, category=category, timestamp=timestamp)
+        raise err
 
     return f"DONE: box generated {payload['timestamp']}:{category}"
 
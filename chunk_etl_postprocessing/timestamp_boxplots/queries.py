@@ -10,11 +10,90 @@
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-CATEGORY_TIMESTAMPS = """\
-SELECT timestamp
-FROM covid19.release_reference     AS rr
-LEFT JOIN covid19.release_category AS rc ON rc.release_id = rr.id
-WHERE process_name = :category 
-  AND timestamp::DATE < (:timestamp)::DATE \
+# Folds the releases of the category published since the last
+# update into the summary, and recalculates the statistics as
+# defined by matplotlib (quartiles with linear interpolation, and
+# whiskers at 1.5 IQR). Does nothing when there are no new releases.
+UPDATE_SUMMARY = """\
+WITH previous AS (
+    SELECT release_date, minutes
+    FROM covid19.release_timing_summary
+    WHERE category = :category
+),
+latest AS (
+    SELECT MAX(rr.timestamp::DATE) AS release_date,
+           ARRAY_AGG(
+               (EXTRACT(HOUR FROM rr.timestamp) * 60 + EXTRACT(MINUTE FROM rr.timestamp))::SMALLINT
+               ORDER BY rr.timestamp
+           ) AS minutes
+    FROM covid19.release_reference     AS rr
+      JOIN covid19.release_category    AS rc ON rc.release_id = rr.id
+    WHERE rc.process_name = :category
+      AND rr.timestamp::DATE < (:timestamp)::DATE
+      AND rr.timestamp::DATE > COALESCE((SELECT release_date FROM previous), '-infinity'::DATE)
+    HAVING COUNT(*) > 0
+),
+combined AS (
+    SELECT latest.release_date,
+           COALESCE((SELECT minutes FROM previous), '{}'::SMALLINT[]) || latest.minutes AS minutes
+    FROM latest
+),
+quartiles AS (
+    SELECT PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY value) AS q1,
+           PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY value)  AS median,
+           PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY value) AS q3
+    FROM combined, UNNEST(combined.minutes) AS value
+),
+whiskers AS (
+    SELECT LEAST(MIN(value) FILTER (WHERE value >= q1 - 1.5 * (q3 - q1)), MAX(q1))    AS whislo,
+           GREATEST(MAX(value) FILTER (WHERE value <= q3 + 1.5 * (q3 - q1)), MAX(q3)) AS whishi
+    FROM combined, UNNEST(combined.minutes) AS value, quartiles
+)
+INSERT INTO covid19.release_timing_summary (
+    category, release_date, minutes, q1, median, q3, whislo, whishi, fliers
+)
+SELECT :category,
+       combined.release_date,
+       combined.minutes,
+       quartiles.q1,
+       quartiles.median,
+       quartiles.q3,
+       whiskers.whislo,
+       whiskers.whishi,
+       ARRAY(
+           SELECT value
+           FROM UNNEST(combined.minutes) AS value
+           WHERE value < whiskers.whislo 
+              OR value > whiskers.whishi
+           ORDER BY value
+       )
+FROM combined, quartiles, whiskers
+ON CONFLICT (category) DO UPDATE
+SET release_date = EXCLUDED.release_date,
+    minutes      = EXCLUDED.minutes,
+    q1           = EXCLUDED.q1,
+    median       = EXCLUDED.median,
+    q3           = EXCLUDED.q3,
+    whislo       = EXCLUDED.whislo,
+    whishi       = EXCLUDED.whishi,
+    fliers       = EXCLUDED.fliers;\
 """
 
+
+# Claims the rendering of the graph for the release. Returns
+# nothing if the graph has already been claimed by another run.
+CLAIM_RENDER = """\
+UPDATE covid19.release_timing_summary
+SET rendered = (:timestamp)::TIMESTAMP
+WHERE category = :category
+  AND rendered IS DISTINCT FROM (:timestamp)::TIMESTAMP
+RETURNING q1, median, q3, whislo, whishi, fliers;\
+"""
+
+
+RELEASE_RENDER = """\
+UPDATE covid19.release_timing_summary
+SET rendered = NULL
+WHERE category = :category
+  AND rendered = (:timestamp)::TIMESTAMP;\
+"""
@@ -13,15 +13,17 @@ from sqlalchemy import text
 # Internal:
 try:
     from __app__.db_tables.covid19 import Session
-    from __app__.db_etl_upload import generate_row_hash, to_sql
+    from __app__.db_etl_upload import generate_row_hash, record_upserts
     from .queries import (
-        PUBLISH_DATE_CALCULATION, PERCENTAGE_DATA, PREVIOUS_PUBLICATION_DATE
+        PUBLISH_DATE_CALCULATION, PERCENTAGE_DATA, PREVIOUS_PUBLICATION_DATE,
+        DERIVED_ROWS, DERIVED_KEYS, INSERT_DERIVED
     )
 except ImportError:
     from db_tables.covid19 import Session
-    from db_etl_upload import generate_row_hash, to_sql
+    from db_etl_upload import generate_row_hash, record_upserts
     from chunk_etl_postprocessing.vaccinations.queries import (
-        PUBLISH_DATE_CALCULATION, PERCENTAGE_DATA, PREVIOUS_PUBLICATION_DATE
+        PUBLISH_DATE_CALCULATION, PERCENTAGE_DATA, PREVIOUS_PUBLICATION_DATE,
+        DERIVED_ROWS, DERIVED_KEYS, INSERT_DERIVED
     )
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -31,6 +33,9 @@ __all__ = [
 ]
 
 
+AREA_TYPES = ["utla", "ltla"]
+
+
 def get_previous_partition_date():
     session = Session()
     conn = session.connection()
@@ -46,76 +51,97 @@ def get_previous_partition_date():
     return f"{data[0]:%Y_%-m_%-d}"
 
 
-def derive_publish_date_metrics(timestamp, area_type):
-    query = PUBLISH_DATE_CALCULATION.format(
-        today=f"{timestamp:%Y_%-m_%-d}",
-        yesterday=get_previous_partition_date(),
-        area_type=area_type
-    )
+def get_partition_ids(partition_date: str):
+    return [f"{partition_date}|{area_type}" for area_type in AREA_TYPES]
+
+
+def derive(query: str, **params) -> int:
+    """
+    Derives rows from the release partitions and writes them into the
+    release, within the database.
+
+    The derived rows are materialised once in a temporary table. Only
+    their keys are fetched to generate the row hashes, and the payloads
+    are written from the table by the database.
+
+    Parameters
+    ----------
+    query: str
+        Query for the derived rows.
+
+    **params
+        Parameters of the query.
 
+    Returns
+    -------
+    int
+        Number of rows written.
+    """
     session = Session()
-    conn = session.connection()
     try:
-        resp = conn.execute(text(query), )
+        session.begin()
+        conn = session.connection()
+
+        conn.execute(text(DERIVED_ROWS.format(derived=query)), **params)
+
+        resp = conn.execute(text(DERIVED_KEYS))
         raw_data = resp.fetchall()
+
+        keys = DataFrame(
+            raw_data,
+            columns=['area_id', 'metric_id', 'area_type', 'area_code', 'release_id', 'date']
+        )
+
+        if not keys.size:
+            return 0
+
+        result = conn.execute(
+            text(INSERT_DERIVED),
+            area_ids=keys.area_id.astype(int).tolist(),
+            metric_ids=keys.metric_id.astype(int).tolist(),
+            hashes=generate_row_hash(keys, hash_only=True).tolist()
+        )
+        record_upserts(conn, result)
+
+        session.commit()
     except Exception as err:
         session.rollback()
         raise err
     finally:
         session.close()
 
-    columns = [
-        'partition_id', 'area_id', 'area_type', 'area_code',
-        'metric_id', 'release_id', 'date', 'payload'
-    ]
+    return keys.shape[0]
 
-    to_sql(
-        DataFrame(raw_data, columns=columns)
-        .pipe(lambda dt: dt.assign(hash=generate_row_hash(dt, hash_only=True)))
-        .loc[:, ["metric_id", "area_id", "partition_id", "release_id", "hash", "date", "payload"]]
+
+def derive_publish_date_metrics(timestamp, previous_partition_date):
+    total = derive(
+        PUBLISH_DATE_CALCULATION,
+        partition_ids=get_partition_ids(f"{timestamp:%Y_%-m_%-d}"),
+        previous_partition_ids=get_partition_ids(previous_partition_date)
     )
 
+    logging.info(f"Derived {total} publish date metrics")
+
     return True
 
 
-def derive_publish_date_percentages(timestamp, area_type):
-    query = PERCENTAGE_DATA.format(
-        date=f"{timestamp:%Y_%-m_%-d}",
-        area_type=area_type
+def derive_publish_date_percentages(timestamp):
+    total = derive(
+        PERCENTAGE_DATA,
+        partition_ids=get_partition_ids(f"{timestamp:%Y_%-m_%-d}")
     )
 
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(text(query))
-        raw_data = resp.fetchall()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
-
-    columns = [
-        'area_id', 'partition_id', 'metric_id', 'metric', 'area_type',
-        'area_code', 'release_id', 'date', 'payload'
-    ]
-
-    to_sql(
-        DataFrame(raw_data, columns=columns)
-        .pipe(lambda dt: dt.assign(hash=generate_row_hash(dt, hash_only=True)))
-        .loc[:, ["metric_id", "area_id", "partition_id", "release_id", "hash", "date", "payload"]]
-    )
+    logging.info(f"Derived {total} publish date percentages")
 
     return True
 
 
 def process_vaccinations(payload):
     timestamp = datetime.fromisoformat(payload['timestamp'])
-    area_types = ["utla", "ltla"]
 
-    for area_type in area_types:
-        # derive_publish_date_metrics(timestamp, area_type)  # ToDo: Deprecated - awaiting removal.
-        derive_publish_date_percentages(timestamp, area_type)
+    # previous_partition_date = get_previous_partition_date()
+    # derive_publish_date_metrics(timestamp, previous_partition_date)  # ToDo: Deprecated - awaiting removal.
+    derive_publish_date_percentages(timestamp)
 
     return f"DONE: {payload['timestamp']}"
 
@@ -124,4 +150,3 @@ if __name__ == '__main__':
     process_vaccinations({
         "timestamp": (datetime.utcnow() - timedelta(days=1)).isoformat()
     })
-
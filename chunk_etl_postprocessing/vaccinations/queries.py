@@ -10,12 +10,14 @@
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+# Derived rows for all area types in the partitions. Used as
+# a subquery by ``DERIVED_ROWS``.
 PUBLISH_DATE_CALCULATION = """\
 SELECT df.partition_id,
        df.area_id,
        df.area_type,
        df.area_code,
-       mr.id,
+       mr.id AS metric_id,
        df.release_id,
        df.date,
        df.payload
@@ -50,12 +52,13 @@ FROM (
                MAX(ts.release_id) AS release_id,
                MAX(date) AS date,
                SUM((payload -> 'value')::NUMERIC) AS value
-        FROM covid19.time_series_p{today}_{area_type} AS ts
+        FROM covid19.time_series AS ts
                  JOIN covid19.metric_reference   AS mr ON mr.id = ts.metric_id
                  JOIN covid19.area_reference     AS ar ON ar.id = ts.area_id
                  JOIN covid19.release_reference  AS rr ON rr.id = ts.release_id
                  JOIN covid19.release_category   AS rc ON rc.release_id = rr.id
-        WHERE metric IN (
+        WHERE ts.partition_id = ANY((:partition_ids)::VARCHAR[])
+          AND metric IN (
                 'newPeopleVaccinatedFirstDoseByVaccinationDate', 
                 'newPeopleVaccinatedSecondDoseByVaccinationDate',
                 'newPeopleVaccinatedThirdInjectionByVaccinationDate'
@@ -73,12 +76,13 @@ FROM (
                MAX(ts.release_id) AS release_id,
                MAX(date) AS date,
                SUM((payload -> 'value')::NUMERIC) AS value
-        FROM covid19.time_series_p{yesterday}_{area_type} AS ts
+        FROM covid19.time_series AS ts
                  JOIN covid19.metric_reference   AS mr ON mr.id = ts.metric_id
                  JOIN covid19.area_reference     AS ar ON ar.id = ts.area_id
                  JOIN covid19.release_reference  AS rr ON rr.id = ts.release_id
                  JOIN covid19.release_category   AS rc ON rc.release_id = rr.id
-        WHERE metric IN (
+        WHERE ts.partition_id = ANY((:previous_partition_ids)::VARCHAR[])
+          AND metric IN (
                 'newPeopleVaccinatedFirstDoseByVaccinationDate', 
                 'newPeopleVaccinatedSecondDoseByVaccinationDate',
                 'newPeopleVaccinatedThirdInjectionByVaccinationDate'
@@ -88,10 +92,12 @@ FROM (
         GROUP BY partition_id, area_id, area_type, area_code, metric
     ) AS yesterday ON today.area_id = yesterday.area_id AND today.metric = yesterday.metric
 ) AS df
-LEFT JOIN covid19.metric_reference AS mr ON mr.metric = df.metric;\
+JOIN covid19.metric_reference AS mr ON mr.metric = df.metric\
 """
 
 
+# Derived rows for all area types in the partitions. Used as
+# a subquery by ``DERIVED_ROWS``.
 PERCENTAGE_DATA = """\
 SELECT area_id,
        partition_id,
@@ -117,12 +123,13 @@ FROM (
            MAX(ts.release_id) AS release_id,
            MAX(date) AS date,
            jsonb_build_object('value', ROUND(MAX((payload -> 'value')::NUMERIC), 2)) AS payload
-    FROM covid19.time_series_p{date}_{area_type} AS ts
+    FROM covid19.time_series AS ts
              JOIN covid19.metric_reference   AS mr ON mr.id = ts.metric_id
              JOIN covid19.area_reference     AS ar ON ar.id = ts.area_id
              JOIN covid19.release_reference  AS rr ON rr.id = ts.release_id
              JOIN covid19.release_category   AS rc ON rc.release_id = rr.id
-    WHERE metric IN (
+    WHERE ts.partition_id = ANY((:partition_ids)::VARCHAR[])
+      AND metric IN (
             'cumVaccinationFirstDoseUptakeByVaccinationDatePercentage',
             'cumVaccinationSecondDoseUptakeByVaccinationDatePercentage',
             'cumVaccinationThirdInjectionUptakeByVaccinationDatePercentage'
@@ -131,7 +138,53 @@ FROM (
       AND process_name = 'VACCINATION'
     GROUP BY area_type, area_code, metric_id, area_id
 ) AS df
-LEFT JOIN covid19.metric_reference AS mr ON mr.metric = df.metric;\
+JOIN covid19.metric_reference AS mr ON mr.metric = df.metric\
+"""
+
+
+# Materialises the derived rows, so that the derivation runs once
+# for both ``DERIVED_KEYS`` and ``INSERT_DERIVED``. The table is
+# dropped at the end of the transaction.
+DERIVED_ROWS = """\
+CREATE TEMPORARY TABLE derived_rows ON COMMIT DROP AS
+{derived};\
+"""
+
+
+# Keys of the derived rows - the values from which
+# the row hashes are generated.
+DERIVED_KEYS = """\
+SELECT derived.area_id,
+       derived.metric_id,
+       derived.area_type,
+       derived.area_code,
+       derived.release_id,
+       derived.date
+FROM derived_rows AS derived;\
+"""
+
+
+# Writes the derived rows from one partition into another within
+# the database. Only the keys and the hashes are sent.
+INSERT_DERIVED = """\
+INSERT INTO covid19.time_series (metric_id, area_id, partition_id, release_id, hash, date, payload)
+SELECT derived.metric_id,
+       derived.area_id,
+       derived.partition_id,
+       derived.release_id,
+       hashes.hash,
+       derived.date,
+       derived.payload
+FROM derived_rows AS derived
+  JOIN UNNEST(
+        (:area_ids)::INT[],
+        (:metric_ids)::INT[],
+        (:hashes)::VARCHAR[]
+  ) AS hashes(area_id, metric_id, hash)
+    ON hashes.area_id = derived.area_id
+   AND hashes.metric_id = derived.metric_id
+ON CONFLICT (hash, partition_id) DO UPDATE SET payload = EXCLUDED.payload
+RETURNING release_id, partition_id, xmax = 0 AS inserted;\
 """
 
 
@@ -153,6 +153,22 @@ class Connection:
     async def copy_records_to_table(self, table_name, **kwargs):
         return await self._conn.copy_records_to_table(table_name, **kwargs)
 
+    @trace_async_method_operation(
+        name="_account_name",
+        dep_type="_name",
+        action="connection_copy_from_query"
+    )
+    async def copy_from_query(self, query, *args, **kwargs):
+        return await self._conn.copy_from_query(query, *args, **kwargs)
+
+    @trace_async_method_operation(
+        name="_account_name",
+        dep_type="_name",
+        action="connection_copy_to_table"
+    )
+    async def copy_to_table(self, table_name, **kwargs):
+        return await self._conn.copy_to_table(table_name, **kwargs)
+
     @trace_method_operation(
         name="_account_name",
         dep_type="_name",
@@ -6,6 +6,11 @@
 import logging
 from asyncio import get_event_loop, gather
 from os import getenv
+from struct import unpack_from
+from hashlib import sha256
+from uuid import uuid4
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any
 
 # 3rd party:
 from orjson import dumps
@@ -79,6 +84,174 @@ WHERE pga.attnum > 0
 """
 
 
+# Parts are split at row boundaries once they exceed this many
+# bytes, so each part is a self-contained binary COPY stream.
+PART_SIZE = 16 * 1024 * 1024
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER = COPY_SIGNATURE + b"\x00\x00\x00\x00" + b"\x00\x00\x00\x00"
+COPY_TRAILER = b"\xff\xff"
+
+# Parts of earlier dumps are deleted once they are older than this,
+# so that a restore that is still reading them is not disrupted.
+PART_RETENTION = timedelta(hours=int(getenv("DUMP_PART_RETENTION_HOURS", 2)))
+
+
+class BinaryCopyWriter:
+    """
+    Consumes the output of a binary ``COPY ... TO STDOUT`` and uploads
+    it in parts of roughly ``part_size`` bytes, without holding more
+    than one part in memory.
+
+    Parameters
+    ----------
+    table_name: str
+        Fully qualified name of the table being exported.
+
+    dump_id: str
+        Unique ID of the dump, under which the parts are stored.
+
+    part_size: int
+        Minimum size of each part in bytes. [Default: ``PART_SIZE``]
+    """
+    def __init__(self, table_name: str, dump_id: str, part_size: int = PART_SIZE):
+        self.table_name = table_name
+        self.dump_id = dump_id
+        self.part_size = part_size
+        self.parts: List[Dict[str, Any]] = list()
+        self.row_count = 0
+        self._buffer = bytearray()
+        self._pos = 0
+        self._rows = 0
+        self._header_parsed = False
+        self._complete = False
+
+    @property
+    def prefix(self) -> str:
+        return f"{get_parts_root(self.table_name)}/{self.dump_id}"
+
+    def _parse_header(self) -> bool:
+        # Signature, flags and the length of the header extension area.
+        header_size = len(COPY_SIGNATURE) + 8
+
+        if len(self._buffer) < header_size:
+            return False
+
+        extension_size = unpack_from(">i", self._buffer, header_size - 4)[0]
+
+        if len(self._buffer) < header_size + extension_size:
+            return False
+
+        del self._buffer[:header_size + extension_size]
+        self._header_parsed = True
+
+        return True
+
+    def _next_row(self) -> bool:
+        buffer, pos = self._buffer, self._pos
+
+        if len(buffer) - pos < 2:
+            return False
+
+        n_fields = unpack_from(">h", buffer, pos)[0]
+
+        if n_fields == -1:
+            self._complete = True
+            return False
+
+        pos += 2
+        for _ in range(n_fields):
+            if len(buffer) - pos < 4:
+                return False
+
+            field_size = unpack_from(">i", buffer, pos)[0]
+            pos += 4 + max(field_size, 0)
+
+            if pos > len(buffer):
+                return False
+
+        self._pos = pos
+        self._rows += 1
+
+        return True
+
+    async def _flush(self):
+        if not self._rows:
+            return None
+
+        payload = COPY_HEADER + bytes(self._buffer[:self._pos]) + COPY_TRAILER
+        del self._buffer[:self._pos]
+
+        path = f"{self.prefix}/part-{len(self.parts):05d}.bin"
+
+        self.parts.append({
+            "path": path,
+            "rows": self._rows,
+            "size": len(payload),
+            "checksum": sha256(payload).hexdigest()
+        })
+
+        self.row_count += self._rows
+        self._pos = 0
+        self._rows = 0
+
+        async with AsyncStorageClient(
+                container="migrations",
+                path=path,
+                content_type="application/octet-stream"
+        ) as blob_cli:
+            await blob_cli.upload(payload)
+
+        return None
+
+    async def write(self, chunk: bytes):
+        self._buffer.extend(chunk)
+
+        if not self._header_parsed and not self._parse_header():
+            return None
+
+        while self._next_row():
+            if self._pos >= self.part_size:
+                await self._flush()
+
+    async def close(self):
+        if not self._complete:
+            raise IOError(f"Incomplete COPY stream for '{self.table_name}'")
+
+        await self._flush()
+
+
+def get_parts_root(table_name: str) -> str:
+    return f"parts/{table_name.replace('.', '__')}"
+
+
+def get_dump_id() -> str:
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid4().hex[:8]}"
+
+
+async def remove_expired_parts(table_name: str, current_prefix: str):
+    """
+    Deletes the parts of earlier dumps of the table once they
+    have expired. Parts of the current dump are never deleted.
+    """
+    expiry = datetime.now(timezone.utc) - PART_RETENTION
+    expired = list()
+
+    async with AsyncStorageClient(container="migrations", path=get_parts_root(table_name) + "/") as cli:
+        async for blob in cli.list_blobs():
+            if blob['name'].startswith(current_prefix + "/") or blob['last_modified'] >= expiry:
+                continue
+
+            expired.append(blob['name'])
+
+    for path in expired:
+        async with AsyncStorageClient(container="migrations", path=path) as cli:
+            await cli.delete()
+
+    if expired:
+        logging.info(f">> Deleted {len(expired)} expired parts of '{table_name}'")
+
+
 async def get_data(table_name: str):
     logging.info(f"> Processing '{table_name}'")
 
@@ -98,28 +271,41 @@ async def get_data(table_name: str):
     query = DATA_QUERY.format(
         table_name=table_name,
         columns=str.join(", ", columns)
-    )
+    ).rstrip(";")
+
+    # Parts of each dump are stored under a prefix of their own, as
+    # a restore of the previous manifest may still be reading its parts.
+    writer = BinaryCopyWriter(table_name, get_dump_id())
 
     async with Connection() as conn:
-        data = await conn.fetch(query)
+        await conn.copy_from_query(query, output=writer.write, format="binary")
+
+    await writer.close()
 
-    if not len(data):
+    if not writer.row_count:
+        await remove_expired_parts(table_name, writer.prefix)
         return True
 
-    logging.info(f">> Extracted {len(data)} rows from '{table_name}'")
+    logging.info(f">> Extracted {writer.row_count} rows from '{table_name}'")
 
-    json_data = dumps({
+    manifest = dumps({
         "primary_keys": [item['column_name'] for item in table_struct if item['is_pk']],
         "columns": {row['column_name']: row['data_type'] for row in table_struct},
         "table_name": table_name,
-        "data": list(map(dict, data))
+        "format": "binary",
+        "row_count": writer.row_count,
+        "prefix": writer.prefix,
+        "parts": writer.parts
     })
 
+    # The manifest triggers the loader, so it must be stored last.
     path = f"{table_name.replace('.', '__')}.json"
     async with AsyncStorageClient(container="migrations", path=path) as blob_cli:
-        await blob_cli.upload(json_data.decode())
+        await blob_cli.upload(manifest.decode())
+
+    logging.info(f">> Stored {len(writer.parts)} parts for '{table_name}' in the storage")
 
-    logging.info(f">> Stored data for '{table_name}' in the storage")
+    await remove_expired_parts(table_name, writer.prefix)
 
     return True
 
@@ -6,6 +6,7 @@
 import logging
 from copy import deepcopy
 from datetime import datetime, timedelta
+from functools import lru_cache, partial
 from io import BytesIO
 from json import dumps, loads
 from os import getenv, makedirs
@@ -16,12 +17,22 @@ from typing import Any, Dict, List, NamedTuple, NoReturn, Tuple, Union
 
 # 3rd party:
 from azure.storage.blob import BlobClient, BlobType, ContentSettings, StandardBlobTier
-from pandas import DataFrame, json_normalize, read_csv, read_feather, to_datetime
+from numpy import append, flatnonzero
+from pandas import (
+    CategoricalDtype, DataFrame, json_normalize, read_csv, read_feather, to_datetime
+)
+from pandas.api.types import is_numeric_dtype, pandas_dtype
+from pyarrow import Table, Schema, schema, field, list_, struct, string, float64, from_numpy_dtype
+from pyarrow.ipc import IpcWriteOptions, new_file as new_ipc_file
 
 # Internal
 try:
     from __app__.storage import StorageClient
-    from __app__.utilities import func_logger, get_population_data
+    from __app__.utilities import func_logger, get_population_data, coerce_schema, NUMERIC_COLUMNS
+    from __app__.utilities.chunk_cache import (
+        CacheEntry, RESTAMP_SUFFIX, SKIP_UNCHANGED_UPLOADS,
+        get_chunk_fingerprint, get_cached_chunk, set_cached_chunk
+    )
     from __app__.utilities.generic_types import PopulationData, RawDataPayload
 
     from .db_uploader.chunk_ops import save_chunk_feather, upload_chunk_feather
@@ -37,10 +48,14 @@ try:
         homogenise_demographics_dates,
         match_area_names,
         normalise_demographics_records,
+        normalise_record_keys,
         normalise_records,
+        fill_zeros,
+        fill_forward,
         ratio_to_percentage,
         trim_end,
     )
+    from .plan import Operation, ProcessingPlan
 except ImportError:
     from db_etl.db_uploader.chunk_ops import save_chunk_feather, upload_chunk_feather
     from db_etl.output import produce_json
@@ -55,12 +70,20 @@ except ImportError:
         homogenise_demographics_dates,
         match_area_names,
         normalise_demographics_records,
+        normalise_record_keys,
         normalise_records,
+        fill_zeros,
+        fill_forward,
         ratio_to_percentage,
         trim_end,
     )
+    from db_etl.plan import Operation, ProcessingPlan
     from storage import StorageClient
-    from utilities import func_logger, get_population_data
+    from utilities import func_logger, get_population_data, coerce_schema, NUMERIC_COLUMNS
+    from utilities.chunk_cache import (
+        CacheEntry, RESTAMP_SUFFIX, SKIP_UNCHANGED_UPLOADS,
+        get_chunk_fingerprint, get_cached_chunk, set_cached_chunk
+    )
     from utilities.generic_types import PopulationData, RawDataPayload
 
 
@@ -80,6 +103,26 @@ DEBUG = getenv("DEBUG", False)
 
 RANDOMISE = False
 
+# Number of areas processed at once by `run_demographics`.
+DEMOGRAPHICS_BATCH_SIZE = 20
+
+# Size of the chunks in which processed outputs are read
+# from temporary files and streamed to the storage.
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Columns of the processed output that are not deployed as metrics.
+NON_METRIC_COLUMNS = {
+    "id",
+    "hash",
+    "seriesDate",
+    "areaType",
+    "areaCode",
+    "areaName",
+    "areaNameLower",
+    "date",
+    "releaseTimestamp",
+}
+
 VALUE_COLUMNS = (
     # "unoccupiedOSBeds",  # Deprecated
     # "covidOccupiedOSBeds",  # Deprecated
@@ -958,6 +1001,106 @@ def calculate_cumulative(data: DataFrame, metrics):
     return data
 
 
+# Columns that identify a row in the processed data.
+RECORD_KEYS = ["areaType", "areaCode", "date"]
+
+HASH_COLUMNS = ["id", "hash", "seriesDate"]
+
+
+@lru_cache(maxsize=64)
+def compile_plan(columns: Tuple[str, ...]) -> ProcessingPlan:
+    """
+    Compiles the processing plan for data with the given columns.
+
+    Only the operations that apply to the columns are included. The
+    operations are declared in the order in which the stages must run,
+    and columns derived by a stage are available to the following ones.
+
+    Parameters
+    ----------
+    columns: Tuple[str, ...]
+        Columns of the data, once the keys are normalised.
+
+    Returns
+    -------
+    ProcessingPlan
+    """
+    available = set(columns)
+    operations = list()
+
+    def add(stage, label, func, inputs, outputs, **kwargs):
+        context = kwargs.pop("context", tuple())
+        operations.append(Operation(
+            stage=stage,
+            column=label,
+            func=func,
+            inputs=tuple(inputs),
+            outputs=tuple(outputs),
+            kwargs=kwargs,
+            context=context
+        ))
+        available.update(outputs)
+
+    for col in sorted(available.intersection(FILL_WITH_ZEROS)):
+        add("fill with zeros", col, fill_zeros, [col], [col], column=col)
+
+    for col in sorted(available.intersection(START_WITH_ZERO)):
+        add("fill forward", col, fill_forward, [col], [col], column=col)
+
+    for col in sorted(available.intersection(NEGATIVE_TO_ZERO)):
+        add("negative to zero", col, negative_to_zero, [col], [col])
+
+    for target, pair in DERIVED_BY_SUMMATION.items():
+        if available.issuperset(pair):
+            add("pair summation", target, calculate_pair_summations, pair, [target], **{target: pair})
+
+    for target, source in DERIVED_BY_MAX_OF_ADJACENT_COLUMN.items():
+        if source in available:
+            add(
+                "calculation by adjacent column", target, calculate_by_adjacent_column,
+                [source, target], [target], **{target: source}
+            )
+
+    for col in sorted(available.intersection(ROLLING_RATE)):
+        add(
+            "rolling rate", col, calculate_rates,
+            [col], [f"{col}RollingSum", f"{col}RollingRate"],
+            rolling_rate=[col], context=("population_data",)
+        )
+
+    for col in sorted(available.intersection(INCIDENCE_RATE_FIELDS)):
+        add(
+            "incidence rate", col, calculate_rates,
+            [col], [f"{col}Rate"],
+            incidence_rate=[col], context=("population_data",)
+        )
+
+    for col in sorted(available.intersection(SUM_CHANGE_DIRECTION)):
+        add(
+            "change by rolling sum", col, change_by_sum,
+            [col, f"{col}RollingSum"],
+            [f"{col}RollingSum", f"{col}Change", f"{col}Direction", f"{col}ChangePercentage"],
+            metrics=[col]
+        )
+
+    add("hash calculation", "*", generate_row_hash, [], HASH_COLUMNS, context=("date",))
+
+    for col in sorted(available.intersection(RATIO2PERCENTAGE)):
+        add("ratio to percentage", col, ratio_to_percentage, [col], [col], metrics=[col])
+
+    for col in sorted(available.intersection(TRIM_END["metrics"])):
+        add(
+            "trim end", col, trim_end, [col], [col],
+            metrics=[col], days_to_trim=TRIM_END["days_to_trim"]
+        )
+
+    return ProcessingPlan(
+        keys=RECORD_KEYS,
+        columns=[*HASH_COLUMNS, *columns],
+        operations=operations
+    )
+
+
 @func_logger("main processor")
 def process(
     data: DataFrame,
@@ -968,6 +1111,9 @@ def process(
     """
     Process the data and structure them in a 2D table.
 
+    The stages are run as a plan compiled for the columns
+    of the data - see ``compile_plan``.
+
     Parameters
     ----------
     data: dict
@@ -988,35 +1134,22 @@ def process(
     else:
         dt_pivot = data
 
-    columns = set(dt_pivot.columns)
-
     release_date = payload.timestamp.split("T")[0]
 
-    # These must be done in a specific order.
     dt_pivot = (
-        dt_pivot.pipe(homogenise_dates)
-        .pipe(normalise_records, zero_filled=FILL_WITH_ZEROS, cumulative=START_WITH_ZERO)
-        .pipe(negative_to_zero)
-        .pipe(calculate_pair_summations, **DERIVED_BY_SUMMATION)
-        .pipe(calculate_by_adjacent_column, **DERIVED_BY_MAX_OF_ADJACENT_COLUMN)
-        .pipe(
-            calculate_rates,
-            population_data=population_data,
-            rolling_rate=ROLLING_RATE,
-            incidence_rate=INCIDENCE_RATE_FIELDS,
-        )  # Must be after norm
-        .pipe(change_by_sum, metrics=SUM_CHANGE_DIRECTION)
-        # .pipe(calculate_cumulative, WITH_CUMULATIVE)
-        .pipe(generate_row_hash, date=release_date)
+        dt_pivot
+        .pipe(homogenise_dates)
+        .pipe(normalise_record_keys)
+    )
+
+    plan = compile_plan(tuple(dt_pivot.columns))
+    logging.debug(plan.describe())
+
+    dt_pivot = (
+        plan
+        .run(dt_pivot, population_data=population_data, date=release_date)
         # .pipe(adjust_area_types, replacements=AREA_TYPE_NAMES)
-        .pipe(ratio_to_percentage, metrics=RATIO2PERCENTAGE)
-        .pipe(trim_end, **TRIM_END)
         # .pipe(match_area_names)
-        # .pipe(
-        #     calculate_sex_people_tested,
-        #     population_data=population_data,
-        #     **DERIVED_FROM_NESTED
-        # )
         .assign(releaseTimestamp=payload.timestamp)
         .sort_values(**SORT_OUTPUT_BY)
     )
@@ -1024,6 +1157,73 @@ def process(
     return dt_pivot
 
 
+def get_output_metrics(data: DataFrame) -> List[str]:
+    return [col for col in data.columns if col not in NON_METRIC_COLUMNS]
+
+
+def get_restamp_path(result_path: str) -> str:
+    return result_path.rsplit(".", 1)[0] + RESTAMP_SUFFIX
+
+
+def reuse_cached_chunk(cached: CacheEntry, result_path: str, kws: dict,
+                       restamp: bool = False) -> bool:
+    """
+    Places the processed output of an unchanged chunk where the
+    database upload expects it.
+
+    Parameters
+    ----------
+    cached: CacheEntry
+        Cache entry of the chunk from a previous release.
+
+    result_path: str
+        Path to the processed output of the chunk for this release.
+
+    kws: dict
+        Storage client settings for processed chunks.
+
+    restamp: bool
+        Whether to store a re-stamp marker instead of the output, so
+        the uploader copies the rows from the partition of the
+        previous release rather than uploading them again.
+
+    Returns
+    -------
+    bool
+        ``False`` if the cached output no longer exists, in which
+        case the chunk must be processed.
+    """
+    with StorageClient(**kws, path=cached.output_path) as client:
+        if not client.exists():
+            logging.info(f"Cached output not found: {cached.output_path}")
+            return False
+
+        if restamp or cached.output_path == result_path:
+            data = None
+        else:
+            data = client.download().readall()
+
+    if restamp:
+        marker_path = get_restamp_path(result_path)
+
+        marker_kws = dict(
+            container="pipeline",
+            content_type="application/json; charset=utf-8",
+            cache_control="no-cache, max-age=0, must-revalidate",
+            compressed=False
+        )
+
+        with StorageClient(**marker_kws, path=marker_path) as cli:
+            cli.upload(dumps(cached._asdict()))
+
+    elif data is not None:
+        with StorageClient(**kws, path=result_path) as cli:
+            cli.upload(data)
+
+    return True
+
+
+@func_logger("direct activity")
 def run_direct(payload_dict: dict):
     logging.info(f"run_direct:: {payload_dict}")
     payload = RawDataPayload(**payload_dict["base"])
@@ -1045,29 +1245,54 @@ def run_direct(payload_dict: dict):
     )
 
     # Retrieve data chunk
-    with StorageClient(**kws, path=payload.data_path) as client, TemporaryFile() as fp:
+    with StorageClient(**kws, path=payload.data_path) as client:
         if not client.exists():
             raise RuntimeError(f"Blob not found: {payload.data_path}")
 
-        client.download().readinto(fp)
-        fp.seek(0)
-        data = read_feather(fp)
+        raw_data = client.download().readall()
 
-    # Demographics
-    population_data = get_population_data()
-    logging.info(f"\tLoaded and parsed population data")
+    result_path = f"daily_chunks/{category}/{date}/{area_type}_{area_code}.ft"
 
-    # Process chunk
-    result = process(data, population_data, payload, is_direct=True)
+    fingerprint = get_chunk_fingerprint(raw_data, category, subcategory)
+    cached = get_cached_chunk(category, subcategory, area_type, area_code, fingerprint)
 
-    # Store chunk for deployment to DB
-    result_path = f"daily_chunks/{category}/{date}/{area_type}_{area_code}.ft"
-    with TemporaryFile() as fp:
-        result.reset_index(drop=True).to_feather(fp)
-        fp.seek(0)
+    if cached is not None and reuse_cached_chunk(cached, result_path, kws, SKIP_UNCHANGED_UPLOADS):
+        output_path = cached.output_path if SKIP_UNCHANGED_UPLOADS else result_path
+        set_cached_chunk(
+            category,
+            subcategory,
+            cached._replace(output_path=output_path, timestamp=payload.timestamp)
+        )
 
-        with StorageClient(**kws, path=result_path) as cli:
-            cli.upload(fp.read())
+        # Only the re-stamp marker is stored for the uploader.
+        if SKIP_UNCHANGED_UPLOADS:
+            result_path = get_restamp_path(result_path)
+    else:
+        data = read_feather(BytesIO(raw_data))
+
+        # Demographics
+        population_data = get_population_data()
+        logging.info(f"\tLoaded and parsed population data")
+
+        # Process chunk
+        result = process(data, population_data, payload, is_direct=True)
+
+        # Store chunk for deployment to DB
+        with TemporaryFile() as fp:
+            result.reset_index(drop=True).to_feather(fp)
+            fp.seek(0)
+
+            with StorageClient(**kws, path=result_path) as cli:
+                cli.upload(fp.read())
+
+        set_cached_chunk(category, subcategory, CacheEntry(
+            fingerprint=fingerprint,
+            output_path=result_path,
+            timestamp=payload.timestamp,
+            area_type=area_type,
+            area_code=area_code,
+            metrics=get_output_metrics(result)
+        ))
 
     response_payload = {
         "path": result_path,
@@ -1084,6 +1309,7 @@ def run_direct(payload_dict: dict):
     return response_payload
 
 
+@func_logger("direct MSOA activity")
 def run_direct_msoas(payload_dict: dict):
     logging.info(f"run_direct:: {payload_dict}")
     payload = RawDataPayload(**payload_dict["base"])
@@ -1143,6 +1369,7 @@ def run_direct_msoas(payload_dict: dict):
     return response_payload
 
 
+@lru_cache(maxsize=1)
 def get_prepped_age_breakdown_population():
     path = CURRENT_PATH.joinpath(
         "assets", "prepped_demographics_population.csv"
@@ -1151,6 +1378,26 @@ def get_prepped_age_breakdown_population():
     return read_csv(path, index_col=["areaCode", "age"])
 
 
+@lru_cache(maxsize=4)
+def get_demographics_categories(nesting_param: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    Categories of the dimensions of demographic metrics, as declared
+    by the area types and the age breakdown population reference, so
+    that every chunk and batch shares the same dtypes.
+    """
+    population = get_prepped_age_breakdown_population().index
+
+    categories = {
+        "areaType": tuple(CATEGORY_LABELS),
+        "areaCode": tuple(population.unique(level="areaCode")),
+    }
+
+    if nesting_param == "age":
+        categories["age"] = tuple(population.unique(level="age"))
+
+    return categories
+
+
 def metric_specific_processes(df, base_metric, db_payload_metric):
     if base_metric is None:
         return df
@@ -1178,15 +1425,84 @@ def metric_specific_processes(df, base_metric, db_payload_metric):
         df.date <= cutoff_date, :
     ]  # Drop the last 5 days (event date data)
 
-    # Convert non-decimal columns to integer type
-    # to prevent `.0` in JSON payloads.
-    df.loc[:, [db_payload_metric, "rollingSum"]] = df.loc[
-        :, [db_payload_metric, "rollingSum"]
-    ].astype("Int64")
+    # Convert non-decimal columns to their declared integer
+    # type to prevent `.0` in JSON payloads.
+    return coerce_schema(df, [db_payload_metric, "rollingSum"])
+
+
+def iter_area_batches(data: DataFrame, batch_size: int = DEMOGRAPHICS_BATCH_SIZE):
+    """
+    Yields the data for up to ``batch_size`` areas at a time, with
+    categorical columns converted back to objects for processing.
+    """
+    area_codes = data.areaCode.dropna().unique().tolist()
+
+    categorical = {
+        col: object
+        for col, dtype in data.dtypes.items()
+        if isinstance(dtype, CategoricalDtype)
+    }
+
+    for index in range(0, len(area_codes), batch_size):
+        codes = area_codes[index: index + batch_size]
+
+        yield data.loc[data.areaCode.isin(codes), :].astype(categorical)
+
+
+def get_demographics_schema(data: DataFrame, keys: List[str], nested: List[str], name: str) -> Schema:
+    """
+    Declares the schema of the output of ``nest_records``, so that it
+    is identical for all batches. Types inferred from each batch would
+    depend on its values - e.g. a batch in which a metric is all null.
+
+    Metrics with declared dtypes take those dtypes. Other numeric metrics
+    are floats, as integers become floats once dates are homogenised.
+    """
+    def get_type(col):
+        if col in NUMERIC_COLUMNS:
+            return from_numpy_dtype(pandas_dtype(NUMERIC_COLUMNS[col]).numpy_dtype)
+
+        if col in data.columns and is_numeric_dtype(data[col].dtype):
+            return float64()
+
+        return string()
+
+    return schema([
+        *(field(key, string()) for key in keys),
+        field(name, list_(struct([field(col, get_type(col)) for col in nested])))
+    ])
+
+
+def nest_records(df: DataFrame, keys: List[str], nested: List[str], name: str) -> DataFrame:
+    """
+    Nests ``nested`` columns as a list of records for each unique
+    combination of ``keys``, stored in a column called ``name``.
+
+    Equivalent to ``df.groupby(keys).apply(to_dict records)``, but
+    the records are built once for the whole frame and sliced at
+    the group boundaries.
+    """
+    df = df.dropna(subset=keys).sort_values(keys, kind="mergesort")
+
+    if not df.size:
+        return DataFrame(columns=[*keys, name])
+
+    key_values = df.loc[:, keys].reset_index(drop=True)
+
+    starts = flatnonzero(key_values.ne(key_values.shift()).any(axis=1).to_numpy())
+    ends = append(starts[1:], len(key_values))
 
-    return df
+    records = df.loc[:, nested].to_dict(orient="records")
+
+    return (
+        key_values
+        .iloc[starts]
+        .reset_index(drop=True)
+        .assign(**{name: [records[start:end] for start, end in zip(starts, ends)]})
+    )
 
 
+@func_logger("demographics activity")
 def run_demographics(payload_dict):
     logging.info(f"run_demographics:: {payload_dict}")
 
@@ -1292,44 +1608,74 @@ def run_demographics(payload_dict):
         metrics = [db_payload_metric, "rollingSum", "rollingRate"]
         logging.info(metrics)
 
-    result = (
-        data.pipe(
-            homogenise_demographics_dates,
-            base_metrics=metadata.get("homogenisation_metrics"),
-            frequency=metadata.get("frequency"),
-            nesting_param=metadata.get("nesting_param"),
-        )
-        .set_index(main_metrics)
-        .pipe(
-            normalise_demographics_records,
-            zero_filled=FILL_WITH_ZEROS,
-            cumulative=START_WITH_ZERO,
-            base_metrics=metadata.get("homogenisation_metrics"),
-            nesting_param=metadata.get("nesting_param"),
-        )
-        .pipe(
-            metric_specific_processes,
-            base_metric=metadata.get("base_metric"),
-            db_payload_metric=db_payload_metric,
-        )
-        .groupby(main_metrics[:-1])
-        .apply(
-            lambda x: x.loc[:, [main_metrics[-1], *metrics]].to_dict(orient="records")
-        )
-        .reset_index()
-        .rename(columns={0: metric_name})
+    nesting_param = metadata.get("nesting_param")
+    data = coerce_schema(
+        data,
+        [*main_metrics[:-2], nesting_param],
+        categories=get_demographics_categories(nesting_param)
     )
 
+    # Dates and nesting values are shared by all areas, so they must
+    # be derived from the whole chunk rather than from each batch.
+    dates = to_datetime(data.date, format="%Y-%m-%d")
+    date_bounds = (dates.min(), dates.max())
+    nesting_values = data[nesting_param].dropna().unique().tolist()
+    del dates
+
     # Store chunk for deployment to DB
     result_path = (
         f"daily_chunks/{category}/{subcategory}/{date}/{area_type}_{area_code}.ft"
     )
+
+    output_schema = get_demographics_schema(
+        data,
+        keys=main_metrics[:-1],
+        nested=[main_metrics[-1], *metrics],
+        name=metric_name
+    )
+
     with TemporaryFile() as fp:
-        result.reset_index(drop=True).to_feather(fp)
+        writer = new_ipc_file(fp, output_schema, options=IpcWriteOptions(compression="lz4"))
+
+        for batch in iter_area_batches(data):
+            result = (
+                batch.pipe(
+                    homogenise_demographics_dates,
+                    base_metrics=metadata.get("homogenisation_metrics"),
+                    frequency=metadata.get("frequency"),
+                    nesting_param=nesting_param,
+                    dates=date_bounds,
+                    nesting_values=nesting_values,
+                )
+                .set_index(main_metrics)
+                .pipe(
+                    normalise_demographics_records,
+                    zero_filled=FILL_WITH_ZEROS,
+                    cumulative=START_WITH_ZERO,
+                    base_metrics=metadata.get("homogenisation_metrics"),
+                    nesting_param=nesting_param,
+                )
+                .pipe(
+                    metric_specific_processes,
+                    base_metric=metadata.get("base_metric"),
+                    db_payload_metric=db_payload_metric,
+                )
+                .pipe(
+                    nest_records,
+                    keys=main_metrics[:-1],
+                    nested=[main_metrics[-1], *metrics],
+                    name=metric_name,
+                )
+            )
+
+            # Batches are appended to the output as they are processed.
+            writer.write_table(Table.from_pandas(result, schema=output_schema, preserve_index=False))
+
+        writer.close()
         fp.seek(0)
 
         with StorageClient(**kws, path=result_path) as cli:
-            cli.upload(fp.read())
+            cli.upload_stream(iter(partial(fp.read, UPLOAD_CHUNK_SIZE), b""))
 
     response_payload = {
         "path": result_path,
@@ -1344,6 +1690,31 @@ def run_demographics(payload_dict):
     return response_payload
 
 
+def load_cached_result(cached: CacheEntry, payload: RawDataPayload) -> Union[DataFrame, None]:
+    """
+    Loads the processed output of an unchanged chunk from a previous
+    release and re-stamps it for the current release.
+
+    Returns ``None`` if the cached output no longer exists.
+    """
+    with StorageClient(container="pipeline", path=cached.output_path) as client:
+        if not client.exists():
+            logging.info(f"Cached output not found: {cached.output_path}")
+            return None
+
+        data = read_feather(BytesIO(client.download().readall()))
+
+    release_date = payload.timestamp.split("T")[0]
+
+    return (
+        data
+        .drop(columns=["id", "hash", "seriesDate"])
+        .pipe(generate_row_hash, date=release_date)
+        .assign(releaseTimestamp=payload.timestamp)
+    )
+
+
+@func_logger("main activity")
 def run(payload_dict: dict):
     """
     Reads the data from the blob that has been updated, then runs it
@@ -1366,21 +1737,32 @@ def run(payload_dict: dict):
         tier="Cool",
     )
 
-    # Demographics
-    population_data = get_population_data()
-    logging.info(f"\tLoaded and parsed population data")
-
     try:
         with StorageClient(**raw_data_chunk_kws, path=payload.data_path) as client:
             if not client.exists():
                 raise RuntimeError(f"Blob not found: {payload.data_path}")
-            data = loads(client.download().readall().decode())
+            raw_data = client.download().readall()
+
+        data = loads(raw_data.decode())
 
         area_type: str = list(data.keys())[0]
         # area_type = area_type.rstrip('s')
         area_code: str = list(data[area_type].keys())[0]
 
-        result = process(data, population_data, payload)
+        fingerprint = get_chunk_fingerprint(raw_data, "main")
+        cached = get_cached_chunk("main", None, area_type, area_code, fingerprint)
+
+        result = None
+        if cached is not None:
+            result = load_cached_result(cached, payload)
+
+        if result is None:
+            # Demographics
+            population_data = get_population_data()
+            logging.info(f"\tLoaded and parsed population data")
+
+            result = process(data, population_data, payload)
+
         logging.info(f"\tFinished ETL process for payload: {payload_dict}")
     except Exception as e:
         logging.critical(f"FAILED: {payload_dict}")
@@ -1418,6 +1800,15 @@ def run(payload_dict: dict):
                 filename=f"{area_type}_{area_code}.ft",
             )
 
+            set_cached_chunk("main", None, CacheEntry(
+                fingerprint=fingerprint,
+                output_path=f"{file_path}/{area_type}_{area_code}.ft",
+                timestamp=payload.timestamp,
+                area_type=area_type,
+                area_code=area_code,
+                metrics=get_output_metrics(result)
+            ))
+
             processed_data_kws = dict(
                 container="pipeline",
                 content_type="application/octet-stream",
@@ -0,0 +1,283 @@
+#!/usr/bin python3
+
+"""
+Column-level processing plans.
+
+A plan is a DAG of operations, each of which reads and writes a
+known set of columns. Operations are given a private copy of the
+columns they read (together with the key columns), so that those
+which do not depend on one another may run concurrently. Their
+outputs are merged into the data in the main thread.
+
+Dependencies are resolved from the order in which the operations
+are declared: an operation runs after the last writer of every
+column it reads or writes, and after every earlier reader of the
+columns it writes.
+
+Stage functions decorated with ``func_logger`` are called without
+the decorator, as they run once per column. The time spent in each
+stage is logged once the plan has run.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from os import getenv
+from time import perf_counter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+# 3rd party:
+from pandas import DataFrame, MultiIndex, concat
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'Operation',
+    'ProcessingPlan'
+]
+
+
+# Number of operations that may run at once. Operations
+# run sequentially in the declared order when set to 1.
+PLAN_WORKERS = int(getenv("ETL_PLAN_WORKERS", 4))
+
+
+class Operation(NamedTuple):
+    """
+    Operation on a subset of the columns.
+
+    ``func`` is called with a copy of the key columns and of ``inputs``
+    (those that exist), followed by ``kwargs`` and the run-time values
+    named in ``context``. It must return a frame with the same keys,
+    containing the ``outputs``.
+    """
+    stage: str
+    column: str
+    func: Callable[..., DataFrame]
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    kwargs: Dict[str, Any] = dict()
+    context: Tuple[str, ...] = tuple()
+
+
+class ProcessingPlan:
+    """
+    Processing plan compiled for a set of columns.
+
+    Parameters
+    ----------
+    keys: Iterable[str]
+        Columns that identify a row. These must be unique,
+        and are not modified by the operations.
+
+    columns: Iterable[str]
+        Columns of the data for which the plan is compiled.
+
+    operations: Iterable[Operation]
+        Operations, in the order in which they would
+        run sequentially.
+    """
+    def __init__(self, keys: Iterable[str], columns: Iterable[str],
+                 operations: Iterable[Operation]):
+        self.keys = list(keys)
+        self.operations = list(operations)
+        self.dependencies = self._resolve_dependencies()
+
+        self.columns = list(columns)
+        for operation in self.operations:
+            for column in operation.outputs:
+                if column not in self.columns:
+                    self.columns.append(column)
+
+    def _resolve_dependencies(self) -> List[Tuple[int, ...]]:
+        writers: Dict[str, int] = dict()
+        readers: Dict[str, List[int]] = dict()
+        dependencies = list()
+
+        for index, operation in enumerate(self.operations):
+            deps = set()
+
+            for column in {*operation.inputs, *operation.outputs}:
+                if column in writers:
+                    deps.add(writers[column])
+
+            for column in operation.outputs:
+                deps.update(readers.get(column, []))
+
+            for column in operation.inputs:
+                readers.setdefault(column, list()).append(index)
+
+            for column in operation.outputs:
+                writers[column] = index
+                readers[column] = list()
+
+            deps.discard(index)
+            dependencies.append(tuple(sorted(deps)))
+
+        return dependencies
+
+    @property
+    def stages(self) -> List[str]:
+        return list(dict.fromkeys(operation.stage for operation in self.operations))
+
+    def describe(self) -> str:
+        """
+        Describes the operations and their dependencies.
+        """
+        lines = [f"Processing plan: {len(self.operations)} operations in {len(self.stages)} stages"]
+
+        for index, (operation, deps) in enumerate(zip(self.operations, self.dependencies)):
+            lines.append(
+                f"{index:>4} {operation.stage:<32} {operation.column:<56} "
+                f"out: {', '.join(operation.outputs):<56} "
+                f"after: {', '.join(map(str, deps)) or '-'}"
+            )
+
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"<ProcessingPlan: {len(self.operations)} operations, {len(self.columns)} columns>"
+
+    def _log(self, timings: Counter, workers: int):
+        logging.info(f">> Ran {len(self.operations)} operations with {workers} workers")
+
+        for stage, duration in timings.most_common():
+            logging.info(f"\t{stage}: {duration:.3f}s")
+
+    def _execute(self, index: int, data: DataFrame, context: Dict[str, Any]) -> Tuple[DataFrame, float]:
+        operation = self.operations[index]
+        params = {key: context[key] for key in operation.context}
+        func = getattr(operation.func, "__wrapped__", operation.func)
+
+        start = perf_counter()
+        result = func(data, **operation.kwargs, **params)
+
+        return result, perf_counter() - start
+
+    def _extract(self, index: int, data: DataFrame) -> DataFrame:
+        inputs = [
+            column
+            for column in self.operations[index].inputs
+            if column in data.columns and column not in self.keys
+        ]
+
+        return data.loc[:, [*self.keys, *inputs]].copy()
+
+    def _merge(self, index: int, data: DataFrame, result: DataFrame,
+               key_index: MultiIndex) -> DataFrame:
+        outputs = list(self.operations[index].outputs)
+
+        aligned = result.index.equals(data.index) and all(
+            (result[key].values == data[key].values).all()
+            for key in self.keys
+        )
+
+        if aligned:
+            values = result.loc[:, outputs]
+        else:
+            values = (
+                result
+                .set_index(self.keys)
+                .loc[:, outputs]
+                .reindex(key_index)
+                .set_axis(data.index, axis=0)
+            )
+
+        # New columns are added in one block - inserting them one
+        # at a time fragments the frame.
+        new = [column for column in outputs if column not in data.columns]
+
+        for column in outputs:
+            if column not in new:
+                data[column] = values[column]
+
+        if not new:
+            return data
+
+        return concat([data, values.loc[:, new]], axis=1)
+
+    def run(self, data: DataFrame, workers: int = PLAN_WORKERS, **context) -> DataFrame:
+        """
+        Runs the plan.
+
+        Parameters
+        ----------
+        data: DataFrame
+            Data containing the columns for which the plan was compiled.
+
+        workers: int
+            Number of operations that may run at once.
+            [Default: ``ETL_PLAN_WORKERS`` environment variable, or 4]
+
+        **context
+            Run-time values used by the operations.
+
+        Returns
+        -------
+        DataFrame
+            Data with the columns ordered as in ``columns``.
+        """
+        data = data.copy()
+        key_index = MultiIndex.from_frame(data.loc[:, self.keys])
+        timings = Counter()
+
+        if workers <= 1:
+            for index in range(len(self.operations)):
+                result, duration = self._execute(index, self._extract(index, data), context)
+                timings[self.operations[index].stage] += duration
+                data = self._merge(index, data, result, key_index)
+
+            self._log(timings, workers)
+
+            return data.loc[:, [col for col in self.columns if col in data.columns]]
+
+        remaining = [len(deps) for deps in self.dependencies]
+        dependents: List[List[int]] = [list() for _ in self.operations]
+        for index, deps in enumerate(self.dependencies):
+            for dep in deps:
+                dependents[dep].append(index)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = dict()
+
+            def submit(op_index):
+                future = executor.submit(self._execute, op_index, self._extract(op_index, data), context)
+                futures[future] = op_index
+
+            for index, count in enumerate(remaining):
+                if not count:
+                    submit(index)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    index = futures.pop(future)
+                    result, duration = future.result()
+                    timings[self.operations[index].stage] += duration
+                    data = self._merge(index, data, result, key_index)
+
+                    for dependent in dependents[index]:
+                        remaining[dependent] -= 1
+                        if not remaining[dependent]:
+                            submit(dependent)
+
+        self._log(timings, workers)
+
+        return data.loc[:, [col for col in self.columns if col in data.columns]]
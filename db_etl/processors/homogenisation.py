@@ -83,21 +83,29 @@ def homogenise_demographics_dates(
         base_metrics,
         nesting_param,
         frequency,
+        dates=None,
+        nesting_values=None
 ):
+    """
+    Fills in the missing dates for every area and nesting value.
 
+    ``dates`` and ``nesting_values`` default to those in ``d``, and
+    may be set explicitly when ``d`` is a subset of a larger dataset.
+    """
     d.date = to_datetime(d.date, format="%Y-%m-%d")
 
     col_names = d.columns
 
-    date = date_range(
-        start=to_datetime(d.date).min(),
-        end=to_datetime(d.date).max(),
-        freq=frequency
-    )
+    if dates is None:
+        dates = (to_datetime(d.date).min(), to_datetime(d.date).max())
+
+    date = date_range(start=dates[0], end=dates[1], freq=frequency)
 
     dt_time_list = list()
 
-    unique_nesting_param_values = d[nesting_param].unique()
+    unique_nesting_param_values = nesting_values
+    if unique_nesting_param_values is None:
+        unique_nesting_param_values = d[nesting_param].unique()
 
     for area_type in unique(d.areaType):
         values = product(
@@ -7,7 +7,7 @@ from typing import Iterable
 from itertools import product
 
 # 3rd party:
-from pandas import DataFrame, unique
+from pandas import DataFrame, Series, unique, to_datetime
 
 # Internal: 
 try:
@@ -19,7 +19,10 @@ except ImportError:
 
 __all__ = [
     'normalise_records',
-    'normalise_demographics_records'
+    'normalise_demographics_records',
+    'normalise_record_keys',
+    'fill_zeros',
+    'fill_forward'
 ]
 
 
@@ -91,6 +94,64 @@ def normalise_records(d: DataFrame, zero_filled: Iterable[str] = tuple(),
     return d
 
 
+@func_logger("key normalisation")
+def normalise_record_keys(d: DataFrame) -> DataFrame:
+    """
+    Row-level part of ``normalise_records``. Sorts the data by area and
+    date, fills in the area names, and formats the dates.
+
+    The value columns may then be filled using ``fill_zeros``
+    and ``fill_forward``.
+    """
+    d = (
+        d
+        .sort_values(["areaType", "areaCode", "date"])
+        .reset_index(drop=True)
+    )
+
+    if "areaName" in d.columns:
+        d["areaName"] = d.groupby("areaCode")["areaName"].transform("first")
+
+    d.date = d.date.map(lambda x: x.strftime("%Y-%m-%d"))
+
+    if "areaName" in d.columns:
+        d = d.assign(areaNameLower=d.areaName.str.lower())
+
+    return d
+
+
+def get_recorded_range(d: DataFrame, column: str) -> Series:
+    """
+    Rows between the first and the last recorded value of
+    ``column`` for each area, excluding the latter.
+    """
+    dates = to_datetime(d.date, format="%Y-%m-%d")
+    recorded = dates.where(d[column].notna()).groupby(d.areaCode)
+
+    return (dates >= recorded.transform("min")) & (dates < recorded.transform("max"))
+
+
+def fill_zeros(d: DataFrame, column: str) -> DataFrame:
+    """
+    Vectorised equivalent of ``zero_filled`` in ``normalise_records``.
+    """
+    in_range = get_recorded_range(d, column)
+    d[column] = d[column].mask(in_range & d[column].isna(), 0)
+
+    return d
+
+
+def fill_forward(d: DataFrame, column: str) -> DataFrame:
+    """
+    Vectorised equivalent of ``cumulative`` in ``normalise_records``.
+    """
+    in_range = get_recorded_range(d, column)
+    filled = d[column].where(in_range).groupby(d.areaCode).ffill()
+    d[column] = d[column].where(~in_range, filled)
+
+    return d
+
+
 def normalise_demographics_records(d: DataFrame,
                                    nesting_param: str,
                                    base_metrics: Iterable[str],
@@ -0,0 +1,96 @@
+import site
+import pathlib
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+from os import environ
+from tempfile import TemporaryFile
+
+environ.setdefault("RECORD_KEY", "test")
+
+from numpy import nan
+from pandas import DataFrame, read_feather
+from pyarrow import Table, int32, float64, string
+from pyarrow.ipc import new_file as new_ipc_file
+
+from db_etl.etl import get_demographics_schema, nest_records, coerce_schema
+
+
+KEYS = ["areaType", "areaCode", "areaName", "date"]
+NESTED = ["age", "cases", "rollingSum", "rollingRate"]
+
+
+def make_batch(area_code, cases, rolling_rate):
+    return DataFrame({
+        "areaType": "ltla",
+        "areaCode": area_code,
+        "areaName": f"Area {area_code}",
+        "date": "2021-01-01",
+        "age": ["00_04", "05_09"],
+        "cases": cases,
+        "rollingSum": [3.0, 4.0],
+        "rollingRate": rolling_rate,
+    })
+
+
+class TestDemographicsSchema(unittest.TestCase):
+    def test_declared_types(self):
+        data = DataFrame({"variant": ["V-1"], "cumCases": [1], "percentage": [0.5]})
+        schema = get_demographics_schema(data, KEYS, ["variant", "cumCases", "percentage"], "variants")
+
+        self.assertListEqual(schema.names, [*KEYS, "variants"])
+        self.assertTrue(all(schema.field(key).type == string() for key in KEYS))
+
+        nested = schema.field("variants").type.value_type
+        self.assertEqual(nested.field("variant").type, string())
+        # Integers become floats once the dates are homogenised.
+        self.assertEqual(nested.field("cumCases").type, float64())
+
+        schema = get_demographics_schema(DataFrame(), KEYS, NESTED, "metric")
+        nested = schema.field("metric").type.value_type
+        self.assertEqual(nested.field("cases").type, int32())
+        self.assertEqual(nested.field("rollingRate").type, float64())
+
+    def test_batches_share_schema(self):
+        schema = get_demographics_schema(DataFrame(), KEYS, NESTED, "metric")
+
+        # The second batch has no values for two of the metrics, so
+        # their types would be inferred as null.
+        batches = [
+            make_batch("E1", [1.0, 2.0], [1.5, 2.5]),
+            make_batch("E2", [nan, nan], [nan, nan]),
+        ]
+
+        with TemporaryFile() as fp:
+            writer = new_ipc_file(fp, schema)
+
+            for batch in batches:
+                result = nest_records(coerce_schema(batch, ["cases", "rollingSum"]), KEYS, NESTED, "metric")
+                writer.write_table(Table.from_pandas(result, schema=schema, preserve_index=False))
+
+            writer.close()
+            fp.seek(0)
+            output = read_feather(fp)
+
+        self.assertListEqual(output.areaCode.tolist(), ["E1", "E2"])
+        self.assertEqual(output.metric[0][1]["rollingRate"], 2.5)
+        self.assertIsNone(output.metric[1][0]["cases"])
+        self.assertEqual(output.metric[1][0]["rollingSum"], 3)
+
+    def test_empty_output(self):
+        schema = get_demographics_schema(DataFrame(), KEYS, NESTED, "metric")
+
+        with TemporaryFile() as fp:
+            new_ipc_file(fp, schema).close()
+            fp.seek(0)
+            output = read_feather(fp)
+
+        self.assertListEqual(output.columns.tolist(), [*KEYS, "metric"])
+        self.assertEqual(len(output), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import site
+import pathlib
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+from os import environ
+from warnings import catch_warnings, simplefilter
+from types import SimpleNamespace
+from unittest.mock import patch
+
+environ.setdefault("RECORD_KEY", "test")
+
+from numpy.random import default_rng
+from pandas import DataFrame, date_range
+from pandas.errors import PerformanceWarning
+from pandas.testing import assert_frame_equal
+
+from db_etl import etl
+from db_etl.plan import ProcessingPlan
+from db_etl.processors import (
+    calculate_by_adjacent_column,
+    calculate_pair_summations,
+    calculate_rates,
+    change_by_sum,
+    generate_row_hash,
+    homogenise_dates,
+    normalise_records,
+    ratio_to_percentage,
+    trim_end,
+)
+from utilities.generic_types import PopulationData
+
+
+AREA_CODES = ["E06000001", "E06000002", "E06000003"]
+
+RELEASE_TIMESTAMP = "2021-02-12T15:00:00.0000000Z"
+
+# All metrics to which at least one stage applies.
+METRICS = sorted({
+    *etl.FILL_WITH_ZEROS,
+    *etl.START_WITH_ZERO,
+    *etl.NEGATIVE_TO_ZERO,
+    *[col for pair in etl.DERIVED_BY_SUMMATION.values() for col in pair],
+    *etl.DERIVED_BY_MAX_OF_ADJACENT_COLUMN.values(),
+    *etl.ROLLING_RATE,
+    *etl.INCIDENCE_RATE_FIELDS,
+    *etl.SUM_CHANGE_DIRECTION,
+    *etl.RATIO2PERCENTAGE,
+    *etl.TRIM_END["metrics"],
+})
+
+# Metrics with nested (demographic) payloads, to which no stage applies.
+NESTED_METRICS = ["maleCases", "femaleCases"]
+
+
+def run_stepwise(data: DataFrame, population_data: PopulationData) -> DataFrame:
+    """
+    Pipeline that preceded the processing plan, where every stage
+    runs on the whole data in turn.
+    """
+    return (
+        data
+        .pipe(homogenise_dates)
+        .pipe(normalise_records, zero_filled=etl.FILL_WITH_ZEROS, cumulative=etl.START_WITH_ZERO)
+        .pipe(etl.negative_to_zero)
+        .pipe(calculate_pair_summations, **etl.DERIVED_BY_SUMMATION)
+        .pipe(calculate_by_adjacent_column, **etl.DERIVED_BY_MAX_OF_ADJACENT_COLUMN)
+        .pipe(
+            calculate_rates,
+            population_data=population_data,
+            rolling_rate=etl.ROLLING_RATE,
+            incidence_rate=etl.INCIDENCE_RATE_FIELDS,
+        )
+        .pipe(change_by_sum, metrics=etl.SUM_CHANGE_DIRECTION)
+        .pipe(generate_row_hash, date=RELEASE_TIMESTAMP.split("T")[0])
+        .pipe(ratio_to_percentage, metrics=etl.RATIO2PERCENTAGE)
+        .pipe(trim_end, **etl.TRIM_END)
+        .assign(releaseTimestamp=RELEASE_TIMESTAMP)
+        .sort_values(**etl.SORT_OUTPUT_BY)
+    )
+
+
+def run_plan(data: DataFrame, population_data: PopulationData, workers: int) -> DataFrame:
+    payload = SimpleNamespace(timestamp=RELEASE_TIMESTAMP)
+    run = ProcessingPlan.run
+
+    def run_with_workers(self, data, **context):
+        return run(self, data, workers=workers, **context)
+
+    with patch.object(ProcessingPlan, "run", run_with_workers):
+        return etl.process(data, population_data, payload, is_direct=True)
+
+
+def make_chunk(metrics, seed: int, periods: int = 60) -> DataFrame:
+    rng = default_rng(seed)
+    rows = list()
+
+    for area_code in AREA_CODES:
+        for date in date_range("2021-01-01", periods=periods):
+            # Gaps in the dates of some areas.
+            if rng.random() < 0.1:
+                continue
+
+            row = {
+                "areaType": "utla",
+                "areaCode": area_code,
+                "areaName": f"Area {area_code}",
+                "date": date.strftime("%Y-%m-%d"),
+            }
+
+            for metric in metrics:
+                if metric in NESTED_METRICS:
+                    row[metric] = [
+                        {"age": age, "value": int(rng.integers(0, 50))}
+                        for age in ("0_to_4", "5_to_9")
+                    ]
+                elif rng.random() < 0.2:
+                    row[metric] = None
+                else:
+                    row[metric] = float(rng.integers(-2, 500))
+
+            rows.append(row)
+
+    return DataFrame(rows, columns=["areaType", "areaCode", "areaName", "date", *metrics])
+
+
+def get_population_data() -> PopulationData:
+    general = DataFrame(
+        {"population": [100_000, 200_000, 300_000]},
+        index=AREA_CODES
+    ).rename_axis("areaCode")
+
+    return PopulationData(general=general, ageSex5YearBreakdown=None, ageSexBroadBreakdown=None)
+
+
+class TestProcessingPlan(unittest.TestCase):
+    def assert_equivalent(self, data: DataFrame):
+        population_data = get_population_data()
+
+        try:
+            expected = run_stepwise(data.copy(), population_data)
+        except Exception as err:
+            # Failures must be surfaced the same way.
+            for workers in (1, 4):
+                with self.subTest(workers=workers), self.assertRaises(type(err)):
+                    run_plan(data.copy(), population_data, workers)
+
+            return None
+
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                result = run_plan(data.copy(), population_data, workers)
+
+                # Column order used to depend on the iteration order of sets.
+                self.assertSetEqual(set(result.columns), set(expected.columns))
+
+                assert_frame_equal(
+                    result.loc[:, expected.columns].reset_index(drop=True),
+                    expected.reset_index(drop=True),
+                    check_dtype=False
+                )
+
+    def test_all_metrics(self):
+        self.assert_equivalent(make_chunk(METRICS, seed=0))
+
+    def test_subsets_of_metrics(self):
+        rng = default_rng(1)
+
+        for seed in range(5):
+            metrics = sorted(rng.choice(METRICS, size=len(METRICS) // 3, replace=False))
+
+            with self.subTest(seed=seed):
+                self.assert_equivalent(make_chunk(metrics, seed=seed))
+
+    def test_nested_metrics(self):
+        self.assert_equivalent(make_chunk([*NESTED_METRICS, *METRICS[:5]], seed=2))
+
+    def test_demographics_only(self):
+        self.assert_equivalent(make_chunk(NESTED_METRICS, seed=3))
+
+    def test_empty_chunk(self):
+        self.assert_equivalent(make_chunk(METRICS, seed=4, periods=0))
+
+    def test_frame_not_fragmented(self):
+        data = make_chunk(METRICS, seed=5)
+
+        for workers in (1, 4):
+            with self.subTest(workers=workers), catch_warnings():
+                simplefilter("error", PerformanceWarning)
+                run_plan(data.copy(), get_population_data(), workers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,15 +4,20 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from multiprocessing import Pool, cpu_count
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Tuple
 
 # 3rd party:
+from dateutil.relativedelta import relativedelta
 from sqlalchemy import text
 
 # Internal:
 try:
     from __app__.db_tables.covid19 import Session
     from __app__.storage import StorageClient
+    from __app__.utilities.release_data import get_release_data
 
     from . import queries
     from .utils import plot_thumbnail, plot_vaccinations, plot_vaccinations_waffle_chart
@@ -25,6 +30,7 @@ except ImportError:
     )
     from db_tables.covid19 import Session
     from storage import StorageClient
+    from utilities.release_data import get_release_data
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 __all__ = ["main"]
@@ -41,6 +47,19 @@ METRICS = [
     "newVirusTestsBySpecimenDate",
 ]
 
+# Changes older than this are considered stale and no thumbnail is
+# produced for the metric.
+CHANGE_WINDOW = timedelta(days=36)
+
+# Range of the time series, relative to the release date.
+HISTORY = relativedelta(months=6)
+DATA_LAG = timedelta(days=5)
+
+UPLOAD_WORKERS = 10
+
+# (plotter, plotter args, uploader, uploader kwargs)
+RenderJob = Tuple[Callable, tuple, Callable, dict]
+
 
 def store_data(
     date: str, metric: str, svg: str, area_type: str = None, area_code: str = None
@@ -94,40 +113,71 @@ def upload_file(
         )
 
 
-def get_timeseries(date: str, metric: str):
-    ts = datetime.strptime(date, "%Y-%m-%d")
-    partition = f"{ts:%Y_%-m_%-d}_other"
-    partition_id = f"{ts:%Y_%-m_%-d}|other"
-    values_query = queries.TIMESRIES_QUERY.format(partition=partition)
-    change_query = queries.LATEST_CHANGE_QUERY.format(partition=partition)
-
+def execute_query(query: str, **params):
     session = Session()
     conn = session.connection()
     try:
-        resp = conn.execute(
-            text(values_query), partition_id=partition_id, metric=metric, datestamp=ts
-        )
+        resp = conn.execute(text(query), **params)
         values = resp.fetchall()
-
-        resp = conn.execute(
-            text(change_query),
-            partition_id=partition_id,
-            datestamp=ts,
-            metric=metric + "Change",
-        )
-        change = resp.fetchone()
     except Exception as err:
         session.rollback()
         raise err
     finally:
         session.close()
 
-    if not (values and change):
-        return
+    return values
+
+
+def get_timeseries(data_version: str, date: str) -> Dict[str, dict]:
+    """
+    Retrieves the time series of all ``METRICS`` and their latest
+    change for England from the release data.
+
+    Returns
+    -------
+    Dict[str, dict]
+        Values (in descending date order) and the latest change, keyed
+        by metric. Metrics without values or a recent change are omitted.
+    """
+    ts = datetime.strptime(date, "%Y-%m-%d")
+
+    change_metrics = [f"{metric}Change" for metric in METRICS]
 
-    store_data(date, metric, plot_thumbnail(values, metric_name=metric, change=change))
+    data = get_release_data(data_version, [*METRICS, *change_metrics], ["nation"])
+    data = data.loc[
+        (data.area_name == "England") &
+        (data.date >= (ts - HISTORY).date()) &
+        (data.date <= (ts - DATA_LAG).date())
+    ]
 
-    return True
+    series = {metric: list() for metric in [*METRICS, *change_metrics]}
+    for metric, row_date, value in data.loc[:, ["metric", "date", "value"]].itertuples(index=False):
+        series[metric].append({"metric": metric, "date": row_date, "value": value})
+
+    result = dict()
+    for metric, change_metric in zip(METRICS, change_metrics):
+        values = series[metric]
+        change = next(iter(series[change_metric]), None)
+
+        if change is not None and change["date"] < (ts - CHANGE_WINDOW).date():
+            change = None
+
+        if not (values and change):
+            continue
+
+        result[metric] = {"values": values, "change": change}
+
+    return result
+
+
+def timeseries_jobs(data_version: str, date: str) -> Iterator[RenderJob]:
+    for metric, data in get_timeseries(data_version, date).items():
+        yield (
+            plot_thumbnail,
+            (data["values"], data["change"], metric),
+            store_data,
+            dict(date=date, metric=metric)
+        )
 
 
 def get_value_65_plus(item: dict):
@@ -169,109 +219,120 @@ def get_value_65_plus(item: dict):
     }
 
 
-def get_vaccinations(date):
+def vaccinations_jobs(date: str) -> Iterator[RenderJob]:
     ts = datetime.strptime(date, "%Y-%m-%d")
     partition = f"{ts:%Y_%-m_%-d}"
 
     vax_query = queries.VACCINATIONS_QUERY.format(partition_date=partition)
-
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(text(vax_query), datestamp=ts)
-        values = resp.fetchall()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
+    values = execute_query(vax_query, datestamp=ts)
 
     for item in values:
-        store_data(
-            date,
-            "vaccinations",
-            plot_vaccinations(item),
-            area_type=item["area_type"],
-            area_code=item["area_code"],
+        yield (
+            plot_vaccinations,
+            (dict(item),),
+            store_data,
+            dict(
+                date=date,
+                metric="vaccinations",
+                area_type=item["area_type"],
+                area_code=item["area_code"]
+            )
         )
 
-    return True
-
 
-def get_vaccinations_65_plus(date: str):
+def vaccinations_65_plus_jobs(date: str) -> Iterator[RenderJob]:
     """
-    The function to get the data from database. It will also call other functions
-    to generate SVG images (waffle charts)
-    It returns True as the original function does
+    Creates the jobs to generate SVG images (waffle charts) using the
+    most recent record of each area.
 
     :param date: date of the latest release
-    :return: True
-    :rtype: boolean
+    :return: render jobs
     """
     ts = datetime.strptime(date, "%Y-%m-%d")
     partition = f"{ts:%Y_%-m_%-d}"
 
     vax_query_65_plus = queries.VACCINATIONS_QUERY_PLUS.format(partition=partition)
+    values = execute_query(vax_query_65_plus)
 
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(text(vax_query_65_plus))
-        values = resp.fetchall()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
+    # Records are ordered by date (descending), so the first record
+    # of each area is the most recent one.
+    processed = set()
 
-    # This is used to track the most recent value that will be used to generate the files
-    saved_data = {}
+    for item in values:
+        area = (item["area_type"], item["area_code"])
 
-    logging.info(f"Waffle chart images to save: {len(values)}")
+        if area in processed:
+            continue
 
-    for item in values:
-        # Checking if it's the newest data for the region
-        if (
-            item["area_type"] not in saved_data
-            or item["area_code"] not in saved_data[item["area_type"]]
-            or item["date"] > saved_data[item["area_type"]][item["area_code"]]
-        ):
-            # Updating the existing data or creating a new entry
-            if item["area_type"] not in saved_data:
-                saved_data[item["area_type"]] = {item["area_code"]: item["date"]}
-            elif item["area_code"] not in saved_data[item["area_type"]]:
-                saved_data[item["area_type"]][item["area_code"]] = item["date"]
-
-            upload_file(
-                date,
-                "vaccinations",
-                plot_vaccinations_waffle_chart(get_value_65_plus(item)),
+        processed.add(area)
+
+        yield (
+            plot_vaccinations_waffle_chart,
+            (get_value_65_plus(item),),
+            upload_file,
+            dict(
+                date=date,
+                metric="vaccinations",
                 area_type=item["area_type"],
-                area_code=item["area_code"],
+                area_code=item["area_code"]
             )
+        )
 
-    return True
+
+def render(job: RenderJob) -> Tuple[Callable, dict, str]:
+    plotter, args, uploader, upload_kws = job
+    return uploader, upload_kws, plotter(*args)
+
+
+def run_jobs(jobs: Iterable[RenderJob]) -> int:
+    """
+    Renders the images in a process pool and uploads them concurrently
+    as they become available.
+    """
+    jobs = list(jobs)
+
+    if not jobs:
+        return 0
+
+    processes = max(min(len(jobs), cpu_count() - 1), 1)
+
+    with Pool(processes=processes) as pool, \
+            ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploader:
+        uploads = [
+            uploader.submit(upload_fn, svg=svg, **upload_kws)
+            for upload_fn, upload_kws, svg in pool.imap_unordered(render, jobs)
+        ]
+
+        for upload in uploads:
+            upload.result()
+
+    return len(jobs)
 
 
 def main(payload):
     category = payload.get("category", "main")
+    jobs = list()
 
     if category == "main":
-        for metric in METRICS:
-            get_timeseries(payload["date"], metric)
+        jobs.extend(timeseries_jobs(payload["data_version"], payload["date"]))
 
         # Necessary data to generate waffle chart images might not be present in DB
         # when 'vaccination' category payload is run, but it should be available
         # when the last file is uploaded (main).
-        logging.info("Generating waffle chart images for '65+' age range.")
-        get_vaccinations_65_plus(payload["date"])
-        logging.info("Generating waffle chart images has finished.")
+        jobs.extend(vaccinations_65_plus_jobs(payload["date"]))
 
     if payload.get("category") == "vaccination":
-        get_vaccinations(payload["date"])
+        jobs.extend(vaccinations_jobs(payload["date"]))
+
+    total = run_jobs(jobs)
+    logging.info(f"Homepage graphs generated: {total}")
 
     return f'DONE: {payload["date"]}'
 
 
 if __name__ == "__main__":
-    main({"date": "2023-08-10"})
+    from utilities.release_data import prefetch_release_data
+    main({
+        "date": "2023-08-10",
+        "data_version": prefetch_release_data({"timestamp": "2023-08-10"})["data_version"]
+    })
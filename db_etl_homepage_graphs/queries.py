@@ -159,42 +159,3 @@ WHERE metric = 'vaccinationsAgeDemographics'
 AND date > ( DATE(NOW()) - INTERVAL '20 days' )
 ORDER BY date DESC;\
 """
-
-
-TIMESRIES_QUERY = """\
-SELECT
-     date                           AS "date",
-     (payload ->> 'value')::NUMERIC AS "value"
-FROM covid19.time_series_p{partition} AS main
-JOIN covid19.release_reference AS rr ON rr.id = release_id
-JOIN covid19.metric_reference  AS mr ON mr.id = metric_id
-JOIN covid19.area_reference    AS ar ON ar.id = main.area_id
-WHERE
-      partition_id = :partition_id
-  AND area_type = 'nation'
-  AND area_name = 'England'
-  AND date BETWEEN ( DATE( :datestamp ) - INTERVAL '6 months') AND ( DATE( :datestamp ) - INTERVAL '5 days' )
-  AND metric = :metric
-ORDER BY date DESC;\
-"""
-
-
-LATEST_CHANGE_QUERY = """\
-SELECT
-     metric,
-     date                        AS "date",
-     (payload -> 'value')::FLOAT AS "value"
-FROM covid19.time_series_p{partition} AS ts
-JOIN covid19.release_reference AS rr ON rr.id = release_id
-JOIN covid19.metric_reference  AS mr ON mr.id = metric_id
-JOIN covid19.area_reference    AS ar ON ar.id = ts.area_id
-WHERE
-      partition_id = :partition_id
-  AND area_type = 'nation'
-  AND area_name = 'England'
-  AND date BETWEEN ( DATE( :datestamp ) - INTERVAL '36 days' ) AND ( DATE(:datestamp) - INTERVAL '5 days' )
-  AND metric = :metric
-ORDER BY date DESC
-OFFSET 0
-FETCH FIRST 1 ROW ONLY;\
-"""
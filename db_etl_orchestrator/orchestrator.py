@@ -200,6 +200,17 @@ def main(context: DurableOrchestrationContext):
         )
         return f"DONE: {trigger_payload}"
 
+    # The release data are materialised once for the data that
+    # have just been deployed, and read by the graphs.
+    release = yield context.call_activity_with_retry(
+        "despatch_ops_workers",
+        input_={
+            "handler": "release_data",
+            "payload": {"timestamp": timestamp.isoformat()}
+        },
+        retry_options=retry_options
+    )
+
     settings_task = context.call_activity_with_retry(
         'db_etl_update_db',
         input_=dict(
@@ -214,7 +225,8 @@ def main(context: DurableOrchestrationContext):
         'db_etl_homepage_graphs',
         input_=dict(
             date=f"{now:%Y-%m-%d}",
-            category=category
+            category=category,
+            data_version=release["data_version"]
         ),
         retry_options=retry_options
     )
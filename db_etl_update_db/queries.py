@@ -2,24 +2,58 @@
 
 STATS_QUERY = """\
 INSERT INTO covid19.release_stats (release_id, record_count)
-SELECT ts.release_id AS id, COUNT(*) AS counter
-FROM covid19.time_series AS ts
-WHERE ts.partition_id = ANY('{partitions}'::VARCHAR[])
-GROUP BY ts.release_id
+SELECT rs.release_id AS id, SUM(rs.inserted) AS counter
+FROM covid19.release_partition_stats AS rs
+  JOIN covid19.release_reference AS rr ON rr.id = rs.release_id
+WHERE rr.timestamp::DATE = '{datestamp}'::DATE
+  AND rs.partition_id = ANY('{partitions}'::VARCHAR[])
+GROUP BY rs.release_id
 ON CONFLICT ( release_id ) DO
     UPDATE SET record_count = EXCLUDED.record_count;\
 """
 
 
-PERMISSIONS_QUERY = """\
-GRANT  USAGE                                ON SCHEMA covid19 TO   reader;
-REVOKE CREATE                               ON SCHEMA covid19 FROM reader;
-REVOKE TRUNCATE         ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-REVOKE UPDATE           ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-REVOKE DELETE           ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-REVOKE INSERT           ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-GRANT  SELECT           ON ALL TABLES       IN SCHEMA covid19 TO   reader;
-GRANT  SELECT           ON ALL SEQUENCES    IN SCHEMA covid19 TO   reader;
-REVOKE EXECUTE          ON ALL FUNCTIONS    IN SCHEMA covid19 FROM reader;
-REVOKE TRIGGER          ON ALL TABLES       IN SCHEMA covid19 FROM reader;\
+# Run once per database. Tables, partitions and sequences created
+# thereafter by the role that runs this are readable by default.
+SCHEMA_PERMISSIONS = """\
+BEGIN;
+SET LOCAL citus.multi_shard_modify_mode TO 'sequential';
+GRANT  USAGE                                                ON SCHEMA covid19 TO   reader;
+REVOKE CREATE                                               ON SCHEMA covid19 FROM reader;
+REVOKE TRUNCATE                         ON ALL TABLES       IN SCHEMA covid19 FROM reader;
+REVOKE UPDATE, DELETE, INSERT           ON ALL TABLES       IN SCHEMA covid19 FROM reader;
+GRANT  SELECT                           ON ALL TABLES       IN SCHEMA covid19 TO   reader;
+GRANT  SELECT                           ON ALL SEQUENCES    IN SCHEMA covid19 TO   reader;
+REVOKE EXECUTE                          ON ALL FUNCTIONS    IN SCHEMA covid19 FROM reader;
+REVOKE TRIGGER                          ON ALL TABLES       IN SCHEMA covid19 FROM reader;
+ALTER DEFAULT PRIVILEGES IN SCHEMA covid19 GRANT  SELECT    ON TABLES           TO   reader;
+ALTER DEFAULT PRIVILEGES IN SCHEMA covid19 GRANT  SELECT    ON SEQUENCES        TO   reader;
+ALTER DEFAULT PRIVILEGES IN SCHEMA covid19 REVOKE EXECUTE   ON FUNCTIONS        FROM reader;
+COMMIT;\
+"""
+
+
+# Partitions of the release that exist.
+RELEASE_PARTITIONS = """\
+SELECT name
+FROM UNNEST((:names)::VARCHAR[]) AS name
+WHERE to_regclass('covid19.' || name) IS NOT NULL;\
+"""
+
+
+PARTITION_PERMISSIONS = """\
+BEGIN;
+SET LOCAL citus.multi_shard_modify_mode TO 'sequential';
+REVOKE TRUNCATE, UPDATE, DELETE, INSERT, TRIGGER ON {tables} FROM reader;
+GRANT  SELECT                                    ON {tables} TO   reader;
+COMMIT;\
+"""
+
+
+# Partitions of the release from which the reader role cannot SELECT.
+UNGRANTED_PARTITIONS = """\
+SELECT name
+FROM UNNEST((:names)::VARCHAR[]) AS name
+WHERE NOT has_table_privilege('reader', ('covid19.' || name)::REGCLASS, 'SELECT')
+ORDER BY name;\
 """
@@ -3,7 +3,10 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
+import logging
+from sys import argv
 from datetime import datetime
+from typing import List
 
 # 3rd party:
 from sqlalchemy import text
@@ -11,8 +14,16 @@ from sqlalchemy import text
 # Internal:
 try:
     from __app__.db_tables.covid19 import Session
+    from __app__.db_etl_update_db.queries import (
+        STATS_QUERY, SCHEMA_PERMISSIONS, RELEASE_PARTITIONS,
+        PARTITION_PERMISSIONS, UNGRANTED_PARTITIONS
+    )
 except ImportError:
     from db_tables.covid19 import Session
+    from db_etl_update_db.queries import (
+        STATS_QUERY, SCHEMA_PERMISSIONS, RELEASE_PARTITIONS,
+        PARTITION_PERMISSIONS, UNGRANTED_PARTITIONS
+    )
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -21,53 +32,6 @@ __all__ = [
 ]
 
 
-STATS_QUERY = """\
-INSERT INTO covid19.release_stats (release_id, record_count)
-SELECT ts.release_id AS id, COUNT(*) AS counter
-FROM covid19.time_series AS ts
-WHERE 
-      ts.release_id IN (
-          SELECT rr.id 
-          FROM covid19.release_reference AS rr
-          WHERE rr.timestamp::DATE = '{datestamp}'::DATE
-      )
-  AND ts.partition_id = ANY('{partitions}'::VARCHAR[])
-GROUP BY ts.release_id
-ON CONFLICT ( release_id ) DO
-    UPDATE SET record_count = EXCLUDED.record_count;\
-"""
-
-
-PERMISSIONS_QUERY = """\
-BEGIN;
-SET LOCAL citus.multi_shard_modify_mode TO 'sequential';
-GRANT  USAGE                                                ON SCHEMA covid19 TO   reader;
-REVOKE CREATE                                               ON SCHEMA covid19 FROM reader;
-REVOKE TRUNCATE                         ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-REVOKE UPDATE, DELETE, INSERT           ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-GRANT  SELECT                           ON ALL TABLES       IN SCHEMA covid19 TO   reader;
-GRANT  SELECT                           ON ALL SEQUENCES    IN SCHEMA covid19 TO   reader;
-REVOKE EXECUTE                          ON ALL FUNCTIONS    IN SCHEMA covid19 FROM reader;
-REVOKE TRIGGER                          ON ALL TABLES       IN SCHEMA covid19 FROM reader;
-COMMIT;\
-"""
-
-
-def update_permissions():
-    session = Session()
-    connection = session.connection()
-    try:
-        connection.execute(text(PERMISSIONS_QUERY))
-        session.flush()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
-
-    return None
-
-
 def get_partition_ids(date, category):
     date = datetime.strptime(date, "%Y-%m-%d")
     partition_names = [
@@ -89,6 +53,72 @@ def get_partition_ids(date, category):
     return partitions
 
 
+def get_partition_names(date, category) -> List[str]:
+    return [
+        "time_series_p" + partition_id.replace("|", "_")
+        for partition_id in get_partition_ids(date, category)
+    ]
+
+
+def grant_schema_permissions():
+    """
+    Grants the reader role access to the existing tables and
+    sequences of the schema, and sets the default privileges of
+    those created thereafter. Only needs to be run once, e.g.
+
+        python -m db_etl_update_db.update permissions
+    """
+    session = Session()
+    connection = session.connection()
+    try:
+        connection.execute(text(SCHEMA_PERMISSIONS))
+        session.flush()
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    return None
+
+
+def update_permissions(date, category):
+    """
+    Grants the reader role access to the partitions of the release,
+    and raises ``PermissionError`` if it cannot SELECT from any of them.
+    """
+    session = Session()
+    connection = session.connection()
+    try:
+        resp = connection.execute(
+            text(RELEASE_PARTITIONS),
+            names=get_partition_names(date, category)
+        )
+        partitions = [row[0] for row in resp.fetchall()]
+
+        if not partitions:
+            logging.info(f"No partitions to grant for '{date}'")
+            return None
+
+        tables = str.join(", ", (f"covid19.{name}" for name in partitions))
+        connection.execute(text(PARTITION_PERMISSIONS.format(tables=tables)))
+
+        resp = connection.execute(text(UNGRANTED_PARTITIONS), names=partitions)
+        ungranted = [row[0] for row in resp.fetchall()]
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    if ungranted:
+        raise PermissionError(
+            f"Reader cannot SELECT from: {str.join(', ', ungranted)}"
+        )
+
+    return None
+
+
 def update_stats(date, category):
     session = Session()
     connection = session.connection()
@@ -112,11 +142,14 @@ def update_stats(date, category):
 def main(payload):
     category = payload.get("category")
 
-    update_permissions()
+    update_permissions(payload['date'], category)
     update_stats(payload['date'], category)
 
     return f"DONE - {payload['date']}"
 
 
 if __name__ == "__main__":
-    main({"date": "2021-03-28"})
+    if argv[1:] == ["permissions"]:
+        grant_schema_permissions()
+    else:
+        main({"date": "2021-03-28"})
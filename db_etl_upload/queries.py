@@ -0,0 +1,77 @@
+#!/usr/bin python3
+
+# Latest partition of the same type from an earlier release date.
+PREVIOUS_PARTITION = """\
+SELECT partition_name
+FROM (
+    SELECT DISTINCT
+        rr.timestamp::DATE AS release_date,
+        'time_series_p' || TO_CHAR(rr.timestamp, 'YYYY_FMMM_FMDD') || '_' || (:partition_type) AS partition_name
+    FROM covid19.release_reference AS rr
+    WHERE rr.timestamp::DATE < (:release_date)::DATE
+) AS releases
+WHERE to_regclass('covid19.' || partition_name) IS NOT NULL
+ORDER BY release_date DESC
+LIMIT 1;\
+"""
+
+
+# Digests of the payloads in a previous partition, as the MD5 of their
+# JSONB text. Only the keys and the digests are returned. A partition may
+# hold more than one release for the same date, in which case the latest
+# one is used.
+PREVIOUS_DIGESTS = """\
+SELECT DISTINCT ON (ts.area_id, ts.metric_id, ts.date)
+    ts.area_id,
+    ts.metric_id,
+    ts.date::TEXT         AS date,
+    MD5(ts.payload::TEXT) AS digest
+FROM covid19.{source_partition} AS ts
+WHERE ts.area_id = ANY((:area_ids)::INT[])
+  AND ts.metric_id = ANY((:metric_ids)::INT[])
+ORDER BY ts.area_id, ts.metric_id, ts.date, ts.release_id DESC;\
+"""
+
+
+RESTAMP_SOURCE_ROWS = """\
+SELECT DISTINCT ON (ts.area_id, ts.metric_id, ts.date)
+    ts.area_id,
+    ts.metric_id,
+    ts.date::TEXT AS date,
+    ar.area_type,
+    ar.area_code
+FROM covid19.{source_partition} AS ts
+  JOIN covid19.area_reference   AS ar ON ar.id = ts.area_id
+  JOIN covid19.metric_reference AS mr ON mr.id = ts.metric_id
+WHERE ar.area_code = :area_code
+  AND mr.metric = ANY((:metrics)::VARCHAR[])
+ORDER BY ts.area_id, ts.metric_id, ts.date, ts.release_id DESC;\
+"""
+
+
+# Copies rows from a previous partition into the current release. Only
+# the keys and the new hashes are sent - payloads never leave the database.
+BACKFILL_ROWS = """\
+INSERT INTO covid19.time_series (metric_id, area_id, partition_id, release_id, hash, date, payload)
+SELECT DISTINCT ON (ts.area_id, ts.metric_id, ts.date)
+    ts.metric_id,
+    ts.area_id,
+    :partition_id,
+    :release_id,
+    backfill.hash,
+    ts.date,
+    ts.payload
+FROM covid19.{source_partition} AS ts
+  JOIN UNNEST(
+        (:area_ids)::INT[],
+        (:metric_ids)::INT[],
+        (:dates)::DATE[],
+        (:hashes)::VARCHAR[]
+  ) AS backfill(area_id, metric_id, date, hash)
+    ON backfill.area_id = ts.area_id
+   AND backfill.metric_id = ts.metric_id
+   AND backfill.date = ts.date
+ORDER BY ts.area_id, ts.metric_id, ts.date, ts.release_id DESC
+ON CONFLICT (hash, partition_id) DO UPDATE SET payload = EXCLUDED.payload
+RETURNING release_id, partition_id, xmax = 0 AS inserted, hash;\
+"""
@@ -6,9 +6,116 @@ root_path = test_dir.parent.parent
 site.addsitedir(root_path)
 
 import unittest
-from pandas import read_csv
+from unittest.mock import patch, MagicMock
+from pandas import read_csv, DataFrame, date_range, to_datetime
+from pandas.testing import assert_frame_equal, assert_series_equal
+from numpy import NaN
 
-from db_etl_upload.uploader import  trim_sides
+from db_etl_upload import uploader
+from db_etl_upload.uploader import (
+    trim_sides, format_weekly_metrics, convert_values, convert_payloads,
+    jsonb_text, get_payload_digest, to_sql_delta, generate_row_hash
+)
+
+
+def reference_trim_sides(data):
+    # Per-metric implementation that preceded the vectorised one.
+    for metric in data.metric.dropna().unique():
+        dm = (
+            data
+            .loc[data.metric == metric, :]
+            .sort_values(["date"], ascending=True)
+        )
+
+        if not dm.payload.dropna().size:
+            continue
+
+        try:
+            cumsum = dm.payload.abs().cumsum()
+            first_nonzero = cumsum.loc[cumsum > 0].index[0]
+        except (TypeError, IndexError):
+            first_nonzero = dm.payload.first_valid_index()
+
+        try:
+            dm.loc[:first_nonzero + 1] = NaN
+        except KeyError:
+            continue
+
+        if not dm.payload.dropna().size:
+            continue
+
+        last_valid = dm.payload.last_valid_index()
+
+        if metric != "variants":
+            try:
+                dm.loc[last_valid - 1:, :] = NaN
+                data.loc[dm.index] = dm
+            except KeyError:
+                continue
+
+    return data.dropna(how="all", axis=0)
+
+
+def reference_format_weekly_metrics(df):
+    # Implementation that preceded the vectorised one.
+    extras = [
+        'weeklyPeopleVaccinatedFirstDoseByVaccinationDate',
+        'weeklyPeopleVaccinatedSecondDoseByVaccinationDate',
+        'alertLevel',
+        'transmissionRateMin',
+        'transmissionRateMax',
+        'transmissionRateGrowthRateMin',
+        'transmissionRateGrowthRateMax',
+    ]
+
+    weekly_metrics = (
+        df
+        .metric[
+            (
+                (df.metric.str.contains("weekly", case=False, regex=False)) |
+                (df.metric.isin(extras))
+            )
+        ]
+        .unique()
+    )
+
+    if not len(weekly_metrics):
+        return df
+
+    df.loc[df.metric.isin(weekly_metrics), :] = (
+        df
+        .loc[df.metric.isin(weekly_metrics), :]
+        .dropna(subset=["payload"], how="any", axis=0)
+    )
+
+    return df
+
+
+def make_long_data(values: dict) -> DataFrame:
+    """
+    Data in the shape produced by ``deploy``: sorted by date
+    in descending order, then melted into the long format.
+    """
+    size = len(next(iter(values.values())))
+
+    wide = DataFrame({
+        "area_type": "utla",
+        "area_code": "E06000001",
+        "date": date_range("2021-01-01", periods=size).strftime("%Y-%m-%d")[::-1],
+        "release_id": 1234,
+        "partition_id": "2021_1_10|utla",
+        **{metric: list(reversed(payload)) for metric, payload in values.items()}
+    })
+
+    long = wide.melt(
+        id_vars=["area_type", "area_code", "date", "release_id", "partition_id"],
+        var_name="metric",
+        value_name="payload"
+    )
+
+    long["metric_id"] = long.metric.map({metric: ind for ind, metric in enumerate(values)})
+
+    return long
 
 
 class TestLandingPageMap(unittest.TestCase):
@@ -19,13 +126,182 @@ class TestLandingPageMap(unittest.TestCase):
         return super().tearDown()
 
     def test_trim_sides(self):
-        test_data = read_csv('test_data-trim_sides.csv')
+        test_data = read_csv(test_dir.joinpath('test_data-trim_sides.csv'))
 
         output_df = trim_sides(test_data)
 
         print(f"df size: {output_df.shape}")
         assert output_df.shape == (14, 9)
 
+    def test_trim_sides_matches_reference(self):
+        cases = [
+            {
+                "newCases": [0, 0, 3, 0, 5, NaN, NaN],
+                "cumCases": [NaN, 1, 2, 3, 4, 5, NaN],
+            },
+            {
+                "newCases": [NaN, 0, 0, 0, 0, 0, NaN],
+                "alertLevel": [None, None, 1, "UP", 2, None, None],
+                "transmissionRateMin": [NaN] * 7,
+            },
+            {
+                "variants": [None, [{"value": 1}], None, [{"value": 2}], None, None, None],
+                "newDeaths28DaysByDeathDate": [0, 0, 0, 0, 0, 1, 2],
+            },
+            {
+                "newCases": [1, 2, 3, 4, 5, 6, 7],
+            },
+        ]
+
+        for values in cases:
+            with self.subTest(metrics=list(values)):
+                expected = reference_trim_sides(make_long_data(values))
+                output_df = trim_sides(make_long_data(values))
+
+                assert_frame_equal(output_df, expected)
+
+    def test_format_weekly_metrics_matches_reference(self):
+        values = {
+            "newCasesBySpecimenDate": [NaN, 1, 2, NaN, 4],
+            "newCasesWeekly": [NaN, 7, NaN, NaN, 14],
+            "weeklyPeopleVaccinatedFirstDoseByVaccinationDate": [1, NaN, NaN, 2, NaN],
+            "alertLevel": [NaN, 3, NaN, NaN, 2],
+            "transmissionRateMin": [0.8, NaN, 0.9, NaN, NaN],
+        }
+
+        expected = reference_format_weekly_metrics(make_long_data(values))
+        output_df = format_weekly_metrics(make_long_data(values))
+
+        assert_frame_equal(output_df, expected)
+
+    def test_restamp_hash_matches_deploy(self):
+        data = make_long_data({
+            "newCases": [0, 1, 2, 3],
+            "newDeaths": [NaN, 4, 5, NaN],
+        })
+
+        # As hashed by ``deploy`` - IDs are upcast by ``trim_sides``.
+        deployed = (
+            data
+            .pipe(trim_sides)
+            .pipe(lambda d: d.assign(hash=generate_row_hash(d.copy(), hash_only=True)))
+        )
+        self.assertEqual(deployed.metric_id.dtype, float)
+
+        # As read from the previous partition by ``restamp``.
+        restamped = DataFrame({
+            "area_id": 10,
+            "metric_id": deployed.metric_id.astype(int).to_numpy(),
+            "date": deployed.date.to_numpy(),
+            "area_type": deployed.area_type.to_numpy(),
+            "area_code": deployed.area_code.to_numpy(),
+        }).assign(release_id=1234)
+
+        hashes = generate_row_hash(restamped.copy(), hash_only=True)
+
+        self.assertListEqual(hashes.tolist(), deployed.hash.tolist())
+
+    def test_convert_payloads(self):
+        data = make_long_data({
+            "newCases": [1, 2, NaN],
+            "alertLevel": [None, "UP", 2],
+        })
+        data["payload"] = data.payload.where(data.payload.notnull(), None)
+
+        for payload in [data.payload, data.payload.iloc[:3].astype(float)]:
+            assert_series_equal(convert_payloads(payload), payload.map(convert_values))
+
+
+
+class TestDeltaUpsert(unittest.TestCase):
+    source_partition = "time_series_p2021_1_9_utla"
+
+    def setUp(self):
+        self.data = DataFrame({
+            "metric_id": [1, 1, 1, 2],
+            "area_id": [10, 10, 10, 10],
+            "partition_id": "2021_1_10|utla",
+            "release_id": 5,
+            "hash": ["h0", "h1", "h2", "h3"],
+            "date": to_datetime(["2021-01-01", "2021-01-02", "2021-01-03", "2021-01-01"]),
+            "payload": [{"value": 1}, {"value": 2.5}, {"value": 3}, [{"age": "0_4", "rate": 1e-05}]],
+        })
+
+        # Row 1 has changed, and row 2 is new.
+        self.previous = DataFrame({
+            "area_id": [10, 10, 10],
+            "metric_id": [1, 1, 2],
+            "date": ["2021-01-01", "2021-01-02", "2021-01-01"],
+            "digest": [
+                get_payload_digest({"value": 1}),
+                get_payload_digest({"value": 2}),
+                get_payload_digest([{"age": "0_4", "rate": 1e-05}]),
+            ]
+        })
+
+        self.sent = list()
+        self.backfilled = list()
+
+        patches = [
+            patch.object(uploader, "Session", MagicMock()),
+            patch.object(uploader, "get_previous_partition", lambda partition_id: self.source_partition),
+            patch.object(uploader, "read_sql", lambda *args, **kwargs: self.previous.copy()),
+            patch.object(uploader, "backfill", self.fake_backfill),
+            patch.object(uploader, "to_sql", self.sent.append),
+        ]
+
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_backfill(self, connection, source_partition, rows, partition_id, release_id):
+        self.assertEqual(source_partition, self.source_partition)
+        self.backfilled.append(rows)
+        return set(rows.hash)
+
+    def test_jsonb_text(self):
+        # Text of the values as returned by Postgres for ``value::JSONB::TEXT``.
+        expected = [
+            ({"value": 1}, '{"value": 1}'),
+            ({"bb": 1, "a": 2, "c": None}, '{"a": 2, "c": null, "bb": 1}'),
+            ([{"age": "0_4", "value": 1.5}], '[{"age": "0_4", "value": 1.5}]'),
+            ({"value": 1.0}, '{"value": 1.0}'),
+            ({"value": 1e-05}, '{"value": 0.00001}'),
+            ({"value": 1e16}, '{"value": 10000000000000000}'),
+            ({"value": -0.0}, '{"value": 0.0}'),
+            ({"value": True, "text": "é\n\x01\""}, '{"text": "é\\n\\u0001\\"", "value": true}'),
+        ]
+
+        for value, text in expected:
+            with self.subTest(text):
+                self.assertEqual(jsonb_text(value), text)
+
+    def test_only_changed_rows_sent(self):
+        to_sql_delta(self.data.copy())
+
+        backfilled, = self.backfilled
+        self.assertListEqual(sorted(backfilled.hash), ["h0", "h3"])
+        self.assertNotIn("payload", backfilled.columns)
+
+        sent, = self.sent
+        self.assertListEqual(sorted(sent.hash), ["h1", "h2"])
+        self.assertListEqual(list(sent.columns), list(self.data.columns))
+
+    def test_rows_not_copied_are_sent(self):
+        # Rows missing from the source partition at the time of the copy.
+        with patch.object(uploader, "backfill", lambda *args: {"h3"}):
+            to_sql_delta(self.data.copy())
+
+        sent, = self.sent
+        self.assertListEqual(sorted(sent.hash), ["h0", "h1", "h2"])
+
+    def test_no_previous_partition(self):
+        with patch.object(uploader, "get_previous_partition", lambda partition_id: None):
+            to_sql_delta(self.data.copy())
+
+        self.assertListEqual(self.backfilled, list())
+        assert_frame_equal(self.sent[0], self.data)
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
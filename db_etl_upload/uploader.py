@@ -5,34 +5,52 @@
 # Python:
 from os import getenv
 from functools import lru_cache
-from hashlib import blake2s
+from hashlib import blake2s, md5
 from io import BytesIO
 from datetime import datetime
-from json import loads
+from json import loads, dumps
+from collections import Counter
+from numbers import Number
+from typing import Iterable, Tuple, Union, NoReturn, Any, Set
+from decimal import Decimal
 import logging
 
 # 3rd party:
 from sqlalchemy.dialects.postgresql import insert, dialect as postgres
 from sqlalchemy.exc import ProgrammingError
+from sqlalchemy import literal_column, text
 
-from pandas import read_feather, to_datetime, DataFrame, read_sql
+from pandas import read_feather, to_datetime, to_numeric, DataFrame, Series, read_sql
+from pandas.api.types import is_integer_dtype, is_bool_dtype
 
-from numpy import NaN, ndarray, array_split
+from numpy import NaN, ndarray, array_split, arange, ones
 
 from azure.core.exceptions import ResourceNotFoundError
 
 # Internal:
 try:
     from __app__.storage import StorageClient
+    from __app__.utilities.schema import coerce_schema, validate_schema
+    from __app__.utilities.chunk_cache import RESTAMP_SUFFIX
+    from __app__.db_etl_upload.queries import (
+        PREVIOUS_PARTITION, PREVIOUS_DIGESTS, RESTAMP_SOURCE_ROWS, BACKFILL_ROWS
+    )
     from __app__.db_tables.covid19 import (
         Session, MainData, ReleaseReference,
-        AreaReference, MetricReference, DB_INSERT_MAX_ROWS
+        AreaReference, MetricReference, DB_INSERT_MAX_ROWS,
+        ReleasePartitionStats
     )
 except ImportError:
     from storage import StorageClient
+    from utilities.schema import coerce_schema, validate_schema
+    from utilities.chunk_cache import RESTAMP_SUFFIX
+    from db_etl_upload.queries import (
+        PREVIOUS_PARTITION, PREVIOUS_DIGESTS, RESTAMP_SOURCE_ROWS, BACKFILL_ROWS
+    )
     from db_tables.covid19 import (
         Session, MainData, ReleaseReference,
-        AreaReference, MetricReference, DB_INSERT_MAX_ROWS
+        AreaReference, MetricReference, DB_INSERT_MAX_ROWS,
+        ReleasePartitionStats
     )
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -46,48 +64,104 @@ __all__ = [
     'get_release',
     'create_partition',
     'deploy_preprocessed_long',
-    'trim_sides'
+    'trim_sides',
+    'UPSERT_RETURNING',
+    'record_upserts',
+    'restamp',
+    'upsert'
 ]
 
 RECORD_KEY = getenv("RECORD_KEY").encode()
 
+AREA_CODE_COLUMNS = ("area_code", "areaCode")
 
-def trim_sides(data):
-    for metric in data.metric.dropna().unique():
-        dm = (
-            data
-            .loc[data.metric == metric, :]
-            .sort_values(["date"], ascending=True)
-        )
+# When enabled ("1", "true" or "yes"), only rows that differ from the
+# previous release are upserted. The rest are copied from the previous
+# partition.
+DELTA_UPSERT = getenv("DELTA_UPSERT", "").lower() in ("1", "true", "yes")
 
-        if not dm.payload.dropna().size:
-            continue
 
-        try:
-            cumsum = dm.payload.abs().cumsum()
-            first_nonzero = cumsum.loc[cumsum > 0].index[0]
-        except (TypeError, IndexError):
-            first_nonzero = dm.payload.first_valid_index()
+def upcast_nullable(data: DataFrame) -> DataFrame:
+    """
+    Casts integer and boolean columns to the dtypes they take once
+    rows are set to NaN.
 
-        try:
-            dm.loc[:first_nonzero + 1] = NaN
-        except KeyError:
-            continue
+    Trimmed rows used to be set to NaN in place, which upcast these
+    columns. Row hashes are generated from the string representation
+    of the IDs, so the resulting dtypes are preserved.
+    """
+    upcast = {
+        col: float if is_integer_dtype(dtype) else object
+        for col, dtype in data.dtypes.items()
+        if is_integer_dtype(dtype) or is_bool_dtype(dtype)
+    }
 
-        if not dm.payload.dropna().size:
-            continue
+    return data.astype(upcast)
 
-        last_valid = dm.payload.last_valid_index()
 
-        # It prevents removing data from the dataframe (only for 'variants')
-        if metric != "variants":
-            try:
-                dm.loc[last_valid - 1:, :] = NaN
-                data.loc[dm.index] = dm
-            except KeyError:
-                continue
+def trim_sides(data: DataFrame) -> DataFrame:
+    """
+    Removes the leading and trailing rows of each metric in each area.
+
+    Rows dated before the first non-zero value are removed, as are rows
+    dated after the last valid value. Where the metric is not numeric,
+    or has no non-zero values, the first valid value is used instead.
+    Metrics with no valid values, and ``variants``, are left intact.
+
+    Parameters
+    ----------
+    data: DataFrame
+        Data in long format, with ``metric``, ``date`` and ``payload``
+        columns.
+
+    Returns
+    -------
+    DataFrame
+    """
+    keys = [col for col in AREA_CODE_COLUMNS if col in data.columns][:1] + ["metric"]
+
+    frame = (
+        DataFrame({
+            "position": arange(data.shape[0]),
+            "date": data.date.to_numpy(),
+            "payload": data.payload.to_numpy(),
+            **{key: data[key].array for key in keys}
+        })
+        .loc[lambda d: d.metric.notna()]
+        .sort_values("date", kind="mergesort")
+        .reset_index(drop=True)
+    )
+
+    def grouped(values: Series):
+        return values.groupby([frame[key] for key in keys], observed=True, sort=False)
+
+    payload = frame.payload
+    valid = payload.notna()
+
+    if payload.dtype == object:
+        kinds = payload.map(type)
+        is_number = kinds.isin([kind for kind in kinds.unique() if issubclass(kind, Number)])
+    else:
+        is_number = Series(True, index=payload.index)
 
-    return data.dropna(how="all", axis=0)
+    nonzero = to_numeric(payload.where(is_number), errors="coerce").abs().gt(0)
+    numeric_group = grouped(is_number).transform("all") & grouped(nonzero).transform("any")
+
+    # Rows from the first non-zero (or valid) value onwards,
+    # and up to the last valid value.
+    started = grouped(nonzero.where(numeric_group, valid)).cummax()
+    ended = grouped(valid.iloc[::-1]).cummax().iloc[::-1]
+
+    eligible = grouped(valid).transform("any") & (frame.metric != "variants")
+
+    if not eligible.any():
+        return data.dropna(how="all", axis=0)
+
+    removed = frame.position[eligible & ~(started & ended)].to_numpy()
+    keep = ones(data.shape[0], dtype=bool)
+    keep[removed] = False
+
+    return upcast_nullable(data.loc[keep]).dropna(how="all", axis=0)
 
 
 def get_area_data():
@@ -168,10 +242,13 @@ def generate_row_hash(d: DataFrame, hash_only=False, date=None) -> DataFrame:
 
     d.date = d.date.map(lambda x: x[:10])
 
-    # Create hash
+    # Create hash - IDs are hashed as floats (e.g. "7.0"), as they
+    # are upcast by ``trim_sides`` in the main deployment. Rows must
+    # hash identically whichever path they are deployed through.
     hash_key = (
         d
         .loc[:, hash_cols]
+        .astype({"metric_id": float, "release_id": float})
         .astype(str)
         .sum(axis=1)
         .apply(str.encode)
@@ -295,6 +372,63 @@ def create_partition(area_type: str, release: datetime):
         session.close()
 
 
+# Returned by upserts into ``time_series``. ``xmax`` is zero for rows
+# that did not exist before the statement.
+UPSERT_RETURNING = (
+    MainData.release_id,
+    MainData.partition_id,
+    literal_column("xmax = 0").label("inserted")
+)
+
+
+def record_upserts(connection, rows: Iterable[Tuple[int, str, bool]]):
+    """
+    Adds the number of rows inserted and updated by an upsert into
+    ``time_series`` to the counters for each release partition.
+
+    Parameters
+    ----------
+    connection
+        Connection used for the upsert.
+
+    rows: Iterable[Tuple[int, str, bool]]
+        Result of an upsert returning ``UPSERT_RETURNING``.
+
+    Returns
+    -------
+    NoReturn
+    """
+    counts = Counter(
+        (release_id, partition_id, bool(inserted))
+        for release_id, partition_id, inserted in rows
+    )
+
+    records = dict()
+    for (release_id, partition_id, inserted), total in counts.items():
+        record = records.setdefault(
+            (release_id, partition_id),
+            dict(release_id=release_id, partition_id=partition_id, inserted=0, updated=0)
+        )
+        record["inserted" if inserted else "updated"] += total
+
+    if not records:
+        return None
+
+    table = ReleasePartitionStats.__table__
+    insert_stmt = insert(table).values(list(records.values()))
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[table.c.release_id, table.c.partition_id],
+        set_={
+            table.c.inserted.name: table.c.inserted + insert_stmt.excluded.inserted,
+            table.c.updated.name: table.c.updated + insert_stmt.excluded.updated
+        }
+    )
+
+    connection.execute(stmt)
+
+    return None
+
+
 def sql_fn(row):
     return MainData(**row.to_dict())
 
@@ -323,7 +457,8 @@ def to_sql(df: DataFrame):
                 set_={MainData.payload.name: insert_stmt.excluded.payload}
             )
 
-            connection.execute(stmt)
+            result = connection.execute(stmt.returning(*UPSERT_RETURNING))
+            record_upserts(connection, result)
             session.flush()
 
     except Exception as err:
@@ -336,6 +471,125 @@ def to_sql(df: DataFrame):
     return None
 
 
+def jsonb_text(value: Any) -> str:
+    """
+    Text of ``value`` as produced by Postgres for ``JSONB``:
+
+    - object keys are ordered by their length in bytes, then by bytes
+    - items are separated by ", ", and keys by ": "
+    - numbers are written as ``NUMERIC`` - i.e. in positional notation
+      and with no negative zero
+
+    A discrepancy only causes a row to be treated as changed.
+    """
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: (len(item[0].encode()), item[0].encode()))
+        content = ", ".join(f"{dumps(key, ensure_ascii=False)}: {jsonb_text(val)}" for key, val in items)
+        return "{" + content + "}"
+
+    if isinstance(value, (list, tuple, ndarray)):
+        return "[" + ", ".join(map(jsonb_text, value)) + "]"
+
+    if hasattr(value, "item"):
+        value = value.item()
+
+    if isinstance(value, float):
+        number = Decimal(repr(value))
+        return format(abs(number) if number.is_zero() else number, "f")
+
+    return dumps(value, ensure_ascii=False)
+
+
+def get_payload_digest(value: Any) -> str:
+    return md5(jsonb_text(value).encode()).hexdigest()
+
+
+def to_sql_delta(df: DataFrame):
+    """
+    Upserts the data into ``time_series``, only sending the rows that
+    are new or have changed since the previous release. Unchanged rows
+    are copied from the partition of the previous release within the
+    database.
+
+    Rows are matched by area, metric and date, and compared by the
+    MD5 digest of their payload as JSONB text. Digests of the previous
+    release are computed in the database, and only they and the keys
+    of the rows are retrieved.
+
+    Parameters
+    ----------
+    df: DataFrame
+        Data, as passed to ``to_sql``.
+
+    Returns
+    -------
+    NoReturn
+    """
+    if df.size == 0:
+        return None
+
+    partition_id = df.partition_id.iloc[0]
+    release_id = df.release_id.iloc[0]
+
+    source_partition = get_previous_partition(partition_id)
+    if source_partition is None:
+        return to_sql(df)
+
+    df = (
+        df
+        .drop_duplicates(["release_id", "area_id", "metric_id", "date"], keep="first")
+        .reset_index(drop=True)
+    )
+
+    keys = df.loc[:, ["area_id", "metric_id", "hash"]].assign(
+        date=df.date.astype(str).str[:10],
+        digest=df.payload.map(get_payload_digest)
+    )
+
+    session = Session()
+    connection = session.connection()
+    try:
+        previous = read_sql(
+            text(PREVIOUS_DIGESTS.format(source_partition=source_partition)),
+            con=connection,
+            params=dict(
+                area_ids=df.area_id.astype(int).unique().tolist(),
+                metric_ids=df.metric_id.astype(int).unique().tolist()
+            )
+        )
+
+        unchanged = keys.merge(
+            previous.astype({"area_id": keys.area_id.dtype, "metric_id": keys.metric_id.dtype}),
+            on=["area_id", "metric_id", "date", "digest"],
+            how="inner"
+        )
+
+        copied = backfill(connection, source_partition, unchanged, partition_id, release_id)
+        session.flush()
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    logging.info(
+        f"Delta upsert: {len(copied)} of {df.shape[0]} rows "
+        f"copied from '{source_partition}'"
+    )
+
+    # Rows that could not be copied are sent in full.
+    to_sql(df.loc[~df.hash.isin(copied)].copy())
+
+    return None
+
+
+def upsert(df: DataFrame):
+    if DELTA_UPSERT:
+        return to_sql_delta(df)
+
+    return to_sql(df)
+
+
 def validate_metrics(dt):
     metrics = get_metrics()
 
@@ -362,7 +616,7 @@ def deploy_nested(df, key):
             dt.dropna(subset=["payload"], inplace=True)
             dt.payload = dt.payload.map(lambda x: list(x) if not isinstance(x, dict) else list())
 
-            to_sql(
+            upsert(
                 dt
                 .assign(metric=key)
                 .join(get_area_data(), on=["area_type", "area_code"])
@@ -399,7 +653,7 @@ def deploy_preprocessed_long(df):
     DataFrame
         Processed dataframe
     """
-    to_sql(
+    upsert(
         df
         .join(get_area_data(), on=["area_type", "area_code"])
         .pipe(validate_metrics)
@@ -413,7 +667,7 @@ def deploy_preprocessed_long(df):
 def deploy_preprocessed(df, key):
     df.loc[:, key] = df.loc[:, key].map(list)
 
-    to_sql(
+    upsert(
         df
         .rename(columns={key: "payload"})
         .assign(metric=key)
@@ -442,6 +696,9 @@ def convert_timestamp(dt: DataFrame, timestamp):
 
 
 def format_weekly_metrics(df: DataFrame) -> DataFrame:
+    """
+    Clears the rows of weekly metrics that have no payload.
+    """
     extras = [
         'weeklyPeopleVaccinatedFirstDoseByVaccinationDate',
         'weeklyPeopleVaccinatedSecondDoseByVaccinationDate',
@@ -452,25 +709,16 @@ def format_weekly_metrics(df: DataFrame) -> DataFrame:
         'transmissionRateGrowthRateMax',
     ]
 
-    weekly_metrics = (
-        df
-        .metric[
-            (
-                (df.metric.str.contains("weekly", case=False, regex=False)) |
-                (df.metric.isin(extras))
-            )
-        ]
-        .unique()
+    weekly = (
+        df.metric.str.contains("weekly", case=False, regex=False) |
+        df.metric.isin(extras)
     )
 
-    if not len(weekly_metrics):
-        return df
+    empty = weekly & df.payload.isna()
 
-    df.loc[df.metric.isin(weekly_metrics), :] = (
-        df
-        .loc[df.metric.isin(weekly_metrics), :]
-        .dropna(subset=["payload"], how="any", axis=0)
-    )
+    if empty.any():
+        df = upcast_nullable(df)
+        df.loc[empty, :] = NaN
 
     return df
 
@@ -508,6 +756,21 @@ def convert_values(value):
     return value
 
 
+def convert_payloads(payload: Series) -> Series:
+    """
+    Applies ``convert_values`` to a payload column. Numeric columns
+    only contain scalars, so they are wrapped without type checks.
+    """
+    values = payload.to_numpy(dtype=object)
+
+    if payload.dtype != object:
+        converted = [{"value": value} for value in values]
+    else:
+        converted = [convert_values(value) for value in values]
+
+    return Series(converted, index=payload.index, name=payload.name, dtype=object)
+
+
 def confirm_or_create_area(area_type: str, area_code: str, area_name: str):
     stmt = (
         insert(AreaReference.__table__)
@@ -616,6 +879,8 @@ def deploy(fp: BytesIO, timestamp: datetime, area_type: str,
                 var_name="metric",
                 value_name="payload"
             )
+            .pipe(coerce_schema)
+            .pipe(validate_schema, stage="melt")
             .pipe(validate_metrics)
             .pipe(trim_sides)
             .pipe(format_weekly_metrics)
@@ -623,7 +888,7 @@ def deploy(fp: BytesIO, timestamp: datetime, area_type: str,
 
         # d.payload.replace({"UP": 1, "DOWN": -1, "SAME": 0}, inplace=True)
         d.payload = d.payload.where(d.payload.notnull(), None)
-        d.payload = d.payload.map(convert_values)
+        d.payload = convert_payloads(d.payload)
 
         unique_metrics = d.loc[:, "metric"].unique()
         for metric_name in ["maleCases", "femaleCases"]:
@@ -636,7 +901,7 @@ def deploy(fp: BytesIO, timestamp: datetime, area_type: str,
                 .map(lambda x: x if isinstance(x, list) else list())
             )
 
-        to_sql(
+        upsert(
             d
             .dropna(
                 subset=["metric", "area_type", "area_code", "release_id", "date"],
@@ -655,6 +920,134 @@ def deploy(fp: BytesIO, timestamp: datetime, area_type: str,
         raise e
 
 
+def get_previous_partition(partition_id: str) -> Union[str, None]:
+    """
+    Name of the latest partition of the same type as ``partition_id``
+    from an earlier release date, or ``None`` if there isn't one.
+    """
+    release_date, partition_type = partition_id.split("|")
+
+    session = Session()
+    try:
+        result = session.execute(
+            text(PREVIOUS_PARTITION),
+            dict(
+                release_date=f"{datetime.strptime(release_date, '%Y_%m_%d'):%Y-%m-%d}",
+                partition_type=partition_type
+            )
+        )
+        partition = result.scalar()
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    return partition
+
+
+def backfill(connection, source_partition: str, rows: DataFrame,
+             partition_id: str, release_id: int) -> Set[str]:
+    """
+    Copies rows from a previous partition into the current release
+    within the database.
+
+    Parameters
+    ----------
+    connection
+        Connection used for the upsert.
+
+    source_partition: str
+        Name of the partition from which the rows are copied.
+
+    rows: DataFrame
+        Keys of the rows to copy (``area_id``, ``metric_id`` and ``date``),
+        and their ``hash`` in the current release.
+
+    partition_id: str
+        Partition ID of the current release.
+
+    release_id: int
+        ID of the current release.
+
+    Returns
+    -------
+    Set[str]
+        Hashes of the rows that were copied.
+    """
+    if not rows.size:
+        return set()
+
+    result = connection.execute(
+        text(BACKFILL_ROWS.format(source_partition=source_partition)),
+        partition_id=partition_id,
+        release_id=int(release_id),
+        area_ids=rows.area_id.astype(int).tolist(),
+        metric_ids=rows.metric_id.astype(int).tolist(),
+        dates=rows.date.astype(str).str[:10].tolist(),
+        hashes=rows.hash.tolist()
+    ).fetchall()
+
+    record_upserts(connection, (row[:3] for row in result))
+
+    return {row.hash for row in result}
+
+
+def restamp(marker: dict, timestamp: datetime, area_type: str) -> int:
+    """
+    Copies the rows of an unchanged chunk from the partition of the
+    release in which it was last deployed into the current release.
+
+    Payloads are copied within the database. Only the row hashes,
+    which depend on the release, are computed here.
+
+    Parameters
+    ----------
+    marker: dict
+        Cache entry of the chunk, as stored by the processor.
+
+    timestamp: datetime
+        Release timestamp.
+
+    area_type: str
+        Area type, as used for the partition.
+
+    Returns
+    -------
+    int
+        Number of rows copied.
+    """
+    source_release = datetime.fromisoformat(marker["timestamp"][:26])
+    source_partition = "time_series_p" + get_partition_id(area_type, source_release).replace("|", "_")
+    partition_id = get_partition_id(area_type=area_type, release=timestamp)
+    release_id = get_release(timestamp.isoformat() + "Z")
+
+    session = Session()
+    connection = session.connection()
+    try:
+        rows = read_sql(
+            text(RESTAMP_SOURCE_ROWS.format(source_partition=source_partition)),
+            con=connection,
+            params=dict(area_code=marker["area_code"], metrics=marker["metrics"])
+        )
+
+        if not rows.size:
+            return 0
+
+        rows = rows.assign(release_id=release_id)
+        rows = rows.assign(hash=generate_row_hash(rows.copy(), hash_only=True))
+
+        copied = backfill(connection, source_partition, rows, partition_id, release_id)
+        session.flush()
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    return len(copied)
+
+
 def download_file(container: str, path: str) -> BytesIO:
     logging.info(f"> Downloading data from '{container}/{path}'")
 
@@ -693,6 +1086,17 @@ def main(payload: dict):
 
     create_partition(area_type=area_type, release=timestamp)
 
+    if filepath.endswith(RESTAMP_SUFFIX):
+        marker = loads(download_file(container, filepath).read())
+
+        if restamp(marker, timestamp, area_type):
+            return f"RESTAMPED: {filepath} | {payload['timestamp']}"
+
+        # Rows are missing from the previous release, so the
+        # cached output must be deployed in full.
+        logging.warning(f"Nothing to restamp for '{filepath}' - deploying '{marker['output_path']}'")
+        filepath = marker["output_path"]
+
     try:
         fp = download_file(container, filepath)
     except ResourceNotFoundError:
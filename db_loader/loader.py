@@ -4,12 +4,13 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 import logging
-from typing import NoReturn
+from typing import NoReturn, Dict, Any
 from os import getenv
 from gzip import decompress
-from asyncio import get_event_loop
-from datetime import datetime
-from sqlalchemy.dialects.postgresql import insert, dialect as postgres
+from hashlib import sha256
+from io import BytesIO
+from uuid import uuid4
+from asyncio import get_event_loop, gather, Semaphore
 
 # 3rd party:
 from orjson import loads
@@ -18,10 +19,10 @@ from azure.functions import InputStream
 # Internal:
 try:
     from __app__.database.postgres import Connection
-    from __app__.db_tables import covid19 as db
+    from __app__.storage import AsyncStorageClient
 except ImportError:
     from database.postgres import Connection
-    from db_tables import covid19 as db
+    from storage import AsyncStorageClient
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -32,138 +33,125 @@ __all__ = [
 
 ENVIRONMENT = getenv("API_ENV")
 
-TEMP_TABLE = "CREATE TEMPORARY TABLE {table_name}_temp ({table_struct})"
+# Maximum number of parts (and connections) restored at once.
+MAX_CONCURRENT_PARTS = 4
 
-# UPSERT = """\
-# INSERT INTO {table_name} ({column_names})
-# VALUES
-#     ({column_values})
-# ON CONFLICT ({primary_keys})
-#     DO UPDATE
-#         SET {updates}
-#     WHERE {passed_rows}\
-# """
+STAGING_TABLE = "CREATE UNLOGGED TABLE {staging_table} ({table_struct});"
+
+DROP_STAGING_TABLE = "DROP TABLE IF EXISTS {staging_table};"
 
 
 UPSERT = """\
 INSERT INTO {table_name} ({column_names})
-    SELECT * FROM {temp_table_name}_temp
+    SELECT {column_names} FROM {staging_table}
 ON CONFLICT ({primary_keys})
     DO UPDATE
         SET {updates}
-    WHERE {passed_rows}\
+    WHERE {passed_rows};\
 """
 
-modeled_data = {
-    'covid19.tag': db.Tag,
-    'covid19.metric_tag': db.MetricTag,
-    'covid19.page': db.Page,
-    'covid19.announcement': db.Announcement,
-    'covid19.metric_asset': db.MetricAsset,
-    'covid19.metric_asset_to_metric': db.MetricAssetToMetric,
-}
-
-
-async def main(blob: InputStream) -> NoReturn:
-    logging.info(f"--- Function triggered by a blob event. Starting the process...")
 
-    if ENVIRONMENT == "PRODUCTION":
-        return
+UPSERT_NO_UPDATE = """\
+INSERT INTO {table_name} ({column_names})
+    SELECT {column_names} FROM {staging_table}
+ON CONFLICT ({primary_keys}) DO NOTHING;\
+"""
 
-    blob_payload = blob.read()
-    payload = loads(decompress(blob_payload))
 
-    temp_table_struct = [
-        f'"{name}" {dtype}'
-        for name, dtype in payload['columns'].items()
+def get_upsert_statement(manifest: Dict[str, Any], staging_table: str) -> str:
+    non_pk_columns = [
+        col for col in manifest['columns']
+        if col not in manifest['primary_keys']
     ]
 
-    temp_table_name = payload['table_name'].split(".")[1]
+    escaped_columns = [f'"{col}"' for col in manifest['columns']]
+    escaped_pks = [f'"{col}"' for col in manifest['primary_keys']]
 
-    temp_table_query = TEMP_TABLE.format(
-        table_name=temp_table_name,
-        table_struct=str.join(", ", temp_table_struct)
-    )
+    if not non_pk_columns:
+        return UPSERT_NO_UPDATE.format(
+            table_name=manifest['table_name'],
+            staging_table=staging_table,
+            column_names=str.join(", ", escaped_columns),
+            primary_keys=str.join(", ", escaped_pks)
+        )
 
-    updates = [
-        f'"{col}"=EXCLUDED."{col}"'
-        for col in payload['columns']
-        if col not in payload['primary_keys']
-    ]
+    updates = [f'"{col}"=EXCLUDED."{col}"' for col in non_pk_columns]
 
     passed_rows = [
-        f'{payload["table_name"]}."{col}" <> EXCLUDED."{col}"'
-        for col in payload['columns']
-        if col not in payload['primary_keys']
+        f'{manifest["table_name"]}."{col}" IS DISTINCT FROM EXCLUDED."{col}"'
+        for col in non_pk_columns
     ]
 
-    escaped_columns = [f'"{col}"' for col in payload['columns']]
-    escaped_pks = [f'"{col}"' for col in payload['primary_keys']]
-
-    upsert_statement = UPSERT.format(
-        table_name=payload['table_name'],
-        temp_table_name=temp_table_name,
+    return UPSERT.format(
+        table_name=manifest['table_name'],
+        staging_table=staging_table,
         column_names=str.join(", ", escaped_columns),
         primary_keys=str.join(", ", escaped_pks),
         updates=str.join(", ", updates),
         passed_rows=str.join(" OR ", passed_rows)
     )
 
-    for column, dtype in payload['columns'].items():
-        if "time" not in dtype and "date" not in dtype:
-            continue
 
-        for item in payload['data']:
-            if item[column] is None:
-                continue
+async def restore_part(part: Dict[str, Any], staging_table: str, semaphore: Semaphore):
+    schema_name, table_name = staging_table.split(".")
 
-            item[column] = datetime.fromisoformat(item[column])
+    async with semaphore:
+        async with AsyncStorageClient(container="migrations", path=part['path']) as blob_cli:
+            download = await blob_cli.download()
+            payload = decompress(await download.readall())
 
-    if (table_name := payload['table_name']) in modeled_data:
-        table = modeled_data[table_name]
-        session = db.Session()
-        conn = session.connection()
-        try:
-            insert_stmt = (
-                insert(table.__table__)
-                .values(payload['data'])
-            )
+        if sha256(payload).hexdigest() != part['checksum']:
+            raise IOError(f"Checksum mismatch for '{part['path']}'")
 
-            index_elms = [getattr(table, col) for col in payload['primary_keys']]
+        async with Connection() as db_client:
+            await db_client.copy_to_table(
+                table_name,
+                schema_name=schema_name,
+                source=BytesIO(payload),
+                format="binary"
+            )
 
-            set_data = {
-                getattr(table, col).name: getattr(insert_stmt.excluded, col)
-                for col in payload['columns']
-                if col not in payload['primary_keys']
-            }
+    logging.info(f">> Restored {part['rows']} rows from '{part['path']}'")
 
-            stmt = insert_stmt.on_conflict_do_update(
-                index_elements=index_elms,
-                set_=set_data if len(set_data) else {
-                    getattr(table, col).name: getattr(insert_stmt.excluded, col)
-                    for col in payload['columns']
-                }
-            )
 
-            conn.execute(stmt)
-            session.flush()
-        except Exception as err:
-            session.rollback()
-            raise err
-        finally:
-            session.close()
+async def main(blob: InputStream) -> NoReturn:
+    logging.info(f"--- Function triggered by a blob event. Starting the process...")
 
+    if ENVIRONMENT == "PRODUCTION":
         return
 
-    async with Connection() as db_client, db_client.transaction(isolation='serializable'):
-        await db_client.execute(temp_table_query)
+    manifest = loads(decompress(blob.read()))
 
-        await db_client.copy_records_to_table(
-            f"{temp_table_name}_temp",
-            records=[tuple(item.values()) for item in payload['data']]
-        )
+    # Parts are copied through separate connections, so the staging
+    # table cannot be temporary. It is unique to the run instead, so
+    # that concurrent restores of a table do not clash.
+    staging_table = f"{manifest['table_name']}_restore_{uuid4().hex[:12]}"
+
+    table_struct = [
+        f'"{name}" {dtype}'
+        for name, dtype in manifest['columns'].items()
+    ]
 
-        await db_client.execute(upsert_statement)
+    async with Connection() as db_client:
+        await db_client.execute(STAGING_TABLE.format(
+            staging_table=staging_table,
+            table_struct=str.join(", ", table_struct)
+        ))
+
+    try:
+        semaphore = Semaphore(MAX_CONCURRENT_PARTS)
+        await gather(*(
+            restore_part(part, staging_table, semaphore)
+            for part in manifest['parts']
+        ))
+
+        async with Connection() as db_client, db_client.transaction(isolation='serializable'):
+            await db_client.execute(get_upsert_statement(manifest, staging_table))
+    finally:
+        async with Connection() as db_client:
+            await db_client.execute(DROP_STAGING_TABLE.format(staging_table=staging_table))
+
+    logging.info(f">> Restored {manifest['row_count']} rows into '{manifest['table_name']}'")
 
 
 if __name__ == "__main__":
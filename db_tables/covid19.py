@@ -15,10 +15,10 @@ from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy import (
     Column, DATE, VARCHAR, BOOLEAN, TEXT, Enum,
     PrimaryKeyConstraint, TIMESTAMP, UniqueConstraint,
-    ForeignKey, INTEGER, CHAR, TypeDecorator
+    ForeignKey, INTEGER, BIGINT, SMALLINT, FLOAT, CHAR, TypeDecorator
 )
 from sqlalchemy.dialects.postgresql.json import JSONB
-from sqlalchemy.dialects.postgresql import UUID as PostgresUUID, NUMERIC
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID, NUMERIC, ARRAY
 
 # Internal:
 
@@ -42,7 +42,9 @@ __all__ = [
     'PrivateReport',
     'Despatch',
     'DespatchToRelease',
-    'ReportRecipient'
+    'ReportRecipient',
+    'ReleasePartitionStats',
+    'ReleaseTimingSummary'
 ]
 
 DB_INSERT_MAX_ROWS = 8_000
@@ -404,3 +406,42 @@ class ReportRecipient(base):
     deactivated = Column("deactivated", BOOLEAN(), nullable=False, default=False)
 
     __table_args__ = {'schema': 'covid19'}
+
+
+class ReleasePartitionStats(base):
+    __tablename__ = "release_partition_stats"
+
+    release_id = Column(
+        "release_id",
+        INTEGER(),
+        ForeignKey(
+            'covid19.release_reference.id',
+            ondelete="CASCADE"
+        ),
+        nullable=False
+    )
+    partition_id = Column("partition_id", VARCHAR(26), nullable=False)
+    inserted = Column("inserted", BIGINT(), nullable=False, default=0)
+    updated = Column("updated", BIGINT(), nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint(release_id, partition_id),
+        {'schema': 'covid19'}
+    )
+
+
+class ReleaseTimingSummary(base):
+    __tablename__ = "release_timing_summary"
+
+    category = Column("category", release_categories, nullable=False, primary_key=True)
+    release_date = Column("release_date", DATE(), nullable=False)
+    minutes = Column("minutes", ARRAY(SMALLINT()), nullable=False)
+    q1 = Column("q1", FLOAT(), nullable=False)
+    median = Column("median", FLOAT(), nullable=False)
+    q3 = Column("q3", FLOAT(), nullable=False)
+    whislo = Column("whislo", FLOAT(), nullable=False)
+    whishi = Column("whishi", FLOAT(), nullable=False)
+    fliers = Column("fliers", ARRAY(SMALLINT()), nullable=False)
+    rendered = Column("rendered", TIMESTAMP(), nullable=True)
+
+    __table_args__ = {'schema': 'covid19'}
@@ -56,6 +56,19 @@ def main(context: DurableOrchestrationContext):
 
     trigger_data = loads(trigger_payload)
 
+    # The release is resolved and the data used by the workers
+    # are extracted once, before they are all triggered.
+    context.set_custom_status("Extracting release data.")
+
+    release = yield context.call_activity_with_retry(
+        "despatch_ops_workers",
+        retry_options=retry_options,
+        input_={
+            "handler": "release_data",
+            "payload": {"timestamp": trigger_data["timestamp"]}
+        }
+    )
+
     devices = [Device.desktop, Device.mobile]
     area_types = ["utla", "ltla", "msoa"]
 
@@ -69,7 +82,8 @@ def main(context: DurableOrchestrationContext):
                 "payload": {
                     "area_type": area_type,
                     "device": device,
-                    "timestamp": trigger_data["timestamp"]
+                    "timestamp": trigger_data["timestamp"],
+                    "data_version": release["data_version"]
                 }
             }
         )
@@ -87,21 +101,17 @@ def main(context: DurableOrchestrationContext):
 
     tasks.append(task)
 
-    area_types = ["nation", "region", "utla", "ltla", "msoa"]
-    for area_type in area_types:
-        task = context.call_activity_with_retry(
-            "despatch_ops_workers",
-            retry_options=retry_options,
-            input_={
-                "handler": "map_percentiles",
-                "payload": {
-                    "area_type": area_type,
-                    "timestamp": trigger_data["timestamp"]
-                }
-            }
-        )
+    # Percentiles for all area types are generated together.
+    task = context.call_activity_with_retry(
+        "despatch_ops_workers",
+        retry_options=retry_options,
+        input_={
+            "handler": "map_percentiles",
+            "payload": {"timestamp": trigger_data["timestamp"]}
+        }
+    )
 
-        tasks.append(task)
+    tasks.append(task)
 
     task = context.call_activity_with_retry(
         "despatch_ops_workers",
@@ -120,7 +130,10 @@ def main(context: DurableOrchestrationContext):
         retry_options=retry_options,
         input_={
             "handler": "og_images",
-            "payload": {"timestamp": trigger_data["timestamp"]}
+            "payload": {
+                "timestamp": trigger_data["timestamp"],
+                "data_version": release["data_version"]
+            }
         }
     )
     tasks.append(task)
@@ -140,7 +153,10 @@ def main(context: DurableOrchestrationContext):
         retry_options=retry_options,
         input_={
             "handler": "landing_page_map",
-            "payload": {"timestamp": trigger_data["timestamp"]}
+            "payload": {
+                "timestamp": trigger_data["timestamp"],
+                "data_version": release["data_version"]
+            }
         }
     )
     tasks.append(task)
@@ -3,18 +3,19 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
+import logging
 
 # 3rd party:
-from orjson import dumps
+from orjson import dumps, loads
 from sqlalchemy import text
 
 # Internal:
 try:
-    from __app__.storage import StorageClient
+    from __app__.utilities.incremental import IncrementalAsset, fingerprint
     from .variables import PARAMETERS
     from __app__.db_tables.covid19 import Session
 except ImportError:
-    from storage import StorageClient
+    from utilities.incremental import IncrementalAsset, fingerprint
     from db_tables.covid19 import Session
     from despatch_ops_workers.archive_dates.variables import PARAMETERS
     from database.postgres import Connection
@@ -26,30 +27,23 @@ __all__ = [
 ]
 
 
-def store_data(geo_data, container, path):
-    payload = dumps(geo_data).decode().replace("NaN", "null")
+STORAGE_KWS = dict(
+    content_type="application/json; charset=utf-8",
+    cache_control="public, stale-while-revalidate=60, max-age=90",
+    compressed=False,
+    content_language=None
+)
 
-    with StorageClient(
-            container=container,
-            path=path,
-            content_type="application/json; charset=utf-8",
-            cache_control="public, stale-while-revalidate=60, max-age=90",
-            compressed=False,
-            content_language=None
-    ) as cli:
-        cli.upload(payload)
 
+def serialise(data) -> str:
+    return dumps(data).decode().replace("NaN", "null")
 
-def create_asset(data_type):
-    params = PARAMETERS[data_type]
 
+def execute_query(query, **params):
     session = Session()
     conn = session.connection()
     try:
-        resp = conn.execute(
-            text(params["query"]),
-            process_name=params["process_name"]
-        )
+        resp = conn.execute(text(query), **params)
         raw_data = resp.fetchall()
     except Exception as err:
         session.rollback()
@@ -57,7 +51,52 @@ def create_asset(data_type):
     finally:
         session.close()
 
-    store_data(dict(raw_data), params['container'], params['path'])
+    return raw_data
+
+
+def get_dates(params, asset: IncrementalAsset, data_type: str, total: int):
+    previous = asset.get_metadata(data_type)
+
+    if previous.get("latest") is not None:
+        # Releases are appended to the dates, which
+        # are ordered by descending timestamp.
+        new_releases = execute_query(
+            params["since_query"],
+            process_name=params["process_name"],
+            latest=previous["latest"]
+        )
+
+        if previous["total"] + len(new_releases) == total:
+            return dict([
+                *new_releases,
+                *loads(asset.load_section(data_type)).items()
+            ])
+
+    raw_data = execute_query(params["query"], process_name=params["process_name"])
+
+    return dict(raw_data)
+
+
+def create_asset(data_type):
+    params = PARAMETERS[data_type]
+    asset = IncrementalAsset(f"archive_dates_{data_type.lower()}")
+
+    (total, latest), = execute_query(
+        params["fingerprint_query"],
+        process_name=params["process_name"]
+    )
+
+    source = fingerprint(params["process_name"], total, latest)
+
+    if asset.is_current(data_type, source) and asset.is_published(params["path"]):
+        logging.info(f"Archive dates '{data_type}' are unchanged")
+        return None
+
+    payload = serialise(get_dates(params, asset, data_type, total))
+
+    asset.save_section(data_type, source, payload, total=total, latest=latest)
+    asset.publish(params['path'], payload, container=params['container'], **STORAGE_KWS)
+    asset.commit()
 
 
 def generate_archive_dates(payload):
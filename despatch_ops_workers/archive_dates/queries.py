@@ -18,3 +18,25 @@ WHERE rr.released IS TRUE
   AND rc.process_name = :process_name  -- Process name (MAIN, MSOA, ...)
 ORDER BY rr.timestamp DESC;\
 """
+
+
+# Cheap summary of the releases, with which
+# the dates are regenerated only when changed.
+MAIN_FINGERPRINT = """\
+SELECT COUNT(*) AS total, MAX(rr.timestamp)::TEXT AS latest
+FROM covid19.release_reference AS rr
+LEFT JOIN covid19.release_category AS rc ON rr.id = rc.release_id 
+WHERE rr.released IS TRUE
+  AND rc.process_name = :process_name;  -- Process name (MAIN, MSOA, ...)\
+"""
+
+
+MAIN_SINCE = """\
+SELECT timestamp::DATE::TEXT AS date, timestamp::TEXT AS timestamp
+FROM covid19.release_reference AS rr
+LEFT JOIN covid19.release_category AS rc ON rr.id = rc.release_id 
+WHERE rr.released IS TRUE
+  AND rc.process_name = :process_name  -- Process name (MAIN, MSOA, ...)
+  AND rr.timestamp > (:latest)::TIMESTAMP
+ORDER BY rr.timestamp DESC;\
+"""
@@ -8,9 +8,9 @@
 
 # Internal: 
 try:
-    from .queries import MAIN
+    from .queries import MAIN, MAIN_FINGERPRINT, MAIN_SINCE
 except ImportError:
-    from despatch_ops_workers.archive_dates.queries import MAIN
+    from despatch_ops_workers.archive_dates.queries import MAIN, MAIN_FINGERPRINT, MAIN_SINCE
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -22,6 +22,8 @@ __all__ = [
 PARAMETERS = {
     'MAIN': {
         'query': MAIN,
+        'fingerprint_query': MAIN_FINGERPRINT,
+        'since_query': MAIN_SINCE,
         'process_name': "MAIN",
         'container': "publicdata",
         'path': "assets/dispatch/dates.json"
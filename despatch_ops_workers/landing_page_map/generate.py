@@ -3,23 +3,31 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
+from typing import Union
 
 # 3rd party:
 from requests import get
-from plotly import express as px, graph_objects as go
-from sqlalchemy import text
+from plotly import graph_objects as go
 from pandas import DataFrame, cut
+from orjson import loads
 
 # Internal:
 try:
     from __app__.storage import StorageClient
-    from __app__.db_tables.covid19 import Session
-    from .queries import MAIN
+    from __app__.utilities.release_data import get_release_data
+    from .renderer import MapRenderer
+    from .variables import GEOJSON_ASSET, STYLE_ASSET, OUTPUTS
+    from ..utils.utilities import get_versioned_asset
 except ImportError:
     from storage import StorageClient
-    from db_tables.covid19 import Session
-    from despatch_ops_workers.landing_page_map.queries import MAIN
+    from utilities.release_data import get_release_data
+    from despatch_ops_workers.landing_page_map.renderer import MapRenderer
+    from despatch_ops_workers.landing_page_map.variables import (
+        GEOJSON_ASSET, STYLE_ASSET, OUTPUTS
+    )
+    from despatch_ops_workers.utils.utilities import get_versioned_asset
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -29,6 +37,9 @@ __all__ = [
 ]
 
 
+# Days between the release and the date shown on the map.
+DATA_LAG = 5
+
 LAYOUT = go.Layout(
     paper_bgcolor='rgba(0,0,0,0)',
     plot_bgcolor='rgba(0,0,0,0)',
@@ -59,15 +70,6 @@ LAYOUT = go.Layout(
 )
 
 
-figure_kws = dict(
-    locations="areaCode",
-    featureidkey="properties.code",
-    color="categories",
-    mapbox_style="white-bg",
-    zoom=4.75,
-    center={"lat": 54.4, "lon": -3}
-)
-
 colour_scales = [
     "#e0e543",  # [0 , 10)
     "#74bb68",  # [10 , 50)
@@ -80,21 +82,59 @@ colour_scales = [
 ]
 
 
+_renderer: Union[MapRenderer, None] = None
+
+
+def download_asset(url: str) -> bytes:
+    response = get(url)
+    # Error responses must not be cached as the asset.
+    response.raise_for_status()
+
+    return response.content
+
+
+def get_asset(asset: dict) -> dict:
+    payload = get_versioned_asset(
+        name=asset["name"],
+        version=asset["version"],
+        loader=lambda: download_asset(asset["url"])
+    )
+
+    return loads(payload)
+
+
 def get_geojson() -> dict:
-    geojson = get("https://coronavirus.data.gov.uk/downloads/maps/utla-ref.geojson").json()
-    return geojson
+    return get_asset(GEOJSON_ASSET)
 
 
 def get_style() -> dict:
-    style = get("https://coronavirus.data.gov.uk/public/assets/geo/style_v4.json").json()
+    style = get_asset(STYLE_ASSET)
     style['layers'] = []
     return style
 
 
-def store_image(image: bytes):
+def get_renderer() -> MapRenderer:
+    """
+    Returns the warm renderer of the worker, creating it on first use.
+    """
+    global _renderer
+
+    if _renderer is None:
+        _renderer = MapRenderer(
+            geojson=get_geojson(),
+            style=get_style(),
+            colours=colour_scales,
+            layout=LAYOUT
+        )
+
+    return _renderer
+
+
+def store_image(image: bytes, container: str = "publicdata",
+                path: str = "assets/frontpage/images/map.png"):
     with StorageClient(
-            container="publicdata",
-            path=f"assets/frontpage/images/map.png",
+            container=container,
+            path=path,
             content_type="image/png",
             cache_control="max-age=300, stale-while-revalidate=30",
             content_language=None,
@@ -103,12 +143,13 @@ def store_image(image: bytes):
         client.upload(image)
 
 
-def get_colour_scale_binning(df: DataFrame):
+def get_colour_scale_binning(df: DataFrame, metric: str = "newCasesBySpecimenDateRollingRate"):
     """
     This reduces the original colour_scale_binning list according to the data (df).
 
     param df: pandas dataframe with all the values from DB - needed to calculate
               the max of all vlues
+    param metric: name of the column containing the values
     return: colour_scale_binning sliced list
     rtype: list
     """
@@ -126,7 +167,7 @@ def get_colour_scale_binning(df: DataFrame):
         10000
     ]
 
-    max_value = max(df['newCasesBySpecimenDateRollingRate'])
+    max_value = max(df[metric])
 
     # filtered_items contains elements of colour_scale_binning
     # that are smaller than max_value
@@ -137,95 +178,68 @@ def get_colour_scale_binning(df: DataFrame):
     return colour_scale_binning[:len(filtered_items) + 1]
 
 
-def plot_map(data: DataFrame):
-    geojson = get_geojson()
-    geo_style = get_style()
-
-    colour_scale_binning = get_colour_scale_binning(data)
+def plot_map(data: DataFrame, metric: str = "newCasesBySpecimenDateRollingRate"):
+    colour_scale_binning = get_colour_scale_binning(data, metric)
 
     data = data.assign(
         categories=cut(
-            data["newCasesBySpecimenDateRollingRate"],
+            data[metric],
             bins=colour_scale_binning,
-            labels=list(map(str, colour_scale_binning[:-1]))
+            labels=False
         )
     ).dropna(axis=0, how='any')
 
-    fig = px.choropleth_mapbox(
-        data,
-        geojson=geojson,
-        color_discrete_map=dict(zip(map(str, colour_scale_binning), colour_scales)),
-        **figure_kws
+    renderer = get_renderer()
+    image = renderer.render(
+        locations=data["areaCode"],
+        bins=data["categories"].astype(int)
     )
 
-    fig.update_geos(fitbounds="locations", resolution=110)
-    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
-    fig.update_layout(LAYOUT)
-    fig.update_traces(marker_line_width=0)
-    fig.update_layout({
-        "mapbox": {
-            "layers": [
-                {
-                    "sourcetype": 'geojson',
-                    "source": geojson,
-                    "type": 'line',
-                    "color": '#fff',
-                    "line": {
-                        "width": .1,
-                    },
-                },
-            ],
-            "style": geo_style,
-        }
-    })
-    fig['layout']['geo']['subunitcolor'] = 'rgba(0,0,0,0)'
-    fig["layout"].pop("updatemenus")
-
-    image = fig.to_image(format="png", scale=2)
-
     return image
 
 
-def get_data(timestamp: datetime):
-    query = MAIN.format(date=f"{timestamp:%Y_%-m_%-d}")
-    metric = "newCasesBySpecimenDateRollingRate"
-
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(
-            text(query),
-            metric=metric,
-            datestamp=f'{timestamp::%Y-%m-%d}'
-        )
-        raw_data = resp.fetchall()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
+def get_data(data_version: str, timestamp: datetime,
+             metric: str = "newCasesBySpecimenDateRollingRate"):
+    data = get_release_data(data_version, [metric], ["utla"])
+    data = data.loc[data.date == (timestamp - timedelta(days=DATA_LAG)).date()]
 
-    print(len(raw_data))
-    return DataFrame(raw_data, columns=["areaType", "areaCode", metric])
+    return DataFrame({
+        "areaType": data.area_type.values,
+        "areaCode": data.area_code.values,
+        metric: data.value.values
+    })
 
 
 def generate_landing_page_map(payload):
     timestamp = datetime.fromisoformat(payload["timestamp"])
-    data = get_data(timestamp)
 
-    # if dataframe is empty, then nothing will be stored in the blob storage
-    if data.empty:
+    failures = list()
+
+    # All outputs are rendered in the same session to reuse the warm renderer.
+    for output in payload.get("outputs", OUTPUTS):
+        data = get_data(payload["data_version"], timestamp, output["metric"])
+
+        # if dataframe is empty, then nothing will be stored in the blob storage
+        if data.empty:
+            logging.warning(f"No data for landing page map '{output['path']}'")
+            failures.append(output["path"])
+            continue
+
+        image = plot_map(data, output["metric"])
+        store_image(image, output["container"], output["path"])
+
+    if failures:
         return (
             f"ERROR: landing page map at '{payload['timestamp']}' "
             "has not been generated"
         )
 
-    image = plot_map(data)
-    store_image(image)
-
     return f"DONE: landing page map at '{payload['timestamp']}'"
 
 
 if __name__ == "__main__":
     from datetime import timedelta
-    generate_landing_page_map({"timestamp": (datetime.utcnow() - timedelta(days=1)).isoformat()})
+    from utilities.release_data import prefetch_release_data
+    generate_landing_page_map(
+        prefetch_release_data({"timestamp": (datetime.utcnow() - timedelta(days=1)).isoformat()})
+    )
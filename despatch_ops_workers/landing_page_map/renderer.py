@@ -0,0 +1,128 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from typing import List, Iterable
+
+# 3rd party:
+from plotly import graph_objects as go
+from plotly.io.kaleido import scope as kaleido_scope
+
+# Internal: 
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'MapRenderer'
+]
+
+
+def discrete_colour_scale(colours: List[str]) -> List[list]:
+    """
+    Creates a stepped colour scale, where a ``z`` value of ``i + 0.5``
+    maps to ``colours[i]`` for ``zmin=0`` and ``zmax=len(colours)``.
+    """
+    total = len(colours)
+    scale = list()
+
+    for index, colour in enumerate(colours):
+        scale.append([index / total, colour])
+        scale.append([(index + 1) / total, colour])
+
+    return scale
+
+
+class MapRenderer:
+    """
+    Choropleth map renderer that keeps a single figure and a warm
+    Kaleido (Chromium) scope alive between renders.
+
+    The geometry, style and layout are set once when the renderer is
+    created; each render only replaces the locations and colour values
+    of the choropleth trace.
+
+    Parameters
+    ----------
+    geojson: dict
+        Boundaries of the areas, identified by ``properties.code``.
+
+    style: dict
+        Mapbox style of the base map.
+
+    colours: List[str]
+        Colours of the bins, in ascending order.
+
+    layout: go.Layout
+        Layout of the figure.
+
+    scale: float
+        Scale factor of the rendered image. [Default: ``2``]
+    """
+
+    def __init__(self, geojson: dict, style: dict, colours: List[str],
+                 layout: go.Layout, scale: float = 2):
+        self._scale = scale
+        # Plotly's own scope is configured with the bundled plotly.js and keeps
+        # its Chromium subprocess alive for the lifetime of the worker.
+        self._scope = kaleido_scope
+        self._figure = go.Figure(
+            data=go.Choroplethmapbox(
+                geojson=geojson,
+                featureidkey="properties.code",
+                locations=list(),
+                z=list(),
+                zmin=0,
+                zmax=len(colours),
+                colorscale=discrete_colour_scale(colours),
+                showscale=False,
+                marker_line_width=0
+            ),
+            layout=layout
+        )
+
+        self._figure.update_layout({
+            "mapbox": {
+                "zoom": 4.75,
+                "center": {"lat": 54.4, "lon": -3},
+                "layers": [
+                    {
+                        "sourcetype": 'geojson',
+                        "source": geojson,
+                        "type": 'line',
+                        "color": '#fff',
+                        "line": {
+                            "width": .1,
+                        },
+                    },
+                ],
+                "style": style,
+            }
+        })
+
+    def render(self, locations: Iterable[str], bins: Iterable[int]) -> bytes:
+        """
+        Renders the map as a PNG image.
+
+        Parameters
+        ----------
+        locations: Iterable[str]
+            Area codes.
+
+        bins: Iterable[int]
+            Index of the colour bin for each area in ``locations``.
+
+        Returns
+        -------
+        bytes
+        """
+        self._figure.update_traces(
+            locations=list(locations),
+            z=[value + 0.5 for value in bins]
+        )
+
+        return self._scope.transform(
+            self._figure.to_dict(),
+            format="png",
+            scale=self._scale
+        )
@@ -26,11 +26,11 @@ def get_style_replacement():
         return json.load(fh)
 
 
-def get_data_replacement(_):
+def get_data_replacement(*_):
     return pandas.read_csv("empty_dataframe.csv")
 
 
-def store_image_replacement(_):
+def store_image_replacement(*_):
     # not saving anything
     pass
 
@@ -106,7 +106,7 @@ class TestLandingPageMap(unittest.TestCase):
         from despatch_ops_workers.landing_page_map.generate import (
             generate_landing_page_map,
         )
-        payload = {"timestamp": "2023-01-31"}
+        payload = {"timestamp": "2023-01-31", "data_version": "2023-01-31-test"}
         output = generate_landing_page_map(payload)
 
         assert output == (
@@ -0,0 +1,41 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+
+# 3rd party:
+
+# Internal: 
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'GEOJSON_ASSET',
+    'STYLE_ASSET',
+    'OUTPUTS'
+]
+
+
+# Static assets are fetched from the website once per version and
+# then served from the despatch asset cache.
+GEOJSON_ASSET = {
+    "name": "landing_page_map/utla-ref.geojson",
+    "version": "v1",
+    "url": "https://coronavirus.data.gov.uk/downloads/maps/utla-ref.geojson"
+}
+
+STYLE_ASSET = {
+    "name": "landing_page_map/style.json",
+    "version": "v4",
+    "url": "https://coronavirus.data.gov.uk/public/assets/geo/style_v4.json"
+}
+
+
+OUTPUTS = [
+    {
+        "metric": "newCasesBySpecimenDateRollingRate",
+        "container": "publicdata",
+        "path": "assets/frontpage/images/map.png"
+    },
+]
@@ -4,23 +4,29 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 from datetime import datetime
+from math import isnan
+from typing import Dict, Iterable, Iterator
 
 # 3rd party:
-from pandas import DataFrame
+from dateutil.relativedelta import relativedelta
 from orjson import dumps
 from sqlalchemy import text
 
 # Internal:
 try:
-    from __app__.storage import StorageClient
-    from .variables import PARAMETERS, Device
-    from ..utils.variables import AREA_TYPE_PARTITION
+    from .variables import PARAMETERS, Device, GEOMETRY_VERSION
+    from .queries import GEOMETRY
+    from ..utils.utilities import compress_variants, upload_variants, get_versioned_asset
     from __app__.db_tables.covid19 import Session
+    from __app__.utilities.release_data import get_release_data
 except ImportError:
-    from storage import StorageClient
-    from despatch_ops_workers.map_geojson.variables import PARAMETERS, Device
-    from despatch_ops_workers.utils.variables import AREA_TYPE_PARTITION
+    from despatch_ops_workers.map_geojson.variables import PARAMETERS, Device, GEOMETRY_VERSION
+    from despatch_ops_workers.map_geojson.queries import GEOMETRY
+    from despatch_ops_workers.utils.utilities import (
+        compress_variants, upload_variants, get_versioned_asset
+    )
     from db_tables.covid19 import Session
+    from utilities.release_data import get_release_data
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -29,38 +35,21 @@ __all__ = [
 ]
 
 
-def store_data(geo_data, container, path):
-    payload = dumps(geo_data).decode().replace("NaN", "null")
+FEATURE_TEMPLATE = b'{"id":%d,"properties":%b,"geometry":%b,"type":"Feature"}'
 
-    with StorageClient(
-            container=container,
-            path=path,
-            content_type="application/json; charset=utf-8",
-            cache_control="public, stale-while-revalidate=60, max-age=90",
-            compressed=True,
-            content_language=None
-    ) as cli:
-        cli.upload(payload)
+NULL_GEOMETRY = b'{"type":null,"coordinates":null}'
 
+HISTORY = relativedelta(months=6)
 
-def create_asset(area_type: str, device: str, release_date: str):
-    params = PARAMETERS[area_type]
-    partition_date = datetime.fromisoformat(release_date).strftime("%Y_%-m_%-d")
+# Dates of other area types are limited to those on the MSOA map.
+DATE_REFERENCE = "msoa"
 
-    query = params['query'].format(
-        date=partition_date,
-        area_type=AREA_TYPE_PARTITION[area_type],
-        attr=params['attribute']
-    )
 
+def execute_query(query: str, **params):
     session = Session()
     conn = session.connection()
     try:
-        resp = conn.execute(
-            text(query),
-            metric=params["metric"],
-            area_type=area_type
-        )
+        resp = conn.execute(text(query), **params)
         raw_data = resp.fetchall()
     except Exception as err:
         session.rollback()
@@ -68,24 +57,109 @@ def create_asset(area_type: str, device: str, release_date: str):
     finally:
         session.close()
 
-    data = DataFrame(raw_data, columns=["date", "properties", "geometry"])
+    return raw_data
+
+
+def serialise_geometries(area_type: str) -> bytes:
+    """
+    Serialises the geometries of all areas of ``area_type`` into
+    tab-delimited lines of area code and GeoJSON geometry.
+    """
+    raw_data = execute_query(GEOMETRY, area_type=area_type)
+
+    return b"".join(
+        b"%b\t%b\n" % (area_code.encode(), dumps(geometry))
+        for area_code, geometry in raw_data
+    )
+
+
+def get_geometries(area_type: str) -> Dict[str, bytes]:
+    """
+    Returns the pre-serialised geometries of ``area_type``, keyed by area code.
+
+    Geometries only change when the boundaries are updated, so they are
+    cached against ``GEOMETRY_VERSION`` and never re-serialised per release.
+    """
+    payload = get_versioned_asset(
+        name=f"map_geojson/geometry_{area_type}.tsv",
+        version=GEOMETRY_VERSION,
+        loader=lambda: serialise_geometries(area_type)
+    )
+
+    geometries = dict()
+    for line in payload.splitlines():
+        area_code, geometry = line.split(b"\t", 1)
+        geometries[area_code.decode()] = geometry
+
+    return geometries
+
+
+def get_recent_values(area_type: str, data_version: str, timestamp: datetime):
+    params = PARAMETERS[area_type]
+    data = get_release_data(data_version, [params["metric"]], [area_type], params["attribute"])
+
+    return data.loc[data.date > (timestamp - HISTORY).date()]
 
-    if device == Device.mobile:
-        data = data.loc[data.date == data.date.max(), :]
 
-    geo_data = {
-        "type": "FeatureCollection",
-        "features": (
-            data
-            .drop(columns=["date"])
-            .assign(type="Feature")
-            .reset_index()
-            .rename(columns={"index": "id"})
-            .to_dict("records")
+def get_values(area_type: str, data_version: str, release_date: str):
+    timestamp = datetime.fromisoformat(release_date)
+    data = get_recent_values(area_type, data_version, timestamp)
+
+    if area_type != DATE_REFERENCE:
+        reference = get_recent_values(DATE_REFERENCE, data_version, timestamp)
+        data = data.loc[data.date.isin(set(reference.date))]
+
+    data = data.sort_values("date", ascending=False, kind="mergesort")
+
+    return list(data.loc[:, ["date", "area_code", "value"]].itertuples(index=False, name=None))
+
+
+def generate_features(values: Iterable, geometries: Dict[str, bytes]) -> Iterator[bytes]:
+    """
+    Generates the serialised FeatureCollection, injecting the per-release
+    properties and the cached geometries into the feature template.
+    """
+    yield b'{"type":"FeatureCollection","features":['
+
+    for index, (date, area_code, value) in enumerate(values):
+        properties = dumps({
+            "code": area_code,
+            "date": date,
+            "value": None if value is None or isnan(value) else value
+        })
+
+        feature = FEATURE_TEMPLATE % (
+            index,
+            properties,
+            geometries.get(area_code, NULL_GEOMETRY)
         )
-    }
 
-    return store_data(geo_data, params['container'], params['path'][device])
+        yield feature if not index else b"," + feature
+
+    yield b"]}"
+
+
+def create_asset(area_type: str, device: str, data_version: str, release_date: str):
+    params = PARAMETERS[area_type]
+
+    values = get_values(area_type, data_version, release_date)
+
+    if device == Device.mobile and values:
+        latest_date = max(row[0] for row in values)
+        values = [row for row in values if row[0] == latest_date]
+
+    geometries = get_geometries(area_type)
+
+    variants = compress_variants(generate_features(values, geometries))
+
+    upload_variants(
+        variants,
+        container=params['container'],
+        path=params['path'][device],
+        content_type="application/json; charset=utf-8",
+        cache_control="public, stale-while-revalidate=60, max-age=90",
+        content_language=None
+    )
 
 
 def generate_geojson(payload):
@@ -93,14 +167,15 @@ def generate_geojson(payload):
     device = payload["device"]
     timestamp = payload["timestamp"]
 
-    create_asset(area_type, device, timestamp)
+    create_asset(area_type, device, payload["data_version"], timestamp)
 
     return f"DONE {area_type}::{device}::{timestamp}"
 
 
 if __name__ == "__main__":
+    from utilities.release_data import prefetch_release_data
     generate_geojson({
         "area_type": "utla",
         "device": "DESKTOP",
-        "release_timestamp": datetime.utcnow().isoformat()
+        **prefetch_release_data({"timestamp": datetime.utcnow().isoformat()})
     })
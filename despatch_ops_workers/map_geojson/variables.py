@@ -3,24 +3,28 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
+from os import getenv
 from dataclasses import dataclass
 
 # 3rd party:
 
 # Internal: 
-try:
-    from .queries import MSOA, NON_MSOA
-except ImportError:
-    from despatch_ops_workers.map_geojson.queries import MSOA, NON_MSOA
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 __all__ = [
     'Device',
-    'PARAMETERS'
+    'PARAMETERS',
+    'GEOMETRY_VERSION'
 ]
 
 
+# Version of the boundaries held in `covid19.geo_data`. Must be
+# changed whenever the boundaries are reloaded so that the cached
+# geometries are regenerated.
+GEOMETRY_VERSION = getenv("GEOMETRY_VERSION", "v1")
+
+
 @dataclass()
 class Device:
     mobile = "MOBILE"
@@ -31,7 +35,6 @@ PARAMETERS = {
     'msoa': {
         'metric': 'newCasesBySpecimenDate',
         'attribute': 'rollingRate',
-        'query': MSOA,
         'container': "downloads",
         'path': {
             Device.desktop: "maps/msoa_data_latest.geojson",
@@ -41,7 +44,6 @@ PARAMETERS = {
     'utla': {
         'metric': 'newCasesBySpecimenDateRollingRate',
         'attribute': 'value',
-        'query': NON_MSOA,
         'container': "downloads",
         'path': {
             Device.desktop: "maps/utla_data_latest.geojson",
@@ -51,7 +53,6 @@ PARAMETERS = {
     'ltla': {
         'metric': 'newCasesBySpecimenDateRollingRate',
         'attribute': 'value',
-        'query': NON_MSOA,
         'container': "downloads",
         'path': {
             Device.desktop: "maps/ltla_data_latest.geojson",
@@ -4,21 +4,27 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 from datetime import datetime
+from math import ceil
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Iterable
 
 # 3rd party:
-from pandas import DataFrame
+from numpy import array, concatenate, ndarray
 from orjson import dumps
 from sqlalchemy import text
 
 # Internal:
 try:
     from __app__.storage import StorageClient
-    from .variables import PARAMETERS
+    from .queries import METRIC_VALUES
+    from .variables import PARAMETERS, QUANTILES
     from ..utils.variables import AREA_TYPE_PARTITION
     from __app__.db_tables.covid19 import Session
 except ImportError:
     from storage import StorageClient
-    from despatch_ops_workers.map_percentiles.variables import PARAMETERS
+    from despatch_ops_workers.map_percentiles.queries import METRIC_VALUES
+    from despatch_ops_workers.map_percentiles.variables import PARAMETERS, QUANTILES
     from despatch_ops_workers.utils.variables import AREA_TYPE_PARTITION
     from db_tables.covid19 import Session
 
@@ -29,6 +35,14 @@ __all__ = [
 ]
 
 
+COMPLETE = "complete"
+
+# Dates of other area types are limited to those on the MSOA map.
+DATE_REFERENCE = "msoa"
+
+UPLOAD_WORKERS = len(PARAMETERS)
+
+
 def store_data(geo_data, container, path):
     payload = dumps(geo_data).decode().replace("NaN", "null")
 
@@ -43,23 +57,29 @@ def store_data(geo_data, container, path):
         cli.upload(payload)
 
 
-def create_asset(area_type: str, release_date: str):
-    params = PARAMETERS[area_type]
-    partition_date = datetime.fromisoformat(release_date).strftime("%Y_%-m_%-d")
+def get_values(area_types: Iterable[str], release_date: str) -> Dict[str, Dict[str, ndarray]]:
+    """
+    Extracts the values of the map metric for all area types in one
+    query, as ``{area_type: {date: values}}``.
 
-    query = params['query'].format(
-        date=partition_date,
-        area_type=AREA_TYPE_PARTITION[area_type],
-        attr=params['attribute']
-    )
+    Values are only included for dates in the last 6 months, except
+    under the ``complete`` key, which holds the values for all dates.
+    """
+    partition_date = datetime.fromisoformat(release_date).strftime("%Y_%-m_%-d")
+    partition_ids = {
+        f"{partition_date}|{AREA_TYPE_PARTITION[area_type]}"
+        for area_type in area_types
+    }
 
     session = Session()
     conn = session.connection()
     try:
         resp = conn.execute(
-            text(query),
-            metric=params["metric"],
-            area_type=area_type
+            text(METRIC_VALUES),
+            area_types=list(area_types),
+            metrics=[PARAMETERS[area_type]["metric"] for area_type in area_types],
+            attributes=[PARAMETERS[area_type]["attribute"] for area_type in area_types],
+            partition_ids=list(partition_ids)
         )
         raw_data = resp.fetchall()
     except Exception as err:
@@ -68,26 +88,98 @@ def create_asset(area_type: str, release_date: str):
     finally:
         session.close()
 
-    percentiles = (
-        DataFrame(raw_data, columns=["date", "min", "first", "second", "third", "max"])
-        .set_index("date").T
-        .to_dict()
-    )
+    complete: Dict[str, List[ndarray]] = defaultdict(list)
+    values: Dict[str, Dict[str, ndarray]] = defaultdict(dict)
+
+    for area_type, date, recent, metric_values in raw_data:
+        metric_values = array(metric_values, dtype=float)
+        complete[area_type].append(metric_values)
+
+        if recent:
+            values[area_type][date] = metric_values
+
+    for area_type in area_types:
+        arrays = complete[area_type]
+        values[area_type][COMPLETE] = concatenate(arrays) if arrays else array([], dtype=float)
+
+    return values
+
+
+def get_percentiles(values: ndarray) -> Dict[str, float]:
+    """
+    Calculates the minimum, the maximum and the ``QUANTILES`` of the
+    values. Quantiles are discrete, as with ``percentile_disc``.
+    """
+    labels = ["min", *QUANTILES, "max"]
+
+    if not values.size:
+        return dict.fromkeys(labels)
 
-    store_data(percentiles, params['container'], params['path'])
+    ordered = values.copy()
+    ordered.sort()
+    size = ordered.size
+
+    return {
+        "min": float(ordered[0]),
+        **{
+            label: float(ordered[max(ceil(fraction * size) - 1, 0)])
+            for label, fraction in QUANTILES.items()
+        },
+        "max": float(ordered[-1])
+    }
+
+
+def create_assets(area_types: List[str], release_date: str):
+    values = get_values(sorted({*area_types, DATE_REFERENCE}), release_date)
+
+    reference_dates = set(values[DATE_REFERENCE])
+
+    assets = dict()
+
+    for area_type in area_types:
+        area_values = values[area_type]
+
+        # Ordered as strings, so "complete" comes last.
+        dates = sorted(
+            date
+            for date in area_values
+            if date == COMPLETE or area_type == DATE_REFERENCE or date in reference_dates
+        )
+
+        assets[area_type] = {
+            date: get_percentiles(area_values[date])
+            for date in dates
+        }
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploader:
+        uploads = [
+            uploader.submit(
+                store_data,
+                percentiles,
+                PARAMETERS[area_type]['container'],
+                PARAMETERS[area_type]['path']
+            )
+            for area_type, percentiles in assets.items()
+        ]
+
+        for upload in uploads:
+            upload.result()
 
 
 def generate_percentiles(payload):
-    area_type = payload["area_type"]
     timestamp = payload["timestamp"]
 
-    create_asset(area_type, timestamp)
+    if "area_type" in payload:
+        area_types = [payload["area_type"]]
+    else:
+        area_types = list(PARAMETERS)
+
+    create_assets(area_types, timestamp)
 
-    return f"DONE: percentiles {area_type}::{timestamp}"
+    return f"DONE: percentiles {str.join(', ', area_types)}::{timestamp}"
 
 
 if __name__ == "__main__":
     generate_percentiles({
-        "area_type": "nation",
-        "release_timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat()
     })
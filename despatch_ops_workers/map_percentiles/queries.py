@@ -11,80 +11,26 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
-NON_MSOA = """\
-SELECT *
-FROM (
-    SELECT
-        'complete' AS date,
-        MIN((payload -> '{attr}')::FLOAT) AS min,  -- JSON attribute
-        percentile_disc(.25) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS first,  -- JSON attribute
-        percentile_disc(.50) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS second,  -- JSON attribute
-        percentile_disc(.75) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS third,  -- JSON attribute
-        MAX((payload -> '{attr}')::FLOAT) AS max   -- JSON attribute
-    FROM covid19.time_series_p{date}_{area_type} AS ts
-    LEFT JOIN covid19.area_reference    AS ar  ON ar.id = ts.area_id
-    LEFT JOIN covid19.metric_reference  AS mr  ON mr.id = metric_id
-    LEFT JOIN covid19.geo_data          AS geo ON ar.id = geo.area_id
-    WHERE mr.metric = :metric  -- Metric
-      AND area_type = :area_type  -- Area type
-      AND (payload ->> '{attr}') NOTNULL  -- JSON attribute
-    UNION (
-        SELECT
-            date::TEXT,
-            MIN((payload -> '{attr}')::FLOAT) AS min,  -- JSON attribute
-            percentile_disc(.25) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS first,  -- JSON attribute
-            percentile_disc(.50) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS second,  -- JSON attribute
-            percentile_disc(.75) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS third,  -- JSON attribute
-            MAX((payload -> '{attr}')::FLOAT) AS max   -- JSON attribute
-        FROM covid19.time_series_p{date}_{area_type} AS ts
-        LEFT JOIN covid19.area_reference    AS ar  ON ar.id = ts.area_id
-        LEFT JOIN covid19.metric_reference  AS mr  ON mr.id = metric_id
-        LEFT JOIN covid19.geo_data          AS geo ON ar.id = geo.area_id
-        WHERE mr.metric = :metric  -- Metric
-          AND area_type = :area_type  -- Area type
-          AND (payload ->> '{attr}') NOTNULL  -- JSON attribute
-          AND date > (DATE(NOW()) - INTERVAL '6 months')
-        GROUP BY date
-    )
-) AS dt
-WHERE date IN (SELECT DISTINCT date::TEXT FROM covid19.time_series_p{date}_msoa)
-   OR date = 'complete' 
-ORDER BY date;\
-"""
-
-
-MSOA = """\
+# Values of the map metric for every area type, aggregated into
+# one array per area type and date. The metric and the JSON
+# attribute are defined for each area type.
+METRIC_VALUES = """\
 SELECT
-    'complete' AS date,
-    MIN((payload -> '{attr}')::FLOAT) AS min,  -- JSON attribute
-    percentile_disc(.25) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS first,  -- JSON attribute
-    percentile_disc(.50) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS second,  -- JSON attribute
-    percentile_disc(.75) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS third,  -- JSON attribute
-    MAX((payload -> '{attr}')::FLOAT) AS max   -- JSON attribute
-FROM covid19.time_series_p{date}_{area_type} AS ts
-LEFT JOIN covid19.area_reference    AS ar  ON ar.id = ts.area_id
-LEFT JOIN covid19.metric_reference  AS mr  ON mr.id = metric_id
-LEFT JOIN covid19.geo_data          AS geo ON ar.id = geo.area_id
-WHERE mr.metric = :metric  -- Metric
-  AND area_type = :area_type  -- Area type
-  AND (payload ->> '{attr}') NOTNULL  -- JSON attribute
-UNION (
-    SELECT
-        date::TEXT,
-        MIN((payload -> '{attr}')::FLOAT) AS min,  -- JSON attribute
-        percentile_disc(.25) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS first,  -- JSON attribute
-        percentile_disc(.50) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS second,  -- JSON attribute
-        percentile_disc(.75) WITHIN GROUP (ORDER BY (payload -> '{attr}')::FLOAT) AS third,  -- JSON attribute
-        MAX((payload -> '{attr}')::FLOAT) AS max   -- JSON attribute
-    FROM covid19.time_series_p{date}_{area_type} AS ts
-    LEFT JOIN covid19.area_reference    AS ar  ON ar.id = ts.area_id
-    LEFT JOIN covid19.metric_reference  AS mr  ON mr.id = metric_id
-    LEFT JOIN covid19.geo_data          AS geo ON ar.id = geo.area_id
-    WHERE mr.metric = :metric  -- Metric
-      AND area_type = :area_type  -- Area type
-      AND (payload ->> '{attr}') NOTNULL  -- JSON attribute
-      AND date > (DATE(NOW()) - INTERVAL '6 months')
-    GROUP BY date
-)
-ORDER BY date;\
+    params.area_type,
+    ts.date::TEXT                                  AS date,
+    ts.date > (DATE(NOW()) - INTERVAL '6 months')  AS recent,
+    ARRAY_AGG((ts.payload -> params.attribute)::FLOAT) AS metric_values  -- JSON attribute
+FROM covid19.time_series AS ts
+  JOIN covid19.area_reference   AS ar ON ar.id = ts.area_id
+  JOIN covid19.metric_reference AS mr ON mr.id = ts.metric_id
+  JOIN UNNEST(
+        (:area_types)::VARCHAR[],
+        (:metrics)::VARCHAR[],
+        (:attributes)::VARCHAR[]
+  ) AS params(area_type, metric, attribute)
+    ON params.area_type = ar.area_type
+   AND params.metric = mr.metric
+WHERE ts.partition_id = ANY((:partition_ids)::VARCHAR[])
+  AND (ts.payload ->> params.attribute) NOTNULL  -- JSON attribute
+GROUP BY params.area_type, ts.date;\
 """
@@ -4,10 +4,9 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 from datetime import datetime
+from typing import Iterable, Iterator, Tuple
 
 # 3rd party:
-from pandas import DataFrame
-from orjson import dumps
 from sqlalchemy import text
 
 # Internal:
@@ -27,51 +26,56 @@ __all__ = [
 ]
 
 
-def store_data(geo_data, container, path):
-    payload = dumps(geo_data).decode().replace("NaN", "null")
-
-    with StorageClient(
-            container=container,
-            path=path,
-            content_type="application/json; charset=utf-8",
-            cache_control="public, stale-while-revalidate=60, max-age=90",
-            compressed=True,
-            content_language=None
-    ) as cli:
-        cli.upload(payload)
+FEATURE_TEMPLATE = b'{"id":%d,"properties":%b,"geometry":%b,"type":"Feature"}'
 
+# Number of rows fetched from the server-side cursor at a time.
+FETCH_SIZE = 500
 
-def create_asset(release_date: str):
-
-    partition_date = datetime.fromisoformat(release_date).strftime("%Y_%-m_%-d")
-
-    query = QUERY.format(date=partition_date)
 
+def get_rows(query: str) -> Iterator[Tuple[str, str]]:
     session = Session()
-    conn = session.connection()
+    conn = session.connection(execution_options={"stream_results": True})
     try:
         resp = conn.execute(text(query))
-        raw_data = resp.fetchall()
+
+        for rows in resp.partitions(FETCH_SIZE):
+            yield from rows
     except Exception as err:
         session.rollback()
         raise err
     finally:
         session.close()
 
-    data = DataFrame(raw_data, columns=["properties", "geometry"])
 
-    geo_data = {
-        "type": "FeatureCollection",
-        "features": (
-            data
-            .assign(type="Feature")
-            .reset_index()
-            .rename(columns={"index": "id"})
-            .to_dict("records")
-        )
-    }
+def generate_features(rows: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Generates the serialised FeatureCollection from rows of
+    properties and geometries that are already serialised.
+    """
+    yield b'{"type":"FeatureCollection","features":['
+
+    for index, (properties, geometry) in enumerate(rows):
+        feature = FEATURE_TEMPLATE % (index, properties.encode(), geometry.encode())
 
-    return store_data(geo_data, "downloads", "maps/vax-data_latest.geojson")
+        yield feature if not index else b"," + feature
+
+    yield b"]}"
+
+
+def create_asset(release_date: str):
+    partition_date = datetime.fromisoformat(release_date).strftime("%Y_%-m_%-d")
+
+    query = QUERY.format(date=partition_date)
+
+    with StorageClient(
+            container="downloads",
+            path="maps/vax-data_latest.geojson",
+            content_type="application/json; charset=utf-8",
+            cache_control="public, stale-while-revalidate=60, max-age=90",
+            compressed=True,
+            content_language=None
+    ) as cli:
+        cli.upload_stream(generate_features(get_rows(query)))
 
 
 def generate_geojson(payload):
@@ -11,6 +11,8 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
+# Properties and geometries are serialised in the database,
+# so that rows can be written out as they are streamed.
 QUERY = """\
 SELECT jsonb_build_object(
                'cd', first_dose.area_code,
@@ -18,11 +20,11 @@ SELECT jsonb_build_object(
                'f', ROUND("first"::NUMERIC, 2),
                'c', ROUND(second::NUMERIC, 2),
                't', ROUND("third"::NUMERIC, 2)
-           ) AS properties,
+           )::TEXT AS properties,
        jsonb_build_object(
                'type', first_dose.geometry_type,
                'coordinates', first_dose.coordinates
-           ) AS geometry
+           )::TEXT AS geometry
 FROM (
          SELECT *
          FROM (
@@ -3,26 +3,22 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from os import path
-from io import BytesIO
 from datetime import datetime
-from tempfile import gettempdir
+from multiprocessing import Pool, cpu_count
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
 
 # 3rd party:
-from jinja2 import FileSystemLoader, Environment
-from svglib.svglib import svg2rlg
-from reportlab.graphics import renderPM
-from sqlalchemy import text
 
 # Internal:
 try:
-    from .queries import MAIN
+    from .renderer import init_worker, render_card
     from __app__.storage import StorageClient
-    from __app__.db_tables.covid19 import Session
+    from __app__.utilities.release_data import get_latest_values
 except ImportError:
     from storage import StorageClient
-    from despatch_ops_workers.og_images.queries import MAIN
-    from db_tables.covid19 import Session
+    from despatch_ops_workers.og_images.renderer import init_worker, render_card
+    from utilities.release_data import get_latest_values
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -31,11 +27,7 @@ __all__ = [
 ]
 
 
-curr_dir = path.split(path.abspath(__file__))[0]
-file_loader = FileSystemLoader(path.join(curr_dir, "templates"))
-env = Environment(loader=file_loader)
-
-temp_svg_path = path.join(gettempdir(), "temp.svg")
+TEMPLATE_NAME = "summary.svg"
 
 structure = {
     "newCasesByPublishDate": "cases",
@@ -44,6 +36,12 @@ structure = {
     "newAdmissions": "admissions",
 }
 
+area_types = ["overview", "nation", "region", "utla", "ltla"]
+
+MISSING_VALUE = "N/A"
+
+UPLOAD_WORKERS = 10
+
 storage_kws = dict(
     container="downloads",
     content_type="image/png",
@@ -53,70 +51,88 @@ storage_kws = dict(
 )
 
 
-def store_png(filename, svg_image):
-    with open(temp_svg_path, "w") as tmp_file:
-        print(svg_image, file=tmp_file)
-
-    drawing = svg2rlg(temp_svg_path)
-    png_img = BytesIO()
-    renderPM.drawToFile(drawing, png_img, fmt="PNG")
-    png_img.seek(0)
-    date = datetime.now().strftime("%Y%m%d")
-    name = f"{filename}_{date}"
-
-    with StorageClient(path=f"og-images/{name}.png", **storage_kws) as cli:
-        cli.upload(png_img.read())
-
-
-def get_data(query, metric):
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(
-            text(query),
-            metric=metric
-        )
-        raw_data = resp.fetchone()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
-
-    data = {
-        f'{metric}Date': f'{raw_data[1]:%-d %b}',
-        metric: format(int(raw_data[2]), ",d")
+def store_png(card_path: str, image: bytes):
+    with StorageClient(path=card_path, **storage_kws) as cli:
+        cli.upload(image)
+
+
+def get_card_path(area_type: str, area_code: str, date: str) -> str:
+    if area_type == "overview":
+        return f"og-images/og-summary_{date}.png"
+
+    return f"og-images/{area_type}/og-summary-{area_code}_{date}.png"
+
+
+def get_data(data_version: str):
+    data = get_latest_values(data_version, list(structure), area_types)
+    columns = ["area_type", "area_code", "area_name", "metric", "date", "value"]
+
+    return list(data.loc[:, columns].itertuples(index=False, name=None))
+
+
+def create_cards(raw_data, timestamp: datetime) -> Dict[str, Dict[str, str]]:
+    """
+    Collates the latest value of each metric into the template
+    values of one card per area, keyed by the storage path of
+    the card.
+    """
+    default_values = {
+        "timestamp": f"{timestamp:%-d %b %Y}",
+        **{metric: MISSING_VALUE for metric in structure},
+        **{f"{metric}Date": MISSING_VALUE for metric in structure},
     }
 
-    return data
+    release_date = f"{timestamp:%Y%m%d}"
+    cards: Dict[Tuple[str, str], Dict[str, str]] = dict()
+
+    for area_type, area_code, area_name, metric, metric_date, value in raw_data:
+        area = (area_type, area_code)
+
+        if area not in cards:
+            # The national card has no area name.
+            name = area_name if area_type != "overview" else str()
+            cards[area] = {**default_values, "area_name": name}
 
+        cards[area].update({
+            f'{metric}Date': f'{metric_date:%-d %b}',
+            metric: format(int(value), ",d")
+        })
 
-def create_asset(timestamp):
+    return {
+        get_card_path(area_type, area_code, release_date): values
+        for (area_type, area_code), values in cards.items()
+    }
+
+
+def create_assets(data_version: str, timestamp: str):
     data_ts = datetime.fromisoformat(timestamp)
-    query = MAIN.format(date=f"{data_ts:%Y_%-m_%-d}")
 
-    data = dict()
-    for metric in structure:
-        item = get_data(query, metric)
-        data.update(item)
+    raw_data = get_data(data_version)
+    cards = create_cards(raw_data, data_ts)
+
+    processes = max(cpu_count() - 1, 1)
 
-    template = env.get_template("summary.svg")
+    with Pool(processes=processes, initializer=init_worker, initargs=(TEMPLATE_NAME,)) as pool, \
+            ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploader:
+        uploads = [
+            uploader.submit(store_png, card_path, image)
+            for card_path, image in pool.imap_unordered(render_card, cards.items(), chunksize=8)
+        ]
 
-    svg_image = template.render(
-        **data,
-        timestamp=f"{data_ts:%-d %b %Y}"
-    )
+        for upload in uploads:
+            upload.result()
 
-    store_png("og-summary", svg_image)
+    return len(cards)
 
 
 def generate_og_images(payload):
     timestamp = payload["timestamp"]
 
-    create_asset(timestamp)
+    total = create_assets(payload["data_version"], timestamp)
 
-    return f"DONE: OG images {timestamp}"
+    return f"DONE: {total} OG images {timestamp}"
 
 
 if __name__ == "__main__":
-    generate_og_images({"timestamp": datetime.utcnow().isoformat()})
+    from utilities.release_data import prefetch_release_data
+    generate_og_images(prefetch_release_data({"timestamp": datetime.utcnow().isoformat()}))
@@ -0,0 +1,170 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import re
+from os import path
+from io import BytesIO
+from typing import Dict, Iterator, Tuple, Union
+
+# 3rd party:
+from jinja2 import FileSystemLoader, Environment, meta
+from svglib.svglib import svg2rlg
+from reportlab.graphics import renderPM
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Internal: 
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'CardTemplate',
+    'init_worker',
+    'render_card'
+]
+
+
+curr_dir = path.split(path.abspath(__file__))[0]
+file_loader = FileSystemLoader(path.join(curr_dir, "templates"))
+env = Environment(loader=file_loader)
+
+SLOT_PATTERN = re.compile(r"@@(\w+)@@")
+
+# Maximum width of the text of a slot, in the units of the drawing.
+# Longer texts are scaled down, to no less than ``MIN_FONT_SCALE`` of
+# their size, and are truncated beyond that.
+MAX_WIDTHS = {
+    # From the start of the line (x=660) to the right margin (x=1134).
+    "area_name": 474,
+}
+MIN_FONT_SCALE = 0.7
+ELLIPSIS = "..."
+
+# Template of the current worker process - see `init_worker`.
+_template: Union['CardTemplate', None] = None
+
+
+def iter_strings(node: Group) -> Iterator[String]:
+    for item in getattr(node, "contents", list()):
+        if isinstance(item, String):
+            yield item
+        else:
+            yield from iter_strings(item)
+
+
+def fit_text(node: String, max_width: float):
+    """
+    Scales down or truncates the text of ``node`` to fit ``max_width``.
+    """
+    def get_width(text):
+        return stringWidth(text, node.fontName, node.fontSize)
+
+    width = get_width(node.text)
+    if width <= max_width:
+        return None
+
+    node.fontSize = max(node.fontSize * max_width / width, node.fontSize * MIN_FONT_SCALE)
+
+    if get_width(node.text) <= max_width:
+        return None
+
+    text = node.text
+    while text and get_width(text.rstrip() + ELLIPSIS) > max_width:
+        text = text[:-1]
+
+    node.text = text.rstrip() + ELLIPSIS
+
+
+class CardTemplate:
+    """
+    Parsed SVG card template, held in memory as a ReportLab drawing.
+
+    The Jinja template is rendered and parsed only once, with every
+    variable replaced by a slot marker. Each card is then produced by
+    substituting the text of the slotted nodes and rasterising the
+    same drawing.
+
+    Parameters
+    ----------
+    template_name: str
+        Name of the SVG template in the ``templates`` directory.
+    """
+
+    def __init__(self, template_name: str):
+        source, _, _ = env.loader.get_source(env, template_name)
+        variables = meta.find_undeclared_variables(env.parse(source))
+
+        svg_image = env.get_template(template_name).render(**{
+            name: f"@@{name}@@"
+            for name in variables
+        })
+
+        self.drawing: Drawing = svg2rlg(BytesIO(svg_image.encode()))
+        self.slots = [
+            (node, node.text, node.fontSize, self.get_max_width(node.text))
+            for node in iter_strings(self.drawing)
+            if SLOT_PATTERN.search(node.text)
+        ]
+
+    @staticmethod
+    def get_max_width(text: str) -> Union[float, None]:
+        widths = [
+            MAX_WIDTHS[name]
+            for name in SLOT_PATTERN.findall(text)
+            if name in MAX_WIDTHS
+        ]
+
+        return min(widths, default=None)
+
+    def render(self, values: Dict[str, str]) -> bytes:
+        """
+        Renders the card as a PNG image.
+
+        Parameters
+        ----------
+        values: Dict[str, str]
+            Text for each of the template variables.
+
+        Returns
+        -------
+        bytes
+        """
+        def substitute(match):
+            return values.get(match.group(1), str())
+
+        for node, text, font_size, max_width in self.slots:
+            node.text = SLOT_PATTERN.sub(substitute, text)
+            node.fontSize = font_size
+
+            if max_width is not None:
+                fit_text(node, max_width)
+
+        return renderPM.drawToString(self.drawing, fmt="PNG")
+
+
+def init_worker(template_name: str):
+    """
+    Initialises the card template once per pool process.
+    """
+    global _template
+    _template = CardTemplate(template_name)
+
+
+def render_card(item: Tuple[str, Dict[str, str]]) -> Tuple[str, bytes]:
+    """
+    Renders a card in a pool process initialised by ``init_worker``.
+
+    Parameters
+    ----------
+    item: Tuple[str, Dict[str, str]]
+        Storage path of the card and its template values.
+
+    Returns
+    -------
+    Tuple[str, bytes]
+        Storage path of the card and its PNG image.
+    """
+    card_path, values = item
+    return card_path, _template.render(values)
@@ -8,14 +8,10 @@ import logging
 # 3rd party:
 
 # Internal:
-from .map_geojson import generate_geojson
-from .map_vaccinations_geojson import generate_geojson as generate_vax_geojson
-from .map_percentiles import generate_percentiles
-from .archive_dates import generate_archive_dates
-from .og_images import generate_og_images
-from .sitemap import generate_sitemap
-from .rate_scales import get_latest_scale_records, generate_scale_graph
-from .landing_page_map import generate_landing_page_map
+try:
+    from __app__.lazy_handlers import HandlerRegistry, LazyHandler
+except ImportError:
+    from lazy_handlers import HandlerRegistry, LazyHandler
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -24,19 +20,60 @@ __all__ = [
 ]
 
 
-def main(payload):
-    handlers = {
-        "map_geojson": generate_geojson,
-        "vax_map_geojson": generate_vax_geojson,
-        "map_percentiles": generate_percentiles,
-        "archive_dates": generate_archive_dates,
-        "og_images": generate_og_images,
-        "sitemap": generate_sitemap,
-        "latest_scale_records": get_latest_scale_records,
-        "scale_graphs": generate_scale_graph,
-        "landing_page_map": generate_landing_page_map,
-    }
+# Handlers are imported on first dispatch.
+handlers = HandlerRegistry(__package__, {
+    "release_data": LazyHandler(
+        "utilities.release_data", "prefetch_release_data",
+        dependencies=["pandas", "pyarrow.feather", "sqlalchemy"]
+    ),
+    "map_geojson": LazyHandler(
+        ".map_geojson", "generate_geojson",
+        dependencies=["pandas", "pyarrow.feather", "sqlalchemy"]
+    ),
+    "vax_map_geojson": LazyHandler(
+        ".map_vaccinations_geojson", "generate_geojson",
+        dependencies=["sqlalchemy"]
+    ),
+    "map_percentiles": LazyHandler(
+        ".map_percentiles", "generate_percentiles",
+        dependencies=["numpy", "sqlalchemy"]
+    ),
+    "archive_dates": LazyHandler(
+        ".archive_dates", "generate_archive_dates",
+        dependencies=["pandas", "sqlalchemy"]
+    ),
+    "og_images": LazyHandler(
+        ".og_images", "generate_og_images",
+        dependencies=[
+            "pandas", "pyarrow.feather", "jinja2", "svglib.svglib",
+            "reportlab.graphics.renderPM", "sqlalchemy"
+        ]
+    ),
+    "sitemap": LazyHandler(
+        ".sitemap", "generate_sitemap",
+        dependencies=["pandas", "jinja2", "lxml.etree"]
+    ),
+    "latest_scale_records": LazyHandler(
+        ".rate_scales", "get_latest_scale_records",
+        dependencies=["pandas", "pyarrow.feather", "matplotlib.pyplot", "sqlalchemy"]
+    ),
+    "scale_graphs": LazyHandler(
+        ".rate_scales", "generate_scale_graph",
+        dependencies=["pandas", "pyarrow.feather", "matplotlib.pyplot", "sqlalchemy"]
+    ),
+    "landing_page_map": LazyHandler(
+        ".landing_page_map", "generate_landing_page_map",
+        dependencies=[
+            "pandas", "pyarrow.feather", "plotly.graph_objects",
+            "plotly.io.kaleido", "sqlalchemy"
+        ]
+    ),
+})
+
+handlers.warm_up()
 
+
+def main(payload):
     handler_name = payload["handler"]
     args = payload["payload"]
 
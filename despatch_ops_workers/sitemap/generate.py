@@ -3,19 +3,28 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from os import path
+from os import path, getenv
+from math import ceil
 from datetime import datetime
+from typing import List, Union
 
 # 3rd party:
 from jinja2 import FileSystemLoader, Environment
+from orjson import dumps, loads
 
 # Internal:
 try:
     from __app__.storage import StorageClient
-    from .local_pages import get_page_urls
+    from __app__.utilities.settings import SITE_URL
+    from __app__.utilities.incremental import IncrementalAsset, fingerprint
+    from .local_pages import locations, get_lookup_content, get_section_urls
 except ImportError:
     from storage import StorageClient
-    from despatch_ops_workers.sitemap.local_pages import get_page_urls
+    from utilities.settings import SITE_URL
+    from utilities.incremental import IncrementalAsset, fingerprint
+    from despatch_ops_workers.sitemap.local_pages import (
+        locations, get_lookup_content, get_section_urls
+    )
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -29,6 +38,13 @@ ACCESSIBILITY_DATA_PATH = "assets/modals/accessibility.md"
 
 SITEMAP_PATH = "assets/supplements/sitemap.xml"
 
+# Sitemaps are split into an index once the number of
+# URLs exceeds the limit of the protocol.
+MAX_SITEMAP_URLS = int(getenv("SITEMAP_MAX_URLS", 50_000))
+
+CHILD_SITEMAP_PATH = "assets/supplements/sitemaps/{name}.xml"
+PUBLIC_URL = SITE_URL.strip("/") + "/public/{path}"
+
 SITEMAP_KWS = dict(
     container="publicdata",
     content_type="application/xml",
@@ -48,26 +64,112 @@ def get_modal_timestamp(filepath):
             return blob['last_modified'].strftime("%Y-%m-%dT%H:%M:%S+00:00")
 
 
-def store_sitemap(data):
-    with StorageClient(path=SITEMAP_PATH, **SITEMAP_KWS) as client:
-        client.upload(data)
+def update_section(asset: IncrementalAsset, page_name: str, timestamp: str) -> Union[List[str], None]:
+    """
+    Regenerates the URLs of the sub-pages of ``page_name``
+    if their inputs have changed since the last run.
+
+    The timestamp is not an input: unchanged sections keep the
+    ``lastmod`` of the release in which they were last changed.
+
+    Returns
+    -------
+    Union[List[str], None]
+        URLs of the section, or ``None`` if it is unchanged.
+    """
+    source = fingerprint(SITE_URL, locations[page_name], get_lookup_content())
+
+    if asset.is_current(page_name, source):
+        return None
+
+    urls = get_section_urls(page_name, timestamp)
+    asset.save_section(page_name, source, dumps(urls).decode(), urls=len(urls), lastmod=timestamp)
+
+    return urls
+
+
+def get_section(asset: IncrementalAsset, sections, page_name: str) -> List[str]:
+    urls = sections[page_name]
+
+    if urls is None:
+        urls = loads(asset.load_section(page_name))
+
+    return urls
+
+
+def publish_sitemap(asset: IncrementalAsset, sections, template, template_kws):
+    sub_pages = str.join("", (
+        url
+        for page_name in locations
+        for url in get_section(asset, sections, page_name)
+    ))
+
+    sitemap = template.render(sub_pages=sub_pages, **template_kws)
+    asset.publish(SITEMAP_PATH, sitemap, **SITEMAP_KWS)
+
+
+def publish_index(asset: IncrementalAsset, sections, pages: str, timestamp: str):
+    urlset = env.get_template("urlset.xml")
+    sitemaps = list()
+
+    pages_path = CHILD_SITEMAP_PATH.format(name="pages")
+    asset.publish(pages_path, pages, **SITEMAP_KWS)
+    sitemaps.append({"loc": PUBLIC_URL.format(path=pages_path), "lastmod": timestamp})
+
+    for page_name in locations:
+        metadata = asset.get_metadata(page_name)
+        paths = [
+            CHILD_SITEMAP_PATH.format(name=f"{page_name}-{index}")
+            for index in range(ceil(metadata["urls"] / MAX_SITEMAP_URLS))
+        ]
+
+        # Unchanged sections are neither loaded nor uploaded.
+        if sections[page_name] is not None or not all(map(asset.is_published, paths)):
+            urls = get_section(asset, sections, page_name)
+
+            for index, child_path in enumerate(paths):
+                chunk = urls[index * MAX_SITEMAP_URLS: (index + 1) * MAX_SITEMAP_URLS]
+                asset.publish(child_path, urlset.render(urls=str.join("", chunk)), **SITEMAP_KWS)
+
+        sitemaps.extend(
+            {"loc": PUBLIC_URL.format(path=child_path), "lastmod": metadata["lastmod"]}
+            for child_path in paths
+        )
+
+    index = env.get_template("sitemap_index.xml").render(sitemaps=sitemaps)
+    asset.publish(SITEMAP_PATH, index, **SITEMAP_KWS)
 
 
 def generate_sitemap(payload):
     timestamp = datetime.fromisoformat(payload["timestamp"])
     formatted_timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%S+00:00")
 
-    template = env.get_template("sitemap.xml")
-    page_urls = get_page_urls(formatted_timestamp)
+    asset = IncrementalAsset("sitemap")
 
-    sitemap = template.render(
+    sections = {
+        page_name: update_section(asset, page_name, formatted_timestamp)
+        for page_name in locations
+    }
+
+    template = env.get_template("sitemap.xml")
+    template_kws = dict(
         timestamp=formatted_timestamp,
         accessibility_timestamp=get_modal_timestamp(ACCESSIBILITY_DATA_PATH),
         about_timestamp=get_modal_timestamp(ABOUT_DATA_PATH),
-        sub_pages=page_urls
     )
 
-    store_sitemap(sitemap)
+    pages = template.render(sub_pages=str(), **template_kws)
+    total_urls = pages.count("<url>") + sum(
+        asset.get_metadata(page_name)["urls"]
+        for page_name in locations
+    )
+
+    if total_urls <= MAX_SITEMAP_URLS:
+        publish_sitemap(asset, sections, template, template_kws)
+    else:
+        publish_index(asset, sections, pages, formatted_timestamp)
+
+    asset.commit()
 
     return f"DONE: Sitemaps {payload['timestamp']}"
 
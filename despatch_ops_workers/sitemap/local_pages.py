@@ -4,6 +4,8 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 from os import path
+from functools import lru_cache
+from typing import List
 from urllib.parse import urlencode, quote
 from lxml import etree
 
@@ -19,6 +21,9 @@ except ImportError:
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 __all__ = [
+    'locations',
+    'get_lookup_content',
+    'get_section_urls',
     'get_page_urls'
 ]
 
@@ -79,25 +84,46 @@ def get_urls(row, area_type, page_name, timestamp):
     return to_xml_record(absolute_url, timestamp)
 
 
-def get_page_urls(timestamp):
+@lru_cache(maxsize=1)
+def load_lookup():
     lookup = read_csv(lookup_table_path, usecols=["areaType", "areaName"])
-    results = list()
     lookup.areaType = lookup.areaType.str.lower()
 
-    for page_name, area_types in locations.items():
-        for area_type in area_types:
-            page_urls = (
-                lookup
-                .loc[lookup.areaType == area_type, ["areaName"]]
-                .apply(
-                    get_urls,
-                    area_type=area_type,
-                    page_name=page_name,
-                    timestamp=timestamp,
-                    axis=1
-                )
+    return lookup
+
+
+@lru_cache(maxsize=1)
+def get_lookup_content() -> bytes:
+    with open(lookup_table_path, "rb") as fp:
+        return fp.read()
+
+
+def get_section_urls(page_name: str, timestamp: str) -> List[str]:
+    lookup = load_lookup()
+    results = list()
+
+    for area_type in locations[page_name]:
+        page_urls = (
+            lookup
+            .loc[lookup.areaType == area_type, ["areaName"]]
+            .apply(
+                get_urls,
+                area_type=area_type,
+                page_name=page_name,
+                timestamp=timestamp,
+                axis=1
             )
+        )
+
+        results.extend(page_urls)
+
+    return results
+
+
+def get_page_urls(timestamp):
+    results = list()
 
-            results.extend(page_urls)
+    for page_name in locations:
+        results.extend(get_section_urls(page_name, timestamp))
 
     return str.join("", results)
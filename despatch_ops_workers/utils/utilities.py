@@ -3,11 +3,157 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
+import logging
+from os import getenv
+from pathlib import Path
+from zlib import compressobj, Z_BEST_COMPRESSION, MAX_WBITS
+from typing import Iterable, Dict, Callable, Tuple
 
 # 3rd party:
+from azure.core.exceptions import ResourceNotFoundError
 
-# Internal: 
+try:
+    from brotli import Compressor as BrotliCompressor
+except ImportError:
+    BrotliCompressor = None
+
+# Internal:
+try:
+    from __app__.storage import StorageClient
+except ImportError:
+    from storage import StorageClient
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+__all__ = [
+    'compress_variants',
+    'get_versioned_asset',
+    'upload_variants'
+]
+
+
+ASSET_CACHE_CONTAINER = "pipeline"
+ASSET_CACHE_PREFIX = "despatch/asset_cache"
+
+# Directory used in place of the blob storage cache when running offline.
+LOCAL_ASSET_CACHE = getenv("DESPATCH_ASSET_CACHE_DIR")
+
+GZIP_WBITS = MAX_WBITS | 16
+
+_asset_cache: Dict[Tuple[str, str], bytes] = dict()
+
+
+def compress_variants(chunks: Iterable[bytes]) -> Dict[str, bytes]:
+    """
+    Compresses a payload using every supported content encoding in
+    a single pass over its chunks.
+
+    Parameters
+    ----------
+    chunks: Iterable[bytes]
+        Serialised payload, in order.
+
+    Returns
+    -------
+    Dict[str, bytes]
+        Compressed payloads keyed by their ``Content-Encoding``. Brotli
+        is only included when the ``brotli`` package is installed.
+    """
+    gzip_compressor = compressobj(Z_BEST_COMPRESSION, wbits=GZIP_WBITS)
+    compressors = {"gzip": (gzip_compressor.compress, gzip_compressor.flush)}
+
+    if BrotliCompressor is not None:
+        brotli_compressor = BrotliCompressor()
+        compressors["br"] = (brotli_compressor.process, brotli_compressor.finish)
+
+    outputs = {encoding: list() for encoding in compressors}
+
+    for chunk in chunks:
+        for encoding, (compress, _) in compressors.items():
+            outputs[encoding].append(compress(chunk))
+
+    for encoding, (_, finalise) in compressors.items():
+        outputs[encoding].append(finalise())
+
+    return {encoding: b"".join(output) for encoding, output in outputs.items()}
+
+
+def upload_variants(variants: Dict[str, bytes], container: str, path: str, **kwargs):
+    """
+    Uploads pre-compressed variants of the same payload. The ``gzip``
+    variant is stored at ``path``, and every other encoding at
+    ``path.<encoding>``.
+    """
+    for encoding, payload in variants.items():
+        blob_path = path if encoding == "gzip" else f"{path}.{encoding}"
+
+        with StorageClient(
+                container=container,
+                path=blob_path,
+                content_encoding=encoding,
+                **kwargs
+        ) as cli:
+            cli.upload(payload)
+
+
+def get_versioned_asset(name: str, version: str, loader: Callable[[], bytes]) -> bytes:
+    """
+    Retrieves a static asset from the versioned asset cache, and
+    populates the cache using ``loader`` on a miss.
+
+    Assets are cached in memory for the lifetime of the worker, and
+    persisted either in ``DESPATCH_ASSET_CACHE_DIR`` (when set) or in
+    blob storage. A new ``version`` invalidates all previous entries.
+
+    Parameters
+    ----------
+    name: str
+        Name of the asset, e.g. ``geometry/utla.jsonl``.
+
+    version: str
+        Version of the asset source.
+
+    loader: Callable[[], bytes]
+        Produces the asset if it is not already cached.
+
+    Returns
+    -------
+    bytes
+    """
+    key = (name, version)
+
+    if key in _asset_cache:
+        return _asset_cache[key]
+
+    path = f"{ASSET_CACHE_PREFIX}/{version}/{name}"
+
+    if LOCAL_ASSET_CACHE:
+        local_path = Path(LOCAL_ASSET_CACHE, path)
+
+        if local_path.exists():
+            payload = local_path.read_bytes()
+        else:
+            payload = loader()
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            local_path.write_bytes(payload)
+
+        _asset_cache[key] = payload
+        return payload
+
+    with StorageClient(
+            container=ASSET_CACHE_CONTAINER,
+            path=path,
+            content_type="application/octet-stream",
+            compressed=False,
+            content_language=None
+    ) as cli:
+        try:
+            payload = cli.download().readall()
+        except ResourceNotFoundError:
+            logging.info(f"Asset cache miss: '{path}'")
+            payload = loader()
+            cli.upload(payload)
+
+    _asset_cache[key] = payload
 
+    return payload
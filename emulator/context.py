@@ -0,0 +1,122 @@
+#!/usr/bin python3
+
+"""
+In-process stand-in for the subset of ``DurableOrchestrationContext``
+used by the orchestrators.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from datetime import datetime
+from json import dumps
+from typing import Any, List, Union, Iterable, Tuple
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'Task',
+    'TaskSet',
+    'EmulatedContext'
+]
+
+
+ACTIVITY = "activity"
+SUB_ORCHESTRATOR = "orchestrator"
+
+
+class Task:
+    """
+    Activity or sub-orchestration scheduled by an orchestrator.
+    """
+    def __init__(self, kind: str, name: str, input_: Any = None,
+                 retry_options: Any = None, instance_id: Union[str, None] = None):
+        self.kind = kind
+        self.name = name
+        self.input = input_
+        self.retry_options = retry_options
+        self.instance_id = instance_id
+
+    @property
+    def signature(self) -> Tuple[str, str, str]:
+        return self.kind, self.name, dumps(self.input, sort_keys=True, default=str)
+
+    def __repr__(self):
+        return f"<Task {self.kind}:{self.name}>"
+
+
+class TaskSet:
+    """
+    Tasks awaited together through ``task_all``.
+    """
+    def __init__(self, tasks: Iterable[Task]):
+        self.tasks: List[Task] = list(tasks)
+
+    @property
+    def signature(self) -> Tuple[Tuple[str, str, str], ...]:
+        return tuple(task.signature for task in self.tasks)
+
+    def __repr__(self):
+        return f"<TaskSet of {len(self.tasks)}>"
+
+
+class EmulatedContext:
+    """
+    Orchestration context for the emulator.
+
+    Scheduling methods return task descriptors which the orchestrator
+    yields back to the emulator, as it would to the Durable Functions
+    runtime. ``current_utc_datetime`` only advances when the orchestrator
+    resumes, and is taken from the history during replay.
+    """
+    def __init__(self, input_: Any, instance_id: str, started: datetime,
+                 is_replaying: bool = False):
+        self._input = input_
+        self.instance_id = instance_id
+        self.current_utc_datetime = started
+        self.is_replaying = is_replaying
+        self.custom_status = None
+
+    def get_input(self) -> Any:
+        return self._input
+
+    def set_custom_status(self, status: Any):
+        self.custom_status = status
+
+    def call_activity(self, name: str, input_: Any = None) -> Task:
+        return Task(ACTIVITY, name, input_)
+
+    def call_activity_with_retry(self, name: str, retry_options: Any,
+                                 input_: Any = None) -> Task:
+        return Task(ACTIVITY, name, input_, retry_options=retry_options)
+
+    def call_sub_orchestrator(self, name: str, input_: Any = None,
+                              instance_id: Union[str, None] = None) -> Task:
+        return Task(SUB_ORCHESTRATOR, name, input_, instance_id=instance_id)
+
+    def call_sub_orchestrator_with_retry(self, name: str, retry_options: Any,
+                                         input_: Any = None,
+                                         instance_id: Union[str, None] = None) -> Task:
+        return Task(
+            SUB_ORCHESTRATOR, name, input_,
+            retry_options=retry_options,
+            instance_id=instance_id
+        )
+
+    def task_all(self, activities: Iterable[Task]) -> TaskSet:
+        return TaskSet(activities)
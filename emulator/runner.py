@@ -0,0 +1,385 @@
+#!/usr/bin python3
+
+"""
+Runs orchestrators and their activities in-process, as the
+Durable Functions runtime would.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from importlib import import_module
+from inspect import isgeneratorfunction
+from json import loads, dumps
+from random import Random
+from threading import Lock, Semaphore
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Union
+from uuid import uuid4
+
+# 3rd party:
+
+# Internal:
+try:
+    from __app__.emulator.context import (
+        Task, TaskSet, EmulatedContext, ACTIVITY
+    )
+except ImportError:
+    from emulator.context import (
+        Task, TaskSet, EmulatedContext, ACTIVITY
+    )
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'Emulator',
+    'RunReport',
+    'TaskRecord',
+    'NonDeterministicOrchestrationError'
+]
+
+
+Latency = Union[None, float, Tuple[float, float], Dict[str, Union[float, Tuple[float, float]]]]
+
+
+class NonDeterministicOrchestrationError(RuntimeError):
+    pass
+
+
+class TaskRecord(NamedTuple):
+    kind: str
+    name: str
+    instance_id: str
+    started: float
+    finished: float
+    attempts: int
+    success: bool
+
+
+class RunReport(NamedTuple):
+    output: Any
+    custom_status: Any
+    wall_time: float
+    critical_path: float
+    records: List[TaskRecord]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Aggregates the records by function name, slowest first.
+        """
+        summary = dict()
+
+        for record in self.records:
+            item = summary.setdefault(record.name, {
+                "name": record.name,
+                "kind": record.kind,
+                "calls": 0,
+                "failures": 0,
+                "total_time": 0.0,
+                "max_time": 0.0
+            })
+            duration = record.finished - record.started
+            item["calls"] += 1
+            item["failures"] += int(not record.success)
+            item["total_time"] += duration
+            item["max_time"] = max(item["max_time"], duration)
+
+        return sorted(summary.values(), key=lambda x: x["total_time"], reverse=True)
+
+
+class HistoryEvent(NamedTuple):
+    signature: Any
+    result: Any
+    error: Union[Exception, None]
+    completed_at: datetime
+    critical_path: float
+
+
+def serialise(obj: Any) -> Any:
+    # Payloads cross the runtime as JSON.
+    return loads(dumps(obj))
+
+
+def get_function(name: str) -> Callable:
+    return import_module(name).main
+
+
+def get_orchestrator_function(name: str) -> Callable:
+    handle = get_function(name)
+
+    func = getattr(handle, "orchestrator_function", None)
+    if func is not None:
+        return func
+
+    # Older releases of ``azure-functions-durable`` only keep the
+    # orchestrator in the closure of the handle.
+    for cell in handle.__closure__ or tuple():
+        if isgeneratorfunction(cell.cell_contents):
+            return cell.cell_contents
+
+    raise ValueError(f"'{name}' is not an orchestrator function.")
+
+
+class Emulator:
+    """
+    In-process emulator of the Durable Functions runtime.
+
+    Parameters
+    ----------
+    parallelism: int
+        Maximum number of activities running at the same time. [Default: 8]
+
+    latency: Latency
+        Scheduling latency injected before each activity, in seconds.
+        Either a constant, a ``(low, high)`` range, or a mapping of
+        function names onto either of those. [Default: ``None``]
+
+    retry_delay_scale: float
+        Scale applied to the retry intervals of the orchestrators.
+        Use ``0`` to retry immediately. [Default: ``1``]
+
+    verify_replay: bool
+        Whether to replay every orchestration against its history once
+        complete and fail if it schedules different tasks. [Default: ``True``]
+
+    seed: int
+        Seed for the latency injection. [Default: ``0``]
+    """
+    def __init__(self, parallelism: int = 8, latency: Latency = None,
+                 retry_delay_scale: float = 1, verify_replay: bool = True,
+                 seed: int = 0):
+        self.parallelism = parallelism
+        self.latency = latency
+        self.retry_delay_scale = retry_delay_scale
+        self.verify_replay = verify_replay
+
+        self._random = Random(seed)
+        self._lock = Lock()
+        self._slots = Semaphore(parallelism)
+        self._records: List[TaskRecord] = list()
+        self._origin = perf_counter()
+
+    def run(self, name: str, input_: Any = None) -> RunReport:
+        """
+        Runs an orchestrator to completion.
+
+        Parameters
+        ----------
+        name: str
+            Name of the orchestrator function.
+
+        input_: Any
+            Input to the orchestrator.
+
+        Returns
+        -------
+        RunReport
+        """
+        self._records = list()
+        self._origin = perf_counter()
+
+        context, output, critical_path = self._orchestrate(name, serialise(input_), str(uuid4()))
+
+        return RunReport(
+            output=output,
+            custom_status=context.custom_status,
+            wall_time=perf_counter() - self._origin,
+            critical_path=critical_path,
+            records=sorted(self._records, key=lambda x: x.started)
+        )
+
+    def _orchestrate(self, name: str, input_: Any,
+                     instance_id: str) -> Tuple[EmulatedContext, Any, float]:
+        func = get_orchestrator_function(name)
+        started = datetime.utcnow()
+        history: List[HistoryEvent] = list()
+
+        context = EmulatedContext(input_, instance_id, started)
+        output = self._drive(func, context, history)
+
+        if self.verify_replay:
+            replay_context = EmulatedContext(input_, instance_id, started, is_replaying=True)
+            replay_output = self._drive(func, replay_context, history, replay=True)
+
+            if serialise(replay_output) != serialise(output):
+                raise NonDeterministicOrchestrationError(
+                    f"'{name}' returned a different output when replayed."
+                )
+
+        critical_path = sum(event.critical_path for event in history)
+
+        return context, serialise(output), critical_path
+
+    def _drive(self, func: Callable, context: EmulatedContext,
+               history: List[HistoryEvent], replay: bool = False) -> Any:
+        generator = func(context)
+
+        if not hasattr(generator, "send"):
+            return generator
+
+        step = 0
+        result, error = None, None
+
+        while True:
+            try:
+                if error is not None:
+                    scheduled = generator.throw(error)
+                else:
+                    scheduled = generator.send(result)
+            except StopIteration as stop:
+                if replay and step != len(history):
+                    raise NonDeterministicOrchestrationError(
+                        f"'{context.instance_id}' completed after {step} of "
+                        f"{len(history)} steps when replayed."
+                    )
+
+                return stop.value
+
+            if not isinstance(scheduled, (Task, TaskSet)):
+                raise TypeError(f"Orchestrators must yield tasks, got '{scheduled!r}'.")
+
+            if replay:
+                if step >= len(history) or history[step].signature != scheduled.signature:
+                    raise NonDeterministicOrchestrationError(
+                        f"{scheduled!r} was scheduled at step {step} of "
+                        f"'{context.instance_id}', which does not match the history."
+                    )
+
+                event = history[step]
+            else:
+                event = self._execute(scheduled, context.instance_id)
+                history.append(event)
+
+            step += 1
+            context.current_utc_datetime = event.completed_at
+            result, error = event.result, event.error
+
+    def _execute(self, scheduled: Union[Task, TaskSet], instance_id: str) -> HistoryEvent:
+        if isinstance(scheduled, Task):
+            result, error, critical_path = self._run_task(scheduled, instance_id)
+        else:
+            result, error, critical_path = self._run_task_set(scheduled, instance_id)
+
+        return HistoryEvent(
+            signature=scheduled.signature,
+            result=result,
+            error=error,
+            completed_at=datetime.utcnow(),
+            critical_path=critical_path
+        )
+
+    def _run_task_set(self, task_set: TaskSet, instance_id: str) -> Tuple[Any, Any, float]:
+        if not task_set.tasks:
+            return list(), None, 0.0
+
+        # Each set gets its own pool, so that nested fan-outs of
+        # sub-orchestrators cannot starve their parents. Concurrency
+        # of activities is bounded globally by ``self._slots``.
+        workers = min(len(task_set.tasks), self.parallelism)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(
+                lambda task: self._run_task(task, instance_id),
+                task_set.tasks
+            ))
+
+        results = [result for result, _, _ in outcomes]
+        errors = [error for _, error, _ in outcomes if error is not None]
+        critical_path = max(duration for _, _, duration in outcomes)
+
+        return results, (errors[0] if errors else None), critical_path
+
+    def _run_task(self, task: Task, instance_id: str) -> Tuple[Any, Any, float]:
+        max_attempts = max(getattr(task.retry_options, "max_number_of_attempts", 1), 1)
+        interval = getattr(task.retry_options, "first_retry_interval_in_milliseconds", 0) / 1000
+        backoff = getattr(task.retry_options, "backoff_coefficient", 1)
+
+        started = perf_counter()
+        result, error, critical_path = None, None, 0.0
+
+        for attempt in range(1, max_attempts + 1):
+            if attempt > 1:
+                delay = interval * backoff ** (attempt - 2) * self.retry_delay_scale
+                logging.warning(f"Retrying '{task.name}' in {delay:.1f}s: {error}")
+                sleep(delay)
+
+            attempt_started = perf_counter()
+
+            try:
+                if task.kind == ACTIVITY:
+                    result = self._call_activity(task)
+                    attempt_path = perf_counter() - attempt_started
+                else:
+                    _, result, attempt_path = self._orchestrate(
+                        task.name,
+                        serialise(task.input),
+                        task.instance_id or str(uuid4())
+                    )
+            except NonDeterministicOrchestrationError:
+                raise
+            except Exception as err:
+                error = err
+                continue
+
+            # Failed attempts and retry intervals are on the critical path.
+            critical_path = attempt_started - started + attempt_path
+            error = None
+            break
+
+        if error is not None:
+            critical_path = perf_counter() - started
+
+        self._record(TaskRecord(
+            kind=task.kind,
+            name=task.name,
+            instance_id=instance_id,
+            started=started - self._origin,
+            finished=perf_counter() - self._origin,
+            attempts=attempt,
+            success=error is None
+        ))
+
+        return result, error, critical_path
+
+    def _call_activity(self, task: Task) -> Any:
+        delay = self._get_latency(task.name)
+        if delay:
+            sleep(delay)
+
+        func = get_function(task.name)
+
+        with self._slots:
+            return serialise(func(serialise(task.input)))
+
+    def _get_latency(self, name: str) -> float:
+        latency = self.latency
+
+        if isinstance(latency, dict):
+            latency = latency.get(name)
+
+        if latency is None:
+            return 0.0
+
+        if isinstance(latency, (tuple, list)):
+            with self._lock:
+                return self._random.uniform(*latency)
+
+        return float(latency)
+
+    def _record(self, record: TaskRecord):
+        with self._lock:
+            self._records.append(record)
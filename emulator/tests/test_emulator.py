@@ -0,0 +1,128 @@
+import site
+import pathlib
+import sys
+import tempfile
+import textwrap
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+
+from emulator import Emulator, NonDeterministicOrchestrationError
+
+
+FUNCTIONS = {
+    "fake_activity": """
+        from time import sleep
+
+        def main(payload):
+            sleep(payload["duration"])
+            return payload["value"] * 2
+    """,
+    "fake_flaky_activity": """
+        attempts = list()
+
+        def main(payload):
+            attempts.append(payload)
+            if len(attempts) < 3:
+                raise RuntimeError("Transient failure")
+            return len(attempts)
+    """,
+    "fake_sub_orchestrator": """
+        from azure.durable_functions import Orchestrator, RetryOptions
+
+        @Orchestrator.create
+        def main(context):
+            retry_options = RetryOptions(
+                first_retry_interval_in_milliseconds=1_000,
+                max_number_of_attempts=3
+            )
+            result = yield context.call_activity_with_retry(
+                "fake_flaky_activity",
+                retry_options=retry_options,
+                input_=context.get_input()
+            )
+            return result
+    """,
+    "fake_orchestrator": """
+        from azure.durable_functions import Orchestrator
+
+        @Orchestrator.create
+        def main(context):
+            payload = context.get_input()
+            tasks = [
+                context.call_activity(
+                    "fake_activity",
+                    input_=dict(value=value, duration=payload["duration"])
+                )
+                for value in range(payload["count"])
+            ]
+            results = yield context.task_all(tasks)
+
+            attempts = yield context.call_sub_orchestrator("fake_sub_orchestrator", input_=dict())
+            context.set_custom_status("done")
+
+            return dict(total=sum(results), attempts=attempts)
+    """,
+    "fake_non_deterministic_orchestrator": """
+        from uuid import uuid4
+        from azure.durable_functions import Orchestrator
+
+        @Orchestrator.create
+        def main(context):
+            result = yield context.call_activity(
+                "fake_activity",
+                input_=dict(value=1, duration=0, nonce=str(uuid4()))
+            )
+            return result
+    """,
+}
+
+
+class TestEmulator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.functions_dir = tempfile.TemporaryDirectory()
+
+        for name, source in FUNCTIONS.items():
+            path = pathlib.Path(cls.functions_dir.name, name)
+            path.mkdir()
+            path.joinpath("__init__.py").write_text(textwrap.dedent(source))
+
+        sys.path.insert(0, cls.functions_dir.name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        sys.path.remove(cls.functions_dir.name)
+        cls.functions_dir.cleanup()
+
+    def test_fan_out(self):
+        emulator = Emulator(parallelism=4, latency=0.05, retry_delay_scale=0)
+        report = emulator.run("fake_orchestrator", dict(count=8, duration=0.1))
+
+        self.assertEqual(report.output, dict(total=56, attempts=3))
+        self.assertEqual(report.custom_status, "done")
+
+        summary = {item["name"]: item for item in report.summary()}
+        self.assertEqual(summary["fake_activity"]["calls"], 8)
+        self.assertEqual(summary["fake_flaky_activity"]["calls"], 1)
+
+        flaky = next(rec for rec in report.records if rec.name == "fake_flaky_activity")
+        self.assertEqual(flaky.attempts, 3)
+
+        # 8 activities of 0.15s each on 4 slots take at least 2 rounds,
+        # whereas the critical path only includes one of them.
+        self.assertGreaterEqual(report.wall_time, 0.3)
+        self.assertLess(report.critical_path, report.wall_time)
+
+    def test_non_deterministic_replay(self):
+        emulator = Emulator()
+
+        with self.assertRaises(NonDeterministicOrchestrationError):
+            emulator.run("fake_non_deterministic_orchestrator")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+#!/usr/bin python3
+
+"""
+Measures the cold-start cost of the entry points of the app.
+
+Every entry point is imported in a fresh interpreter, and the wall
+time of the import, the number of modules loaded, and the heavy
+libraries pulled in are reported. Entry points are either Functions
+(e.g. ``despatch_ops_workers``) or handlers of a router, imported on
+first dispatch (e.g. ``despatch_ops_workers:og_images``). All the
+Functions are measured if no entry points are given.
+
+    python -m lazy_handlers.benchmark [entry points] [--repeat N] [--output path]
+
+When ``--output`` is set, the results are appended to that file as
+JSON lines so that they may be tracked across changes.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+from datetime import datetime
+from importlib import import_module
+from json import dumps, loads
+from pathlib import Path
+from statistics import median
+from subprocess import run, PIPE
+from time import perf_counter
+from typing import Any, Dict, List
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'measure',
+    'benchmark'
+]
+
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+HEAVY_LIBRARIES = [
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "matplotlib",
+    "plotly",
+    "kaleido",
+    "reportlab",
+    "svglib",
+    "lxml",
+    "jinja2",
+    "sqlalchemy",
+]
+
+
+def get_functions() -> List[str]:
+    return sorted(
+        path.parent.name
+        for path in ROOT_PATH.glob("*/function.json")
+    )
+
+
+def measure(entry_point: str) -> Dict[str, Any]:
+    """
+    Imports the entry point in the current interpreter.
+    Must be called in a fresh interpreter.
+    """
+    module_name, _, handler_name = entry_point.partition(":")
+    loaded = set(sys.modules)
+
+    start = perf_counter()
+
+    module = import_module(module_name)
+    if handler_name:
+        # Handlers are registered in the router of the package.
+        router = getattr(module, "router", None) or import_module(f"{module_name}.router")
+        router.handlers[handler_name].load()
+
+    import_time = perf_counter() - start
+
+    modules = set(sys.modules) - loaded
+
+    return {
+        "import_time": import_time,
+        "modules": len(modules),
+        "libraries": [lib for lib in HEAVY_LIBRARIES if lib in modules],
+    }
+
+
+def measure_cold(entry_point: str) -> Dict[str, Any]:
+    result = run(
+        [sys.executable, "-m", "lazy_handlers.benchmark", "--child", entry_point],
+        cwd=ROOT_PATH,
+        stdout=PIPE,
+        stderr=PIPE,
+        universal_newlines=True
+    )
+
+    if result.returncode:
+        error = result.stderr.strip().splitlines() or ["Unknown error"]
+        return {"error": error[-1]}
+
+    return loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(entry_points: List[str], repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Measures the cold-start cost of the entry points.
+
+    Parameters
+    ----------
+    entry_points: List[str]
+        Modules, or handlers as ``<module>:<handler>``.
+
+    repeat: int
+        Number of fresh interpreters per entry point. The
+        median import time is reported. [Default: 3]
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+    """
+    timestamp = datetime.utcnow().isoformat()
+    records = list()
+
+    for entry_point in entry_points:
+        runs = [measure_cold(entry_point) for _ in range(repeat)]
+        failures = [item for item in runs if "error" in item]
+
+        record = {
+            "timestamp": timestamp,
+            "entry_point": entry_point,
+            "import_time": None,
+            "modules": None,
+            "libraries": None,
+            "error": failures[0]["error"] if failures else None,
+        }
+
+        if not failures:
+            record.update({
+                "import_time": median(item["import_time"] for item in runs),
+                "modules": runs[0]["modules"],
+                "libraries": runs[0]["libraries"],
+            })
+
+        records.append(record)
+
+    return records
+
+
+def main():
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Measures the cold-start cost of the entry points.")
+    parser.add_argument("entry_points", nargs="*", help="Modules or '<module>:<handler>'.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per entry point.")
+    parser.add_argument("--output", help="JSON-lines file to which the results are appended.")
+    parser.add_argument("--child", help="Measures the entry point in this interpreter.")
+
+    args = parser.parse_args()
+
+    if args.child:
+        print(dumps(measure(args.child)))
+        return None
+
+    records = benchmark(args.entry_points or get_functions(), repeat=args.repeat)
+
+    for record in records:
+        if record["error"]:
+            print(f"{record['entry_point']:<60} FAILED: {record['error']}")
+            continue
+
+        print(
+            f"{record['entry_point']:<60} "
+            f"{record['import_time']:>8.3f}s "
+            f"{record['modules']:>6} modules  "
+            f"{', '.join(record['libraries'])}"
+        )
+
+    if args.output:
+        with open(args.output, "a") as fp:
+            for record in records:
+                print(dumps(record), file=fp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin python3
+
+"""
+Registry of handlers that are imported on first dispatch.
+
+Handlers declare the heavy libraries on which they depend. These
+may be preloaded in the background when the worker starts, so that
+the first dispatch does not pay for them. Only the handlers listed
+in ``WARM_UP_HANDLERS`` (comma separated, or ``*`` for all) are
+warmed up, which is set per Function app.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from os import getenv
+from importlib import import_module
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Union
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'LazyHandler',
+    'HandlerRegistry',
+    'import_app_module'
+]
+
+
+WARM_UP_HANDLERS = getenv("WARM_UP_HANDLERS")
+
+APP_PACKAGE = "__app__"
+
+
+def import_app_module(name: str, package: Union[str, None] = None):
+    """
+    Imports a module of the app - i.e. from ``__app__`` when
+    deployed, otherwise from the root of the repository.
+
+    Parameters
+    ----------
+    name: str
+        Name of the module. Relative to ``package`` if
+        it starts with a dot.
+
+    package: Union[str, None]
+        Package against which relative names are resolved.
+
+    Returns
+    -------
+    ModuleType
+    """
+    if name.startswith("."):
+        return import_module(name, package=package)
+
+    try:
+        return import_module(f"{APP_PACKAGE}.{name}")
+    except ModuleNotFoundError as err:
+        if err.name != APP_PACKAGE:
+            raise err
+
+    return import_module(name)
+
+
+class LazyHandler:
+    """
+    Handler that is imported on first call.
+
+    Parameters
+    ----------
+    module: str
+        Module that defines the handler. Relative to the
+        package of the registry if it starts with a dot.
+
+    name: str
+        Name of the handler in ``module``.
+
+    dependencies: Iterable[str]
+        Heavy libraries imported by ``module``, which are
+        preloaded by the warm-up.
+    """
+    def __init__(self, module: str, name: str, dependencies: Iterable[str] = tuple()):
+        self.module = module
+        self.name = name
+        self.dependencies = tuple(dependencies)
+        self.package = None
+        self._func = None
+        self._lock = Lock()
+
+    def load(self) -> Callable[[Any], Any]:
+        if self._func is not None:
+            return self._func
+
+        with self._lock:
+            if self._func is None:
+                start = perf_counter()
+                module = import_app_module(self.module, package=self.package)
+                self._func = getattr(module, self.name)
+
+                logging.info(
+                    f"Loaded handler '{self.module}:{self.name}' "
+                    f"in {perf_counter() - start:.3f}s"
+                )
+
+        return self._func
+
+    def preload(self):
+        for dependency in self.dependencies:
+            import_module(dependency)
+
+    def __call__(self, payload):
+        return self.load()(payload)
+
+    def __repr__(self):
+        return f"<LazyHandler '{self.module}:{self.name}'>"
+
+
+class HandlerRegistry:
+    """
+    Handlers of a router, by name.
+
+    Parameters
+    ----------
+    package: str
+        Package of the router, against which the relative
+        modules of the handlers are resolved.
+
+    handlers: Dict[str, LazyHandler]
+        Handlers by name.
+    """
+    def __init__(self, package: str, handlers: Dict[str, LazyHandler]):
+        self.package = package
+        self.handlers = handlers
+
+        for handler in handlers.values():
+            handler.package = package
+
+    def __getitem__(self, name: str) -> LazyHandler:
+        return self.handlers[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.handlers
+
+    def warm_up(self, names: Union[str, None] = WARM_UP_HANDLERS) -> Union[Thread, None]:
+        """
+        Preloads the dependencies of the handlers in a background
+        thread. Handlers that are not in the registry are ignored.
+
+        Parameters
+        ----------
+        names: Union[str, None]
+            Comma separated names of the handlers, or ``*`` for all
+            handlers. Does nothing if ``None``.
+            [Default: ``WARM_UP_HANDLERS`` environment variable]
+
+        Returns
+        -------
+        Union[Thread, None]
+        """
+        if not names:
+            return None
+
+        if names.strip() == "*":
+            handlers = list(self.handlers.values())
+        else:
+            handlers = [
+                self.handlers[name.strip()]
+                for name in names.split(",")
+                if name.strip() in self.handlers
+            ]
+
+        if not handlers:
+            return None
+
+        thread = Thread(target=self._preload, args=(handlers,), daemon=True)
+        thread.start()
+
+        return thread
+
+    def _preload(self, handlers: Iterable[LazyHandler]):
+        start = perf_counter()
+
+        for handler in handlers:
+            try:
+                handler.preload()
+            except Exception as err:
+                # The handler will report the error on dispatch.
+                logging.warning(f"Failed to warm up {handler}: {err}")
+
+        logging.info(f"Warmed up '{self.package}' in {perf_counter() - start:.3f}s")
@@ -16,10 +16,8 @@ import logging
 from datetime import datetime
 from json import dumps, loads
 from os import getenv, path
-from functools import reduce
 
 # 3rd party:
-from pandas import DataFrame
 from sqlalchemy import text, select, and_, not_
 from requests import post
 from jinja2 import FileSystemLoader, Environment
@@ -30,10 +28,12 @@ try:
     from __app__.storage import StorageClient
     from __app__.db_tables.covid19 import Session, ReportRecipient
     from __app__.main_etl_postprocessors.private_report import get_record_id
+    from __app__.main_etl_postprocessors.report_figures import get_report_figures, figures_by_area
 except ImportError:
     from storage import StorageClient
     from db_tables.covid19 import Session, ReportRecipient
     from main_etl_postprocessors.private_report import get_record_id
+    from main_etl_postprocessors.report_figures import get_report_figures, figures_by_area
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Header
@@ -138,17 +138,6 @@ test_emails = {
     "bcc": list()
 }
 
-QUERY = """\
-SELECT MAX(date)::TEXT AS date, metric, (payload -> 'value')::FLOAT AS value
-FROM covid19.time_series_p{datestamp}_other AS ts
-JOIN covid19.metric_reference AS mr ON mr.id = ts.metric_id
-JOIN covid19.area_reference AS ar ON ar.id = ts.area_id
-WHERE area_name = '{area_name}'
-  AND metric = ANY('{metric}'::VARCHAR[])
-  AND (payload ->> 'value') NOTNULL
-GROUP BY metric, payload;\
-"""
-
 ANNOUNCEMENTS = """\
 WITH latest_release AS (
     SELECT MAX(rr.timestamp)::DATE
@@ -200,63 +189,27 @@ def extract_latest_data(date):
     float_metric_tokens = ["rate", "uptake"]
 
     datestamp = datetime.fromisoformat(date)
+    figures = figures_by_area(get_report_figures(datestamp))
 
     for struct_name, struct in metric_structs.items():
-        col_names = [item["metric"] for item in reduce(lambda x, y: x + y, struct)]
-
-        session = Session()
-        conn = session.connection()
-        try:
-            resp = conn.execute(
-                text(QUERY.format(
-                    datestamp=f"{datestamp:%Y_%-m_%-d}",
-                    metric=f'{{{str.join(",", col_names)}}}',
-                    area_name=struct_name
-                )),
-
-            )
-            values = resp.fetchall()
-        except Exception as err:
-            session.rollback()
-            raise err
-        finally:
-            session.close()
-
-        data = (
-            DataFrame(values, columns=["date", "metric", "value"])
-            .pivot_table(
-                values="value",
-                index=["date"],
-                columns=["metric"],
-                aggfunc="first"
-            )
-            .reset_index()
-        )
+        area_figures = figures.get(struct_name, dict())
 
         for collection in struct:
             coll = list()
             for item in collection:
-                label, metric, name = item['label'], item['metric'], item["name"]
+                metric, name = item['metric'], item["name"]
 
                 try:
-                    date = (
-                        data
-                        .loc[:, ["date", metric]]
-                        .dropna()
-                        .date
-                        .max()
-                    )
-
-                    value = data.loc[data.date == date, metric].values.tolist().pop()
+                    figure = area_figures[metric]
 
                     if any(token in metric.lower() for token in float_metric_tokens):
-                        value_fmt = format(value, ".1f")
+                        value_fmt = format(figure.value, ".1f")
                     else:
-                        value_fmt = format(int(value), ",d")
+                        value_fmt = format(int(figure.value), ",d")
 
                     coll.append({
                         "name": name,
-                        "date": datetime.strptime(date, "%Y-%m-%d").strftime("%d %b %Y"),
+                        "date": figure.date.strftime("%d %b %Y"),
                         "value": value_fmt
                     })
 
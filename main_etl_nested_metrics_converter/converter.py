@@ -21,9 +21,11 @@ from sqlalchemy.dialects.postgresql import insert
 try:
     from __app__.db_tables.covid19 import MainData, MetricReference, Session
     from __app__.main_etl_nested_metrics_converter import queries
+    from __app__.db_etl_upload import UPSERT_RETURNING, record_upserts
 except ImportError:
     from db_tables.covid19 import MainData, MetricReference, Session
     from main_etl_nested_metrics_converter import queries
+    from db_etl_upload import UPSERT_RETURNING, record_upserts
 
 
 __all__ = [
@@ -96,6 +98,7 @@ def to_sql(data: list):
 
     logging.info(f"Writing/updating nested metrics to DB ({all_rows} rows)")
     dates = set()
+    upserted = list()
 
     try:
         for row in data:
@@ -105,16 +108,22 @@ def to_sql(data: list):
                 set_=dict(payload=insert_statement.excluded.payload)
             )
 
-            connection.execute(statement)
+            result = connection.execute(statement.returning(*UPSERT_RETURNING))
+            upserted.extend(result)
             session.flush()
 
             count += 1
             dates.add(str(row.date))
 
             if count >= all_rows / 10 * done_10th:
+                record_upserts(connection, upserted)
+                upserted.clear()
+
                 logging.info(f"Nested metrics, rows saved: {count} ({done_10th * 10}%)")
                 done_10th += 1
 
+        record_upserts(connection, upserted)
+
     except Exception as err:
         session.rollback()
         raise err
@@ -190,26 +190,33 @@ def main(context: DurableOrchestrationContext):
 
     # ====================================================================================
 
-    tasks = list()
-
     # Retrieve scales
     context.set_custom_status("Requesting latest scale records.")
 
-    area_types = ["nation", "region", "utla", "ltla", "msoa"]
-
-    for area_type in area_types:
-        task = context.call_activity_with_retry(
-            "rate_scales_worker",
-            retry_options=retry_twice_opts,
-            input_={
-                "type": "RETRIEVE",
-                "timestamp": raw_timestamp,
-                "area_type": area_type
-            }
-        )
-        tasks.append(task)
+    # Scale records are read from the release data, which
+    # is extracted once for all area types. The release is
+    # resolved here, and its ID is passed on to the workers.
+    release = yield context.call_activity_with_retry(
+        "despatch_ops_workers",
+        retry_options=retry_twice_opts,
+        input_={
+            "handler": "release_data",
+            "payload": {"timestamp": raw_timestamp}
+        }
+    )
 
-    raw_scale_records = yield context.task_all(tasks)
+    # Rates and percentiles of all area types are stored as an
+    # artefact of the release, which is read by the generators.
+    # Only the number of shards per area type is returned.
+    scale_records = yield context.call_activity_with_retry(
+        "rate_scales_worker",
+        retry_options=retry_twice_opts,
+        input_={
+            "type": "RETRIEVE",
+            "timestamp": raw_timestamp,
+            "data_version": release["data_version"]
+        }
+    )
     logging.info("Received latest scale records.")
 
     # ------------------------------------------------------------------------------------
@@ -266,19 +273,18 @@ def main(context: DurableOrchestrationContext):
     # ....................................................................................
     # Generate rate scales
 
-    for item in raw_scale_records:
-        for record in item['records']:
+    for area_type, shards in scale_records['shards'].items():
+        for shard in range(shards):
             task = context.call_activity_with_retry(
                 "rate_scales_worker",
                 retry_options=retry_twice_opts,
                 input_={
                     "type": "GENERATE",
                     "date": file_date_raw,
-                    "timestamp": item["timestamp"],
-                    "area_type": record['area_type'],
-                    "area_code": record['area_code'],
-                    "rate": record['rate'],
-                    "percentiles": item['percentiles'],
+                    "timestamp": scale_records["timestamp"],
+                    "data_version": scale_records["data_version"],
+                    "area_type": area_type,
+                    "shard": shard,
                 }
             )
             tasks.append(task)
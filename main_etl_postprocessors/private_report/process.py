@@ -6,10 +6,10 @@
 from os import getenv, path
 from hashlib import blake2b
 from datetime import datetime
+from typing import List
 
 # 3rd party:
 from pandas import DataFrame
-from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import insert
 from jinja2 import FileSystemLoader, Environment
 
@@ -17,11 +17,15 @@ from jinja2 import FileSystemLoader, Environment
 try:
     from __app__.storage import StorageClient
     from __app__.db_tables.covid19 import Session, PrivateReport
-    from __app__.main_etl_postprocessors.private_report.queries import MAIN_QUERY, OUTPUT_DATA
+    from __app__.main_etl_postprocessors.report_figures import (
+        get_report_figures, ReportFigure, PRIVATE_REPORT_METRICS
+    )
 except ImportError:
     from storage import StorageClient
     from db_tables.covid19 import Session, PrivateReport
-    from main_etl_postprocessors.private_report.queries import MAIN_QUERY, OUTPUT_DATA
+    from main_etl_postprocessors.report_figures import (
+        get_report_figures, ReportFigure, PRIVATE_REPORT_METRICS
+    )
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -36,22 +40,6 @@ curr_dir = path.split(path.abspath(__file__))[0]
 file_loader = FileSystemLoader(path.join(curr_dir, "templates"))
 env = Environment(loader=file_loader)
 
-METRICS = [
-    'newDailyNsoDeathsByDeathDateRollingSum',
-    'newAdmissionsRollingSum',
-    'hospitalCases',
-    'covidOccupiedMVBeds',
-    # 'cumPeopleVaccinatedAutumn22ByVaccinationDate50plus',
-    # 'cumVaccinationsAutumn22UptakeByVaccinationDatePercentage50plus',
-    'newPeopleVaccinatedSpring23ByVaccinationDate75plus',
-    'cumPeopleVaccinatedSpring23ByVaccinationDate75plus',
-    'cumVaccinationSpring23UptakeByVaccinationDatePercentage75plus',
-    'newCasesBySpecimenDateRollingSum',
-    'newVirusTestsByPublishDateRollingSum',
-    'uniqueCasePositivityBySpecimenDateRollingSum',
-    'cumVaccinesGivenByPublishDate'
-]
-
 structure = [
     [
         {
@@ -155,23 +143,18 @@ def store_data(data: DataFrame):
         session.close()
 
 
-def get_data(record_date: datetime) -> DataFrame:
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(
-            text(MAIN_QUERY.format(partition_date=f"{record_date:%Y_%-m_%-d}")),
-            metrics=METRICS
-        )
-        raw_data = resp.fetchall()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
+def get_data(record_date: datetime) -> List[ReportFigure]:
+    return [
+        figure
+        for figure in get_report_figures(record_date)
+        if figure.metric in PRIVATE_REPORT_METRICS
+    ]
+
 
+def to_records(figures: List[ReportFigure], record_date: datetime) -> DataFrame:
     dt = (
-        DataFrame(raw_data, columns=["release_id", "area_id", "metric", "date", "value"])
+        DataFrame(figures, columns=ReportFigure._fields)
+        .loc[:, ["release_id", "area_id", "metric", "date", "value"]]
         .assign(slug_id=get_record_id(record_date))
     )
 
@@ -238,21 +221,10 @@ def process_section(df, section, area_names):
     return result_items
 
 
-def generate_html(record_date: datetime):
+def generate_html(record_date: datetime, figures: List[ReportFigure]):
     slug_id = get_record_id(record_date)
 
-    session = Session()
-    conn = session.connection()
-    try:
-        resp = conn.execute(text(OUTPUT_DATA), slug_id=slug_id)
-        raw_data = resp.fetchall()
-    except Exception as err:
-        session.rollback()
-        raise err
-    finally:
-        session.close()
-
-    df = DataFrame(raw_data, columns=["area_name", "metric", "date", "value"])
+    df = DataFrame(figures, columns=ReportFigure._fields)
     df.value = df.value.map(format_number)
 
     area_names = [
@@ -291,9 +263,9 @@ def generate_html(record_date: datetime):
 
 def process(payload):
     date = datetime.fromisoformat(payload['timestamp'])
-    data = get_data(date)
-    store_data(data)
-    generate_html(date)
+    figures = get_data(date)
+    store_data(to_records(figures, date))
+    generate_html(date, figures)
 
     return f"DONE: {payload['timestamp']}"
 
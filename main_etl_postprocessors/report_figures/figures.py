@@ -0,0 +1,173 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from datetime import datetime, date
+from typing import NamedTuple, List, Dict, Union
+
+# 3rd party:
+from orjson import dumps, loads
+from sqlalchemy import text
+from azure.core.exceptions import ResourceNotFoundError
+
+# Internal:
+try:
+    from __app__.storage import StorageClient
+    from __app__.db_tables.covid19 import Session
+    from __app__.main_etl_postprocessors.report_figures.queries import LATEST_FIGURES
+except ImportError:
+    from storage import StorageClient
+    from db_tables.covid19 import Session
+    from main_etl_postprocessors.report_figures.queries import LATEST_FIGURES
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'DAILY_REPORT_METRICS',
+    'PRIVATE_REPORT_METRICS',
+    'ReportFigure',
+    'get_report_figures',
+    'figures_by_area'
+]
+
+
+CACHE_CONTAINER = "pipeline"
+CACHE_PATH = "reports/figures/{partition_date}/{release}.json"
+
+
+class ReportFigure(NamedTuple):
+    release_id: int
+    area_id: int
+    area_type: str
+    area_name: str
+    metric: str
+    date: date
+    value: float
+
+
+# Metrics of the daily report, as used in its structures.
+DAILY_REPORT_METRICS = [
+    'newDailyNsoDeathsByDeathDateRollingSum',
+    'newAdmissionsRollingSum',
+    'hospitalCases',
+    'covidOccupiedMVBeds',
+    'newCasesBySpecimenDateRollingSum',
+    'newVirusTestsByPublishDateRollingSum',
+]
+
+PRIVATE_REPORT_METRICS = [
+    'newDailyNsoDeathsByDeathDateRollingSum',
+    'newAdmissionsRollingSum',
+    'hospitalCases',
+    'covidOccupiedMVBeds',
+    # 'cumPeopleVaccinatedAutumn22ByVaccinationDate50plus',
+    # 'cumVaccinationsAutumn22UptakeByVaccinationDatePercentage50plus',
+    'newPeopleVaccinatedSpring23ByVaccinationDate75plus',
+    'cumPeopleVaccinatedSpring23ByVaccinationDate75plus',
+    'cumVaccinationSpring23UptakeByVaccinationDatePercentage75plus',
+    'newCasesBySpecimenDateRollingSum',
+    'newVirusTestsByPublishDateRollingSum',
+    'uniqueCasePositivityBySpecimenDateRollingSum',
+    'cumVaccinesGivenByPublishDate'
+]
+
+_figures_cache: Dict[str, List[ReportFigure]] = dict()
+
+
+def get_report_metrics() -> List[str]:
+    """
+    Union of the metrics used in the daily and the private reports.
+    """
+    return list(dict.fromkeys([*PRIVATE_REPORT_METRICS, *DAILY_REPORT_METRICS]))
+
+
+def query_figures(partition_date: str) -> List[ReportFigure]:
+    session = Session()
+    conn = session.connection()
+    try:
+        resp = conn.execute(
+            text(LATEST_FIGURES.format(partition_date=partition_date)),
+            metrics=get_report_metrics()
+        )
+        raw_data = resp.fetchall()
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    return [ReportFigure(*row) for row in raw_data]
+
+
+def serialise(figures: List[ReportFigure]) -> bytes:
+    return dumps([figure._asdict() for figure in figures])
+
+
+def deserialise(payload: Union[str, bytes]) -> List[ReportFigure]:
+    figures = list()
+
+    for item in loads(payload):
+        item["date"] = date.fromisoformat(item["date"])
+        figures.append(ReportFigure(**item))
+
+    return figures
+
+
+def get_report_figures(timestamp: datetime) -> List[ReportFigure]:
+    """
+    Latest non-null value of every report metric for the overview
+    and nation areas in the release.
+
+    The figures are extracted once per release and cached in memory
+    and in blob storage, so that subsequent reports for the same
+    release do not rescan the partition. The cache is keyed by the
+    release timestamp, as there may be more than one release on the
+    same date.
+
+    Parameters
+    ----------
+    timestamp: datetime
+        Release timestamp - including the time.
+
+    Returns
+    -------
+    List[ReportFigure]
+    """
+    partition_date = f"{timestamp:%Y_%-m_%-d}"
+    release = f"{timestamp:%Y%m%dT%H%M%S%f}"
+
+    if release in _figures_cache:
+        return _figures_cache[release]
+
+    kws = dict(
+        container=CACHE_CONTAINER,
+        path=CACHE_PATH.format(partition_date=partition_date, release=release),
+        content_type="application/json; charset=utf-8",
+        compressed=False
+    )
+
+    with StorageClient(**kws) as cli:
+        try:
+            figures = deserialise(cli.download().readall())
+        except ResourceNotFoundError:
+            logging.info(f"Extracting report figures for '{partition_date}'")
+            figures = query_figures(partition_date)
+            cli.upload(serialise(figures))
+
+    _figures_cache[release] = figures
+
+    return figures
+
+
+def figures_by_area(figures: List[ReportFigure]) -> Dict[str, Dict[str, ReportFigure]]:
+    """
+    Maps area names onto the figures for that area, keyed by metric.
+    """
+    result = dict()
+
+    for figure in figures:
+        result.setdefault(figure.area_name, dict())[figure.metric] = figure
+
+    return result
@@ -0,0 +1,19 @@
+#!/usr/bin python3
+
+LATEST_FIGURES = """\
+SELECT DISTINCT ON (ts.area_id, metric)
+       ts.release_id,
+       ts.area_id,
+       area_type,
+       area_name,
+       metric,
+       ts.date AS "date",
+       (payload ->> 'value')::FLOAT AS value
+FROM covid19.time_series_p{partition_date}_other AS ts
+  JOIN covid19.metric_reference AS mr ON mr.id = ts.metric_id
+  JOIN covid19.area_reference AS ar ON ar.id = ts.area_id
+WHERE area_type IN ('overview', 'nation')
+  AND metric = ANY((:metrics)::VARCHAR[])
+  AND (payload ->> 'value') NOTNULL
+ORDER BY ts.area_id, metric, ts.date DESC;\
+"""
@@ -116,7 +116,7 @@ def main(payload) -> List[str]:
     # ---------------------------------------------------
     # Downloading raw data.
     with StorageClient(container=RAW_DATA_CONTAINER, path=payload.data_path) as client:
-        raw_data = client.download().readall().decode()
+        raw_data = client.download_to().decode()
 
     logging.info(f"\tDownloaded JSON data")
 
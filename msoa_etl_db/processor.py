@@ -26,11 +26,15 @@ try:
     from __app__.db_etl.processors.rolling import change_by_sum
     from __app__.db_etl.homogenisation import homogenise_dates
     from __app__.db_tables.covid19 import Session, MainData
+    from __app__.db_etl_upload import UPSERT_RETURNING, record_upserts
+    from __app__.utilities.schema import coerce_schema
 except ImportError:
     from storage import StorageClient
     from db_etl.processors.rolling import change_by_sum
     from db_etl.processors.homogenisation import homogenise_dates
     from db_tables.covid19 import Session, MainData, DB_INSERT_MAX_ROWS
+    from db_etl_upload import UPSERT_RETURNING, record_upserts
+    from utilities.schema import coerce_schema
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -145,11 +149,14 @@ def generate_row_hash(d: DataFrame, hash_only=False, date=None) -> DataFrame:
 
 def get_dataset(payload: MSOAPayload) -> DataFrame:
     with TemporaryFile() as fp, StorageClient(**payload.data_path) as client:
-        client.download().readinto(fp)
+        client.download_to(fp)
         fp.seek(0)
 
         result = read_parquet(fp, columns=["areaCode", "date", payload.metric])
 
+    # The dataset holds every MSOA in the country.
+    result = coerce_schema(result, ["areaCode"])
+
     max_date = result.date.max()
     area_data = result.loc[result.areaCode == payload.area_code, :]
     area_data.date = area_data.date.astype("datetime64").dt.strftime("%Y-%m-%d")
@@ -190,7 +197,8 @@ def to_sql(df: DataFrame) -> NoReturn:
                 set_={MainData.payload.name: insert_stmt.excluded.payload}
             )
 
-            connection.execute(stmt)
+            result = connection.execute(stmt.returning(*UPSERT_RETURNING))
+            record_upserts(connection, result)
             session.flush()
 
     except Exception as err:
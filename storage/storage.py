@@ -4,15 +4,28 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 import logging
-from os import getenv
-from typing import Union, NoReturn, Dict
+import asyncio
+from os import getenv, PathLike
+from time import sleep
+from typing import Union, NoReturn, Dict, Iterable, Iterator, List, Tuple, BinaryIO
 from gzip import compress
+from zlib import compressobj, MAX_WBITS
 from uuid import uuid4
 from urllib.parse import quote
+from hashlib import md5
+from mmap import mmap
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # 3rd party:
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError, IncompleteReadError,
+    ServiceRequestError, ServiceResponseError
+)
 from azure.storage.blob import (
-    BlobClient, BlobType, ContentSettings,
+    BlobClient, BlobType, ContentSettings, BlobBlock,
     StorageStreamDownloader, StandardBlobTier,
     BlobServiceClient, ContainerClient
 )
@@ -49,6 +62,103 @@ DEFAULT_CONTENT_TYPE = "application/json; charset=utf-8"
 DEFAULT_CACHE_CONTROL = "no-cache, max-age=0, stale-while-revalidate=300"
 CONTENT_LANGUAGE = 'en-GB'
 
+# Size of the blocks staged by streamed uploads.
+STREAM_BLOCK_SIZE = 4 * 1024 * 1024
+
+GZIP_WBITS = MAX_WBITS | 16
+
+# Size of the ranges requested by parallel downloads, and the
+# number of ranged requests that may be in flight at once.
+DOWNLOAD_RANGE_SIZE = 4 * 1024 * 1024
+DOWNLOAD_WINDOW = int(getenv("STORAGE_DOWNLOAD_WINDOW", 8))
+
+# Number of times a failed range is retried, and the delay
+# in seconds before the first retry - doubled thereafter.
+DOWNLOAD_RETRIES = int(getenv("STORAGE_DOWNLOAD_RETRIES", 3))
+DOWNLOAD_RETRY_DELAY = 0.5
+
+DownloadTarget = Union[None, str, PathLike, BinaryIO]
+
+
+def get_ranges(size: int, range_size: int) -> List[Tuple[int, int]]:
+    """
+    Returns the offset and the length of the ranges of a blob.
+    """
+    return [
+        (offset, min(range_size, size - offset))
+        for offset in range(0, size, range_size)
+    ]
+
+
+@contextmanager
+def download_buffer(target: DownloadTarget, size: int):
+    """
+    Provides a writable buffer of ``size`` bytes for a download.
+
+    The buffer is a new ``bytearray`` if ``target`` is ``None``.
+    Otherwise, the target file (a path or a binary file object)
+    is resized and memory-mapped.
+    """
+    if target is None:
+        yield bytearray(size)
+        return None
+
+    fp = open(target, "w+b") if isinstance(target, (str, PathLike)) else target
+
+    try:
+        fp.truncate(size)
+
+        if not size:
+            # Empty files cannot be mapped.
+            yield bytearray()
+            return None
+
+        with mmap(fp.fileno(), size) as buffer:
+            yield buffer
+            buffer.flush()
+    finally:
+        if fp is not target:
+            fp.close()
+
+
+def write_download(target: DownloadTarget, data: bytes):
+    """
+    Writes a blob that has been downloaded whole into ``target``.
+    See ``download_buffer`` for the targets.
+    """
+    if target is None:
+        return bytearray(data)
+
+    with download_buffer(target, len(data)) as buffer:
+        buffer[:] = data
+
+    return target
+
+
+def is_transient(err: Exception) -> bool:
+    """
+    Whether a failed request may succeed if retried. Ranges
+    of blobs that have been modified are not retried.
+    """
+    if isinstance(err, (ServiceRequestError, ServiceResponseError, IncompleteReadError)):
+        return True
+
+    if isinstance(err, HttpResponseError):
+        status = err.status_code or 0
+        return status in (408, 429) or status >= 500
+
+    return False
+
+
+def verify_md5(buffer, expected: Union[bytes, bytearray, None], path: str):
+    # MD5 is only stored for blobs that are uploaded in a single
+    # request, or for which it has been set explicitly.
+    if not expected:
+        return None
+
+    if md5(buffer).digest() != bytes(expected):
+        raise IOError(f"Content MD5 mismatch for '{path}'")
+
 
 class LockBlob:
     _name = "Azure blob"
@@ -148,6 +258,13 @@ class StorageClient:
 
         Default: ``en-GB``
 
+    content_encoding: str
+        Sets the ``Content-Encoding`` header for data that has already been
+        compressed by the caller (e.g. ``br``). When set, the data is uploaded
+        as is and ``compressed`` is ignored.
+
+        Default: ``None``
+
     tier: str
         Blob access tier - must be one of "Hot", "Cool", or "Archive". [Default: 'Hot']
     """
@@ -160,9 +277,10 @@ class StorageClient:
                  cache_control: str = DEFAULT_CACHE_CONTROL, compressed: bool = True,
                  content_disposition: Union[str, None] = None,
                  content_language: Union[str, None] = CONTENT_LANGUAGE,
+                 content_encoding: Union[str, None] = None,
                  tier: str = 'Hot', **kwargs):
         self._path = path
-        self.compressed = compressed
+        self.compressed = compressed and content_encoding is None
         self._connection_string = connection_string
         self.container = container
         self._tier = getattr(StandardBlobTier, tier, None)
@@ -177,7 +295,7 @@ class StorageClient:
         self._content_settings: ContentSettings = ContentSettings(
             content_type=content_type,
             cache_control=cache_control,
-            content_encoding="gzip" if self.compressed else None,
+            content_encoding="gzip" if self.compressed else content_encoding,
             content_language=content_language,
             content_disposition=content_disposition,
             **kwargs
@@ -293,6 +411,71 @@ class StorageClient:
         )
         logging.info(f"Uploaded blob '{self.container}/{self.path}'")
 
+    @trace_method_operation(
+        "container", "path", "target", "url",
+        name="account_name",
+        dep_type="_name",
+        action="upload_stream",
+        operation="PUT"
+    )
+    def upload_stream(self, chunks: Iterable[Union[str, bytes]],
+                      block_size: int = STREAM_BLOCK_SIZE) -> NoReturn:
+        """
+        Uploads a stream of data as staged blocks, and commits the
+        blocks once the stream is exhausted. Data are compressed as
+        they arrive, so the payload is never held in memory as a whole.
+
+        Parameters
+        ----------
+        chunks: Iterable[Union[str, bytes]]
+            Data to be uploaded to the storage, in order.
+
+        block_size: int
+            Minimum size of each staged block in bytes, except for
+            the last one. [Default: ``STREAM_BLOCK_SIZE``]
+
+        Returns
+        -------
+        NoReturn
+        """
+        compressor = compressobj(9, wbits=GZIP_WBITS) if self.compressed else None
+        blocks = list()
+        buffer = list()
+        buffer_size = 0
+
+        def stage(data: bytes):
+            # Block IDs must be of the same length within a blob.
+            block_id = f"{len(blocks):08d}"
+            self.client.stage_block(block_id=block_id, data=data, timeout=60)
+            blocks.append(BlobBlock(block_id=block_id))
+
+        for chunk in chunks:
+            data = chunk.encode() if isinstance(chunk, str) else chunk
+
+            if compressor is not None:
+                data = compressor.compress(data)
+
+            buffer.append(data)
+            buffer_size += len(data)
+
+            if buffer_size >= block_size:
+                stage(b"".join(buffer))
+                buffer, buffer_size = list(), 0
+
+        if compressor is not None:
+            buffer.append(compressor.flush())
+
+        if buffer_size or compressor is not None:
+            stage(b"".join(buffer))
+
+        self.client.commit_block_list(
+            blocks,
+            content_settings=self._content_settings,
+            standard_blob_tier=self._tier,
+            timeout=60
+        )
+        logging.info(f"Uploaded blob '{self.container}/{self.path}' in {len(blocks)} blocks")
+
     @trace_method_operation(
         "container", "path", "target", "url",
         name="account_name",
@@ -305,6 +488,133 @@ class StorageClient:
         logging.info(f"Downloaded blob '{self.container}/{self.path}'")
         return data
 
+    def _download_range(self, offset: int, length: int, etag: str) -> bytes:
+        for attempt in range(DOWNLOAD_RETRIES + 1):
+            try:
+                # Ranges are pinned to the version of the blob whose
+                # properties were retrieved.
+                data = self.client.download_blob(
+                    offset=offset,
+                    length=length,
+                    etag=etag,
+                    match_condition=MatchConditions.IfNotModified,
+                    max_concurrency=1
+                )
+                data = data.readall()
+
+                # Slices assigned to the download buffer resize it
+                # if they are short.
+                if len(data) != length:
+                    raise IncompleteReadError(
+                        f"Expected {length} bytes at offset {offset}, got {len(data)}"
+                    )
+
+                return data
+            except Exception as err:
+                if attempt == DOWNLOAD_RETRIES or not is_transient(err):
+                    raise
+
+                logging.warning(
+                    f"Failed to download range {offset}+{length} of "
+                    f"'{self.container}/{self.path}' - retrying: {err}"
+                )
+                sleep(DOWNLOAD_RETRY_DELAY * 2 ** attempt)
+
+    @trace_method_operation(
+        "container", "path", "target", "url",
+        name="account_name",
+        dep_type="_name",
+        action="download_to",
+        operation="GET"
+    )
+    def download_to(self, target: DownloadTarget = None, window: int = DOWNLOAD_WINDOW,
+                    range_size: int = DOWNLOAD_RANGE_SIZE, verify: bool = True):
+        """
+        Downloads the blob using concurrent ranged requests.
+
+        Parameters
+        ----------
+        target: Union[None, str, PathLike, BinaryIO]
+            Path or binary file object into which the blob is written.
+            The blob is written into a new ``bytearray`` if ``None``.
+            [Default: ``None``]
+
+        window: int
+            Number of ranged requests that may be in flight at once.
+            [Default: ``STORAGE_DOWNLOAD_WINDOW`` environment variable, or 8]
+
+        range_size: int
+            Size of the ranges in bytes. [Default: 4 MB]
+
+        verify: bool
+            Whether to verify the content MD5 of the blob, where
+            available. [Default: ``True``]
+
+        Returns
+        -------
+        Union[bytearray, str, PathLike, BinaryIO]
+            The ``bytearray`` if ``target`` is ``None``, otherwise
+            the target. The position of file objects is unchanged.
+        """
+        props = self.client.get_blob_properties()
+        result = target
+
+        if props.content_settings.content_encoding:
+            # Ranges of content-encoded blobs cannot be decoded on
+            # their own, and their MD5 is that of the encoded content.
+            data = self.client.download_blob().readall()
+            logging.info(f"Downloaded encoded blob '{self.container}/{self.path}'")
+            return write_download(target, data)
+
+        with download_buffer(target, props.size) as buffer, \
+                ThreadPoolExecutor(max_workers=window) as executor:
+
+            def fetch(item):
+                offset, length = item
+                buffer[offset: offset + length] = self._download_range(offset, length, props.etag)
+
+            for _ in executor.map(fetch, get_ranges(props.size, range_size)):
+                pass
+
+            if verify:
+                verify_md5(buffer, props.content_settings.content_md5, self.path)
+
+            if target is None:
+                result = buffer
+
+        logging.info(f"Downloaded blob '{self.container}/{self.path}' ({props.size} bytes)")
+        return result
+
+    def iter_ranges(self, window: int = DOWNLOAD_WINDOW,
+                    range_size: int = DOWNLOAD_RANGE_SIZE) -> Iterator[bytes]:
+        """
+        Downloads the blob using concurrent ranged requests, and
+        yields the ranges in order. At most ``window`` ranges are
+        held in memory at once.
+        """
+        props = self.client.get_blob_properties()
+
+        if props.content_settings.content_encoding:
+            # See ``download_to``.
+            yield self.client.download_blob().readall()
+            return None
+
+        ranges = iter(get_ranges(props.size, range_size))
+
+        with ThreadPoolExecutor(max_workers=window) as executor:
+            pending = deque()
+
+            for offset, length in ranges:
+                pending.append(executor.submit(self._download_range, offset, length, props.etag))
+
+                if len(pending) < window:
+                    continue
+
+                yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
     @trace_method_operation(
         "container", "path", "target", "url",
         name="account_name",
@@ -655,34 +965,114 @@ class AsyncStorageClient:
             async for blob in container.list_blobs(name_starts_with=self.path):
                 yield blob
 
+    async def _download_range(self, offset: int, length: int, etag: str) -> bytes:
+        for attempt in range(DOWNLOAD_RETRIES + 1):
+            try:
+                # Ranges are pinned to the version of the blob whose
+                # properties were retrieved.
+                data = await self.client.download_blob(
+                    offset=offset,
+                    length=length,
+                    etag=etag,
+                    match_condition=MatchConditions.IfNotModified,
+                    max_concurrency=1
+                )
+                data = await data.readall()
+
+                # Slices assigned to the download buffer resize it
+                # if they are short.
+                if len(data) != length:
+                    raise IncompleteReadError(
+                        f"Expected {length} bytes at offset {offset}, got {len(data)}"
+                    )
+
+                return data
+            except Exception as err:
+                if attempt == DOWNLOAD_RETRIES or not is_transient(err):
+                    raise
+
+                logging.warning(
+                    f"Failed to download range {offset}+{length} of "
+                    f"'{self.container}/{self.path}' - retrying: {err}"
+                )
+                await asyncio.sleep(DOWNLOAD_RETRY_DELAY * 2 ** attempt)
+
     @trace_async_method_operation(
         "container", "path", "target", "url",
         name="account_name",
         dep_type="_name",
-        action="download chunks",
+        action="download_to",
         operation="GET"
     )
-    async def download_chunks(self):
+    async def download_to(self, target: DownloadTarget = None, window: int = DOWNLOAD_WINDOW,
+                          range_size: int = DOWNLOAD_RANGE_SIZE, verify: bool = True):
+        """
+        Downloads the blob using concurrent ranged requests.
+        See ``StorageClient.download_to`` for the parameters.
+        """
         props = await self.client.get_blob_properties()
-        blob_size = int(props['size'])
-
-        chunk_size = 2 ** 22  # 4MB
-        total_downloaded = 0
-        while total_downloaded < blob_size:
-            length = min(chunk_size, blob_size - total_downloaded)
-            data = await self.client.download_blob(
-                offset=total_downloaded,
-                length=min(chunk_size, blob_size - total_downloaded),
-                max_concurrency=1
-            )
-            # length = len(data)
-            total_downloaded += length
+        semaphore = asyncio.Semaphore(window)
+        result = target
+
+        if props.content_settings.content_encoding:
+            # See ``StorageClient.download_to``.
+            download_obj = await self.client.download_blob()
+            data = await download_obj.readall()
+            logging.info(f"Downloaded encoded blob '{self.container}/{self.path}'")
+            return write_download(target, data)
+
+        with download_buffer(target, props.size) as buffer:
+            async def fetch(offset, length):
+                async with semaphore:
+                    data = await self._download_range(offset, length, props.etag)
+
+                buffer[offset: offset + length] = data
+
+            await asyncio.gather(*(
+                fetch(offset, length)
+                for offset, length in get_ranges(props.size, range_size)
+            ))
+
+            if verify:
+                verify_md5(buffer, props.content_settings.content_md5, self.path)
+
+            if target is None:
+                result = buffer
+
+        logging.info(f"Downloaded blob '{self.container}/{self.path}' ({props.size} bytes)")
+        return result
+
+    async def iter_ranges(self, window: int = DOWNLOAD_WINDOW,
+                          range_size: int = DOWNLOAD_RANGE_SIZE):
+        """
+        Downloads the blob using concurrent ranged requests, and
+        yields the ranges in order. At most ``window`` ranges are
+        held in memory at once.
+        """
+        props = await self.client.get_blob_properties()
+        pending = deque()
+
+        if props.content_settings.content_encoding:
+            # See ``StorageClient.download_to``.
+            download_obj = await self.client.download_blob()
+            yield await download_obj.readall()
+            return
+
+        try:
+            for offset, length in get_ranges(props.size, range_size):
+                task = asyncio.ensure_future(self._download_range(offset, length, props.etag))
+                pending.append(task)
+
+                if len(pending) < window:
+                    continue
 
-            if not length:
-                break
+                yield await pending.popleft()
 
-            # aiohttp.client_exceptions.ClientPayloadError: 400, message='Can not decode content-encoding: gzip'
-            yield await data.readall()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
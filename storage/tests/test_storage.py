@@ -0,0 +1,359 @@
+import site
+import pathlib
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+from os import urandom
+from hashlib import md5
+from types import SimpleNamespace
+from tempfile import TemporaryFile
+from unittest.mock import patch
+from asyncio import run
+from gzip import compress, decompress
+
+from azure.core.exceptions import ResourceModifiedError, ServiceResponseError, IncompleteReadError
+
+from storage import storage
+from storage.storage import StorageClient, AsyncStorageClient, get_ranges
+
+
+RANGE_SIZE = 1024
+
+
+class Download:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def readall(self):
+        return self.data
+
+
+class AsyncDownload(Download):
+    async def readall(self):
+        return self.data
+
+
+class FakeBlobClient:
+    """
+    Blob client serving ``data`` from memory. Requests for the
+    ranges at the offsets in ``failures`` raise the given errors
+    in turn before succeeding, and those at the offsets in ``short``
+    return one byte too few the given number of times.
+
+    Blobs with an ``encoding`` are stored gzipped, and are decoded
+    when they are downloaded whole - as done by azure-core.
+    """
+    def __init__(self, data: bytes, failures=None, is_async=False, short=None, encoding=None):
+        self.decoded = data
+        self.data = compress(data) if encoding else data
+        self.failures = {offset: list(errors) for offset, errors in (failures or dict()).items()}
+        self.short = dict(short or dict())
+        self.is_async = is_async
+        self.requests = list()
+        self.props = SimpleNamespace(
+            size=len(self.data),
+            etag="etag",
+            content_settings=SimpleNamespace(
+                content_md5=bytearray(md5(self.data).digest()),
+                content_encoding=encoding
+            )
+        )
+
+    def get_blob_properties(self):
+        if not self.is_async:
+            return self.props
+
+        async def get():
+            return self.props
+
+        return get()
+
+    def _download(self, offset, length, etag):
+        if offset is None:
+            return self.decoded
+
+        self.requests.append((offset, length))
+
+        if self.failures.get(offset):
+            raise self.failures[offset].pop(0)
+
+        assert etag == self.props.etag
+
+        if self.short.get(offset):
+            self.short[offset] -= 1
+            return self.data[offset: offset + length - 1]
+
+        return self.data[offset: offset + length]
+
+    def download_blob(self, offset=None, length=None, etag=None, **kwargs):
+        if not self.is_async:
+            return Download(self._download(offset, length, etag))
+
+        async def download():
+            return AsyncDownload(self._download(offset, length, etag))
+
+        return download()
+
+
+def make_client(client_type, blob_client):
+    client = client_type.__new__(client_type)
+    client.client = blob_client
+    client.container = "container"
+    client.account_name = "account"
+    client.target = "target"
+    client.url = "url"
+
+    if client_type is StorageClient:
+        client._path = "path"
+    else:
+        client.path = "path"
+
+    return client
+
+
+class TestRanges(unittest.TestCase):
+    sizes = {
+        "empty": (0, []),
+        "less than one range": (RANGE_SIZE - 1, [(0, RANGE_SIZE - 1)]),
+        "exactly one range": (RANGE_SIZE, [(0, RANGE_SIZE)]),
+        "exact multiple": (3 * RANGE_SIZE, [(0, RANGE_SIZE), (RANGE_SIZE, RANGE_SIZE), (2 * RANGE_SIZE, RANGE_SIZE)]),
+        "remainder": (RANGE_SIZE + 1, [(0, RANGE_SIZE), (RANGE_SIZE, 1)]),
+    }
+
+    def test_get_ranges(self):
+        for name, (size, expected) in self.sizes.items():
+            with self.subTest(name):
+                self.assertListEqual(get_ranges(size, RANGE_SIZE), expected)
+
+    def test_download_to(self):
+        for name, (size, expected) in self.sizes.items():
+            data = urandom(size)
+
+            with self.subTest(name, target="bytearray"):
+                blob = FakeBlobClient(data)
+                client = make_client(StorageClient, blob)
+
+                self.assertEqual(client.download_to(range_size=RANGE_SIZE), data)
+                self.assertListEqual(sorted(blob.requests), expected)
+
+            with self.subTest(name, target="file"), TemporaryFile() as fp:
+                fp.write(b"stale content" * 200)
+                fp.seek(0)
+
+                client = make_client(StorageClient, FakeBlobClient(data))
+                client.download_to(fp, range_size=RANGE_SIZE)
+
+                self.assertEqual(fp.read(), data)
+
+            with self.subTest(name, target="async"):
+                blob = FakeBlobClient(data, is_async=True)
+                client = make_client(AsyncStorageClient, blob)
+
+                self.assertEqual(run(client.download_to(range_size=RANGE_SIZE)), data)
+                self.assertListEqual(sorted(blob.requests), expected)
+
+    def test_iter_ranges(self):
+        for name, (size, expected) in self.sizes.items():
+            data = urandom(size)
+
+            with self.subTest(name):
+                client = make_client(StorageClient, FakeBlobClient(data))
+                ranges = list(client.iter_ranges(window=2, range_size=RANGE_SIZE))
+
+                self.assertListEqual(ranges, [data[offset: offset + length] for offset, length in expected])
+
+            with self.subTest(name, client="async"):
+                client = make_client(AsyncStorageClient, FakeBlobClient(data, is_async=True))
+
+                async def collect():
+                    return [item async for item in client.iter_ranges(window=2, range_size=RANGE_SIZE)]
+
+                self.assertListEqual(run(collect()), [data[offset: offset + length] for offset, length in expected])
+
+    def test_encoded_blob_downloaded_whole(self):
+        data = urandom(3 * RANGE_SIZE + 1)
+
+        for client_type in (StorageClient, AsyncStorageClient):
+            is_async = client_type is AsyncStorageClient
+
+            def make():
+                blob = FakeBlobClient(data, is_async=is_async, encoding="gzip")
+                return make_client(client_type, blob), blob
+
+            with self.subTest(client_type.__name__, target="bytearray"):
+                client, blob = make()
+                result = client.download_to(range_size=RANGE_SIZE)
+
+                self.assertEqual(run(result) if is_async else result, data)
+                self.assertListEqual(blob.requests, [])
+
+            with self.subTest(client_type.__name__, target="file"), TemporaryFile() as fp:
+                client, blob = make()
+                result = client.download_to(fp, range_size=RANGE_SIZE)
+
+                if is_async:
+                    run(result)
+
+                self.assertEqual(fp.read(), data)
+
+            with self.subTest(client_type.__name__, method="iter_ranges"):
+                client, blob = make()
+
+                if is_async:
+                    async def collect():
+                        return [item async for item in client.iter_ranges(range_size=RANGE_SIZE)]
+
+                    ranges = run(collect())
+                else:
+                    ranges = list(client.iter_ranges(range_size=RANGE_SIZE))
+
+                self.assertEqual(b"".join(ranges), data)
+
+
+class FakeBlockBlobClient:
+    """
+    Blob client recording the blocks staged and committed
+    by streamed uploads.
+    """
+    def __init__(self):
+        self.staged = dict()
+        self.committed = None
+        self.commit_kws = None
+
+    def stage_block(self, block_id, data, **kwargs):
+        self.staged[block_id] = bytes(data)
+
+    def commit_block_list(self, blocks, **kwargs):
+        self.committed = [block.id for block in blocks]
+        self.commit_kws = kwargs
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.staged[block_id] for block_id in self.committed)
+
+
+class TestUploadStream(unittest.TestCase):
+    def upload(self, chunks, compressed, **kwargs):
+        blob = FakeBlockBlobClient()
+        client = make_client(StorageClient, blob)
+        client.compressed = compressed
+        client._content_settings = "settings"
+        client._tier = "tier"
+
+        client.upload_stream(chunks, **kwargs)
+
+        self.assertEqual(blob.commit_kws["content_settings"], "settings")
+        self.assertEqual(blob.commit_kws["standard_blob_tier"], "tier")
+
+        return blob
+
+    def test_gzip_round_trip(self):
+        chunks = [f"row {index},{urandom(16).hex()}\n" for index in range(5000)]
+        chunks[10] = chunks[10].encode()
+
+        blob = self.upload(iter(chunks), compressed=True, block_size=RANGE_SIZE)
+
+        expected = b"".join(chunk.encode() if isinstance(chunk, str) else chunk for chunk in chunks)
+        self.assertEqual(decompress(blob.content), expected)
+        self.assertLess(len(blob.content), len(expected))
+        self.assertGreater(len(blob.committed), 1)
+
+    def test_block_splitting(self):
+        cases = {
+            # Chunk size, number of chunks, and sizes of the staged blocks.
+            "below threshold": (300, 10, [1200, 1200, 600]),
+            "at threshold": (512, 4, [1024, 1024]),
+            "single block": (100, 3, [300]),
+            "large chunks": (3000, 2, [3000, 3000]),
+        }
+
+        for name, (chunk_size, total, block_sizes) in cases.items():
+            with self.subTest(name):
+                chunks = [urandom(chunk_size) for _ in range(total)]
+                blob = self.upload(chunks, compressed=False, block_size=1024)
+
+                self.assertListEqual(blob.committed, [f"{index:08d}" for index in range(len(block_sizes))])
+                self.assertListEqual([len(blob.staged[block_id]) for block_id in blob.committed], block_sizes)
+                self.assertEqual(blob.content, b"".join(chunks))
+
+    def test_empty_stream(self):
+        with self.subTest(compressed=False):
+            blob = self.upload(iter([]), compressed=False)
+
+            self.assertDictEqual(blob.staged, dict())
+            self.assertListEqual(blob.committed, list())
+
+        with self.subTest(compressed=True):
+            blob = self.upload(iter([]), compressed=True)
+
+            self.assertEqual(len(blob.committed), 1)
+            self.assertEqual(decompress(blob.content), b"")
+
+
+@patch.object(storage, "DOWNLOAD_RETRY_DELAY", 0)
+class TestRetry(unittest.TestCase):
+    data = urandom(3 * RANGE_SIZE + 1)
+
+    def download(self, client_type, failures=None, short=None):
+        blob = FakeBlobClient(
+            self.data,
+            failures=failures,
+            short=short,
+            is_async=client_type is AsyncStorageClient
+        )
+        client = make_client(client_type, blob)
+        result = client.download_to(range_size=RANGE_SIZE)
+
+        if client_type is AsyncStorageClient:
+            result = run(result)
+
+        return result, blob
+
+    def test_failed_range_retried(self):
+        failures = {RANGE_SIZE: [ServiceResponseError("connection reset")] * storage.DOWNLOAD_RETRIES}
+
+        for client_type in (StorageClient, AsyncStorageClient):
+            with self.subTest(client_type.__name__):
+                result, blob = self.download(client_type, failures)
+
+                self.assertEqual(result, self.data)
+                # Only the failed range is requested again.
+                self.assertEqual(blob.requests.count((RANGE_SIZE, RANGE_SIZE)), storage.DOWNLOAD_RETRIES + 1)
+                self.assertEqual(len(blob.requests), 4 + storage.DOWNLOAD_RETRIES)
+
+    def test_retries_exhausted(self):
+        failures = {0: [ServiceResponseError("connection reset")] * (storage.DOWNLOAD_RETRIES + 1)}
+
+        for client_type in (StorageClient, AsyncStorageClient):
+            with self.subTest(client_type.__name__), self.assertRaises(ServiceResponseError):
+                self.download(client_type, failures)
+
+    def test_short_range_retried(self):
+        for client_type in (StorageClient, AsyncStorageClient):
+            with self.subTest(client_type.__name__):
+                result, blob = self.download(client_type, short={RANGE_SIZE: 1})
+
+                self.assertEqual(len(result), len(self.data))
+                self.assertEqual(result, self.data)
+                self.assertEqual(blob.requests.count((RANGE_SIZE, RANGE_SIZE)), 2)
+
+    def test_short_range_fails(self):
+        short = {RANGE_SIZE: storage.DOWNLOAD_RETRIES + 1}
+
+        for client_type in (StorageClient, AsyncStorageClient):
+            with self.subTest(client_type.__name__), self.assertRaises(IncompleteReadError):
+                self.download(client_type, short=short)
+
+    def test_modified_blob_not_retried(self):
+        failures = {0: [ResourceModifiedError("condition not met")]}
+
+        for client_type in (StorageClient, AsyncStorageClient):
+            with self.subTest(client_type.__name__), self.assertRaises(ResourceModifiedError):
+                self.download(client_type, failures)
+
+
+if __name__ == '__main__':
+    unittest.main()
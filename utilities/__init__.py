@@ -18,6 +18,8 @@ Contributors:  Pouria Hadjibagheri
 # Internal:
 from .utilities import *
 from .latest_data import *
+from .schema import *
+from .chunk_cache import *
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Header
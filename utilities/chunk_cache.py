@@ -0,0 +1,200 @@
+#!/usr/bin python3
+
+"""
+Content-addressed cache of processed chunks.
+
+A chunk is fingerprinted together with the version of the reference
+data and of the processor code. If neither the chunk nor the versions
+have changed since the last release, the processed output of the last
+release may be reused.
+
+Entries are stored in blob storage, or in ``CHUNK_CACHE_DIR`` when
+the variable is set (e.g. for local runs).
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from os import getenv
+from pathlib import Path
+from hashlib import blake2b
+from functools import lru_cache
+from json import dumps, loads
+from typing import NamedTuple, List, Union
+
+# 3rd party:
+
+# Internal:
+try:
+    from __app__.storage import StorageClient
+except ImportError:
+    from storage import StorageClient
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'CacheEntry',
+    'RESTAMP_SUFFIX',
+    'SKIP_UNCHANGED_UPLOADS',
+    'get_chunk_fingerprint',
+    'get_cached_chunk',
+    'set_cached_chunk'
+]
+
+
+LOCAL_CACHE_DIR = getenv("CHUNK_CACHE_DIR")
+
+# When enabled ("1", "true" or "yes"), unchanged chunks are not uploaded
+# to the database. Their rows are instead copied from the partition of
+# the last release.
+SKIP_UNCHANGED_UPLOADS = getenv("CHUNK_CACHE_SKIP_UPLOAD", "").lower() in ("1", "true", "yes")
+
+RESTAMP_SUFFIX = ".restamp.json"
+
+CACHE_CONTAINER = "pipeline"
+CACHE_PATH = "etl/chunk_cache/{key}.json"
+
+REFERENCE_DATA_PATH = "assets/population.json"
+
+# Packages whose code determines the processed output.
+PROCESSOR_PACKAGES = [
+    "db_etl",
+    "population",
+    "processor_settings",
+]
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+
+class CacheEntry(NamedTuple):
+    fingerprint: str
+    output_path: str
+    timestamp: str
+    area_type: str
+    area_code: str
+    metrics: List[str]
+
+
+@lru_cache(maxsize=1)
+def get_code_version() -> str:
+    digest = blake2b(digest_size=16)
+
+    for package in PROCESSOR_PACKAGES:
+        for path in sorted(ROOT_PATH.joinpath(package).rglob("*.py")):
+            digest.update(str(path.relative_to(ROOT_PATH)).encode())
+            digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def get_reference_version() -> str:
+    with StorageClient(container="pipeline", path=REFERENCE_DATA_PATH) as cli:
+        return cli.client.get_blob_properties().etag.strip('"')
+
+
+def get_chunk_fingerprint(data: bytes, *parts: Union[str, None]) -> str:
+    """
+    Fingerprints the raw content of a chunk together with the versions
+    of the reference data and of the processor code.
+
+    Parameters
+    ----------
+    data: bytes
+        Raw content of the chunk, as stored by the retriever.
+
+    *parts: Union[str, None]
+        Additional components of the fingerprint, e.g. the category.
+
+    Returns
+    -------
+    str
+    """
+    digest = blake2b(data, digest_size=20)
+
+    for part in (get_code_version(), get_reference_version(), *parts):
+        digest.update(b"|")
+        digest.update(str(part).encode())
+
+    return digest.hexdigest()
+
+
+def get_cache_key(category: str, subcategory: Union[str, None],
+                  area_type: str, area_code: str) -> str:
+    return f"{category}/{subcategory or 'all'}/{area_type}_{area_code}"
+
+
+def read_entry(key: str) -> Union[dict, None]:
+    if LOCAL_CACHE_DIR:
+        path = Path(LOCAL_CACHE_DIR, f"{key}.json")
+        return loads(path.read_text()) if path.exists() else None
+
+    with StorageClient(container=CACHE_CONTAINER, path=CACHE_PATH.format(key=key)) as cli:
+        if not cli.exists():
+            return None
+
+        return loads(cli.download().readall())
+
+
+def write_entry(key: str, entry: dict):
+    payload = dumps(entry)
+
+    if LOCAL_CACHE_DIR:
+        path = Path(LOCAL_CACHE_DIR, f"{key}.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(payload)
+        return None
+
+    kws = dict(
+        container=CACHE_CONTAINER,
+        path=CACHE_PATH.format(key=key),
+        content_type="application/json; charset=utf-8",
+        compressed=False
+    )
+
+    with StorageClient(**kws) as cli:
+        cli.upload(payload)
+
+
+def get_cached_chunk(category: str, subcategory: Union[str, None], area_type: str,
+                     area_code: str, fingerprint: str) -> Union[CacheEntry, None]:
+    """
+    Returns the cached output of a chunk if it was produced from
+    the same fingerprint, otherwise ``None``.
+    """
+    key = get_cache_key(category, subcategory, area_type, area_code)
+
+    try:
+        entry = read_entry(key)
+    except Exception as err:
+        # The cache is an optimisation - failures must not stop the process.
+        logging.warning(f"Failed to read the chunk cache for '{key}': {err}")
+        return None
+
+    if entry is None or entry["fingerprint"] != fingerprint:
+        return None
+
+    logging.info(f"Chunk cache hit for '{key}': {entry['output_path']}")
+
+    return CacheEntry(**entry)
+
+
+def set_cached_chunk(category: str, subcategory: Union[str, None], entry: CacheEntry):
+    key = get_cache_key(category, subcategory, entry.area_type, entry.area_code)
+
+    try:
+        write_entry(key, entry._asdict())
+    except Exception as err:
+        logging.warning(f"Failed to update the chunk cache for '{key}': {err}")
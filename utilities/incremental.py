@@ -0,0 +1,237 @@
+#!/usr/bin python3
+
+"""
+Incremental publishing of static assets.
+
+An asset is made up of sections, each of which is regenerated only
+when the fingerprint of its inputs has changed. The content of the
+sections, their fingerprints, and the hashes of the published outputs
+are kept in blob storage in a manifest. Outputs whose content has not
+changed are not uploaded again, so that CDN caches are not invalidated.
+
+The manifest is stored last, so that an asset is regenerated on the
+next run if anything fails. Sections and outputs that are not used in
+a run are removed from the manifest, and deleted from the storage,
+when it is stored.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from hashlib import blake2b
+from typing import Any, Dict, Union
+
+# 3rd party:
+from orjson import dumps, loads
+from azure.core.exceptions import ResourceNotFoundError
+
+# Internal:
+try:
+    from __app__.storage import StorageClient
+except ImportError:
+    from storage import StorageClient
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'fingerprint',
+    'IncrementalAsset'
+]
+
+
+MANIFEST_CONTAINER = "pipeline"
+MANIFEST_PATH = "despatch/incremental/{name}/manifest.json"
+SECTION_PATH = "despatch/incremental/{name}/sections/{section}"
+
+
+def fingerprint(*inputs: Any) -> str:
+    """
+    Fingerprint of the inputs. Inputs must either be
+    bytes, or be serialisable as JSON.
+    """
+    digest = blake2b(digest_size=16)
+
+    for item in inputs:
+        digest.update(item if isinstance(item, bytes) else dumps(item))
+
+    return digest.hexdigest()
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    if isinstance(content, str):
+        content = content.encode()
+
+    return blake2b(content, digest_size=16).hexdigest()
+
+
+class IncrementalAsset:
+    """
+    Asset that is published incrementally.
+
+    Parameters
+    ----------
+    name: str
+        Name of the asset, with which the manifest is keyed.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.manifest = self._download(MANIFEST_PATH.format(name=name))
+        self._modified = False
+        self._used = {"sections": set(), "outputs": set()}
+
+        if self.manifest is None:
+            self.manifest = {"sections": dict(), "outputs": dict()}
+        else:
+            self.manifest = loads(self.manifest)
+
+    @staticmethod
+    def _client(path: str) -> StorageClient:
+        return StorageClient(
+            container=MANIFEST_CONTAINER,
+            path=path,
+            content_type="application/octet-stream",
+            compressed=False,
+            content_language=None
+        )
+
+    def _download(self, path: str) -> Union[bytes, None]:
+        with self._client(path) as cli:
+            try:
+                return cli.download().readall()
+            except ResourceNotFoundError:
+                logging.info(f"Incremental asset miss: '{path}'")
+
+        return None
+
+    def is_current(self, section: str, source: str) -> bool:
+        """
+        Whether the section has been generated from
+        inputs with the ``source`` fingerprint.
+        """
+        return self.get_metadata(section).get("fingerprint") == source
+
+    def get_metadata(self, section: str) -> Dict[str, Any]:
+        self._used["sections"].add(section)
+        return self.manifest["sections"].get(section, dict())
+
+    def load_section(self, section: str) -> str:
+        self._used["sections"].add(section)
+        content = self._download(SECTION_PATH.format(name=self.name, section=section))
+
+        if content is None:
+            raise KeyError(f"Section '{section}' of '{self.name}' has not been stored")
+
+        return content.decode()
+
+    def save_section(self, section: str, source: str, content: str, **metadata):
+        """
+        Stores the content of a section, generated from
+        inputs with the ``source`` fingerprint.
+        """
+        with self._client(SECTION_PATH.format(name=self.name, section=section)) as cli:
+            cli.upload(content)
+
+        self.manifest["sections"][section] = {**metadata, "fingerprint": source}
+        self._used["sections"].add(section)
+        self._modified = True
+
+    def is_published(self, path: str) -> bool:
+        self._used["outputs"].add(path)
+        return path in self.manifest["outputs"]
+
+    def publish(self, path: str, content: Union[str, bytes],
+                container: str = "publicdata", **kwargs) -> bool:
+        """
+        Uploads an output, unless its content is unchanged.
+
+        Parameters
+        ----------
+        path: str
+            Path of the output.
+
+        content: Union[str, bytes]
+            Content of the output.
+
+        container: str
+            Storage container of the output. [Default: ``publicdata``]
+
+        **kwargs
+            Settings of the ``StorageClient``.
+
+        Returns
+        -------
+        bool
+            Whether the output was uploaded.
+        """
+        output = {"hash": content_hash(content), "container": container}
+        self._used["outputs"].add(path)
+
+        if self.manifest["outputs"].get(path) == output:
+            logging.info(f"Output '{container}/{path}' is unchanged - skipped upload")
+            return False
+
+        with StorageClient(container=container, path=path, **kwargs) as cli:
+            cli.upload(content)
+
+        self.manifest["outputs"][path] = output
+        self._modified = True
+
+        return True
+
+    def prune(self):
+        """
+        Removes the sections and outputs that have not been
+        used since the manifest was loaded, and deletes the
+        content of the sections and the published outputs.
+        """
+        for section in set(self.manifest["sections"]) - self._used["sections"]:
+            logging.info(f"Section '{section}' of '{self.name}' is no longer used - removed")
+
+            with self._client(SECTION_PATH.format(name=self.name, section=section)) as cli:
+                try:
+                    cli.delete()
+                except ResourceNotFoundError:
+                    pass
+
+            del self.manifest["sections"][section]
+            self._modified = True
+
+        for path in set(self.manifest["outputs"]) - self._used["outputs"]:
+            logging.info(f"Output '{path}' of '{self.name}' is no longer published - removed")
+
+            container = self.manifest["outputs"][path]["container"]
+            with StorageClient(container=container, path=path) as cli:
+                try:
+                    cli.delete()
+                except ResourceNotFoundError:
+                    pass
+
+            del self.manifest["outputs"][path]
+            self._modified = True
+
+    def commit(self):
+        """
+        Stores the manifest if the asset has been modified,
+        once unused entries have been removed.
+        """
+        self.prune()
+
+        if not self._modified:
+            return None
+
+        with self._client(MANIFEST_PATH.format(name=self.name)) as cli:
+            cli.upload(dumps(self.manifest))
+
+        self._modified = False
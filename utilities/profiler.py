@@ -0,0 +1,321 @@
+#!/usr/bin python3
+
+"""
+Stage-level profiling for the ETL processes.
+
+Every stage decorated with ``func_logger`` is profiled. The profile
+is exported as an opencensus span (when a tracer is active) and as
+opencensus metrics. When ``ETL_PROFILE_PATH`` is set, it is also
+appended to that file as JSON lines.
+
+opencensus is imported on first use, so that importing the module
+does not load it. The memory reported for a stage is the peak RSS
+of the process by the end of the stage - the peak is a high-water
+mark, so its change over a stage is not the memory used by it.
+
+Summarise a local profile with:
+
+    python -m utilities.profiler <path> [--top N] [--sort wall_time]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from sys import platform
+from os import getenv, getpid
+from time import perf_counter, process_time
+from datetime import datetime
+from json import dumps, loads
+from threading import Lock
+from typing import Any, Dict, Union
+
+try:
+    from resource import getrusage, RUSAGE_SELF
+except ImportError:
+    # Not available on Windows.
+    getrusage = None
+
+# 3rd party:
+from pandas import DataFrame
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'StageProfile'
+]
+
+
+PROFILE_PATH = getenv("ETL_PROFILE_PATH")
+METRICS_CONNECTION_STRING = getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+
+# Name, description, unit and type of the measures, by record field.
+MEASURES = {
+    "wall_time": ("etl/stage/wall_time", "Wall time", "s", float),
+    "cpu_time": ("etl/stage/cpu_time", "CPU time", "s", float),
+    "peak_rss": ("etl/stage/peak_rss", "Peak RSS of the process", "By", int),
+    "rows_in": ("etl/stage/rows_in", "Input rows", "1", int),
+    "rows_out": ("etl/stage/rows_out", "Output rows", "1", int),
+}
+
+_metrics = None
+_metrics_lock = Lock()
+_file_lock = Lock()
+
+
+def get_tracer():
+    try:
+        from opencensus.trace.execution_context import get_opencensus_tracer
+    except ImportError:
+        return None
+
+    return get_opencensus_tracer()
+
+
+def get_metrics() -> Union[Dict[str, Any], None]:
+    """
+    Creates the opencensus measures and registers their views on
+    first use. Returns ``None`` if opencensus is not installed.
+    """
+    global _metrics
+
+    with _metrics_lock:
+        if _metrics is not None:
+            return _metrics
+
+        try:
+            from opencensus.stats import stats as stats_module
+            from opencensus.stats import measure as measure_module
+            from opencensus.stats import view as view_module
+            from opencensus.stats import aggregation as aggregation_module
+            from opencensus.tags import tag_key as tag_key_module
+        except ImportError:
+            logging.warning("opencensus is not installed - stage metrics are not exported")
+            return None
+
+        stage_key = tag_key_module.TagKey("stage")
+        stats = stats_module.stats
+        measures = dict()
+
+        for field, (name, description, unit, kind) in MEASURES.items():
+            measure_type = measure_module.MeasureInt if kind is int else measure_module.MeasureFloat
+            measures[field] = measure_type(name, description, unit)
+
+            stats.view_manager.register_view(view_module.View(
+                name=name,
+                description=description,
+                columns=[stage_key],
+                measure=measures[field],
+                # Peaks are high-water marks, and cannot be summed.
+                aggregation=(
+                    aggregation_module.LastValueAggregation()
+                    if field == "peak_rss" else
+                    aggregation_module.SumAggregation()
+                )
+            ))
+
+        if METRICS_CONNECTION_STRING:
+            from opencensus.ext.azure import metrics_exporter
+
+            exporter = metrics_exporter.new_metrics_exporter(
+                connection_string=METRICS_CONNECTION_STRING
+            )
+            stats.view_manager.register_exporter(exporter)
+
+        _metrics = {"stats": stats, "measures": measures, "stage_key": stage_key}
+
+        return _metrics
+
+
+def get_peak_rss() -> Union[int, None]:
+    if getrusage is None:
+        return None
+
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+
+    # Bytes on macOS, kilobytes elsewhere.
+    return peak if platform == "darwin" else peak * 1024
+
+
+def describe_frame(obj: Any) -> Dict[str, Union[int, None]]:
+    if not isinstance(obj, DataFrame):
+        return {"rows": None, "memory": None}
+
+    return {
+        "rows": obj.shape[0],
+        "memory": int(obj.memory_usage(index=True, deep=False).sum())
+    }
+
+
+class StageProfile:
+    """
+    Profiles a single execution of a stage.
+
+    Parameters
+    ----------
+    stage: str
+        Name of the stage.
+
+    data: Any
+        Input of the stage. Row count and memory are only
+        recorded for ``DataFrame`` objects.
+    """
+    def __init__(self, stage: str, data: Any = None):
+        self.stage = stage
+        self.input = describe_frame(data)
+        self.output = describe_frame(None)
+        self.success = True
+
+    def set_output(self, data: Any):
+        self.output = describe_frame(data)
+
+    def __enter__(self) -> 'StageProfile':
+        self._tracer = get_tracer()
+        self._span = None
+
+        if self._tracer is not None:
+            from opencensus.trace.span import SpanKind
+
+            self._span = self._tracer.start_span(name=f"stage {self.stage}")
+            self._span.span_kind = SpanKind.UNSPECIFIED
+
+        self.started = datetime.utcnow()
+        self._cpu = process_time()
+        self._wall = perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        wall_time = perf_counter() - self._wall
+        cpu_time = process_time() - self._cpu
+
+        self.success = exc_type is None
+
+        record = {
+            "stage": self.stage,
+            "started": self.started.isoformat(),
+            "pid": getpid(),
+            "success": self.success,
+            "wall_time": wall_time,
+            "cpu_time": cpu_time,
+            "peak_rss": get_peak_rss(),
+            "rows_in": self.input["rows"],
+            "rows_out": self.output["rows"],
+            "memory_in": self.input["memory"],
+            "memory_out": self.output["memory"],
+        }
+
+        try:
+            self.export(record)
+        except Exception as err:
+            # Profiling must never break the process.
+            logging.warning(f"Failed to export the profile of '{self.stage}': {err}")
+
+        return False
+
+    def export(self, record: Dict[str, Any]):
+        if self._span is not None:
+            for key, value in record.items():
+                if value is not None:
+                    self._span.add_attribute(f"etl.{key}", value)
+
+            self._tracer.end_span()
+
+        metrics = get_metrics()
+
+        if metrics is not None:
+            from opencensus.tags import tag_map as tag_map_module
+
+            measurements = metrics["stats"].stats_recorder.new_measurement_map()
+            for field, measure in metrics["measures"].items():
+                if record[field] is None:
+                    continue
+
+                if MEASURES[field][-1] is int:
+                    measurements.measure_int_put(measure, int(record[field]))
+                else:
+                    measurements.measure_float_put(measure, record[field])
+
+            tags = tag_map_module.TagMap()
+            tags.insert(metrics["stage_key"], self.stage)
+            measurements.record(tags)
+
+        if PROFILE_PATH:
+            with _file_lock, open(PROFILE_PATH, "a") as fp:
+                print(dumps(record), file=fp)
+
+
+def summarise(path: str, top: int = 10, sort_by: str = "wall_time") -> DataFrame:
+    """
+    Aggregates a JSON-lines profile by stage.
+
+    Parameters
+    ----------
+    path: str
+        Path to the profile.
+
+    top: int
+        Number of stages to include. [Default: 10]
+
+    sort_by: str
+        Column by which the stages are ranked. [Default: ``wall_time``]
+
+    Returns
+    -------
+    DataFrame
+    """
+    with open(path) as fp:
+        records = [loads(line) for line in fp if line.strip()]
+
+    data = DataFrame(records)
+
+    summary = (
+        data
+        .groupby("stage")
+        .agg(
+            calls=("stage", "size"),
+            failures=("success", lambda x: int((~x.astype(bool)).sum())),
+            wall_time=("wall_time", "sum"),
+            cpu_time=("cpu_time", "sum"),
+            peak_rss=("peak_rss", "max"),
+            rows_in=("rows_in", "sum"),
+            rows_out=("rows_out", "sum"),
+        )
+        .sort_values(sort_by, ascending=False)
+        .head(top)
+    )
+
+    summary["wall_share"] = summary.wall_time / data.wall_time.sum()
+
+    return summary
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Summarises the hottest stages of an ETL profile.")
+    parser.add_argument("path", help="JSON-lines profile, as written to ETL_PROFILE_PATH.")
+    parser.add_argument("--top", type=int, default=10, help="Number of stages to show.")
+    parser.add_argument(
+        "--sort",
+        default="wall_time",
+        choices=["wall_time", "cpu_time", "peak_rss", "calls", "rows_in"],
+        help="Column by which the stages are ranked."
+    )
+
+    args = parser.parse_args()
+
+    print(summarise(args.path, top=args.top, sort_by=args.sort).to_string())
@@ -0,0 +1,366 @@
+#!/usr/bin python3
+
+"""
+Rate scales of the landing page.
+
+The latest rate of every area, and the percentiles of the rates
+of each area type, are derived from the release data in one pass
+and stored as an Arrow artefact alongside the release data by
+``prepare_rate_scales``. Scale graphs are rendered from the artefact
+in shards of ``AREAS_PER_TASK`` areas, so that only the area type
+and the shard number are passed through the orchestration.
+
+The layout of the graphs (axis extrema, ticks and the position of
+the label) is resolved for all areas of a shard at once, using the
+bins of the colour scale with which they are rendered.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from os import getenv
+from io import BytesIO
+from math import ceil
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple, Union
+
+# 3rd party:
+from numpy import searchsorted, asarray, where, ndarray
+from pandas import DataFrame, concat
+from pyarrow import Table, BufferOutputStream
+from pyarrow.feather import write_feather, read_table
+from matplotlib.pyplot import subplots, close
+from matplotlib import markers
+
+# Internal:
+try:
+    from __app__.storage import StorageClient
+    from __app__.utilities.release_data import (
+        get_release_data, read_artefact, store_artefact
+    )
+except ImportError:
+    from storage import StorageClient
+    from utilities.release_data import (
+        get_release_data, read_artefact, store_artefact
+    )
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'ColourScale',
+    'prepare_rate_scales',
+    'get_rate_scales',
+    'generate_scale_graphs'
+]
+
+
+# Metric and JSON attribute of the rates, by area type.
+SCALE_METRICS = {
+    "nation": ("newCasesBySpecimenDateRollingRate", "value"),
+    "region": ("newCasesBySpecimenDateRollingRate", "value"),
+    "utla": ("newCasesBySpecimenDateRollingRate", "value"),
+    "ltla": ("newCasesBySpecimenDateRollingRate", "value"),
+    "msoa": ("newCasesBySpecimenDate", "rollingRate"),
+}
+
+# Percentiles of the rates - rounded to 1 decimal place.
+PERCENTILES = {
+    "p10": 0.1,
+    "p40": 0.4,
+    "median": 0.5,
+    "p60": 0.6,
+    "p90": 0.9,
+}
+
+AREAS_PER_TASK = int(getenv("RATE_SCALE_AREAS_PER_TASK", 500))
+
+DATA_PATH = "despatch/rate_scales/{data_version}.arrow"
+
+
+class ColourScale(NamedTuple):
+    """
+    Non-linear colour scale. ``colours[i]`` fills the
+    interval between ``ticks[i]`` and ``ticks[i + 1]``.
+    """
+    ticks: Tuple[float, ...]
+    colours: Tuple[str, ...]
+
+    def bins(self, values, side: str = "right") -> ndarray:
+        """
+        Returns the number of ticks below ``values`` (or
+        at most ``values`` when ``side`` is "right").
+        """
+        return searchsorted(asarray(self.ticks), asarray(values), side=side)
+
+
+def extract_rate_scales(data_version: str) -> bytes:
+    frames = list()
+
+    for area_type, (metric, attribute) in SCALE_METRICS.items():
+        frames.append(get_release_data(data_version, [metric], [area_type], attribute))
+
+    values = concat(frames, ignore_index=True)
+
+    # Latest rates of each area type.
+    latest_date = values.groupby("area_type").date.transform("max")
+    data = (
+        values
+        .loc[values.date == latest_date, ["area_type", "area_code", "value"]]
+        .rename(columns={"value": "rate"})
+    )
+
+    rates = data.groupby("area_type").rate
+    percentiles = (
+        rates
+        .quantile(list(PERCENTILES.values()))
+        .unstack()
+        .set_axis(list(PERCENTILES), axis=1)
+        .round(1)
+        .assign(min=rates.min(), max=rates.max())
+    )
+
+    data = (
+        data
+        .join(percentiles, on="area_type")
+        .sort_values(["area_type", "area_code"])
+        .reset_index(drop=True)
+    )
+
+    sink = BufferOutputStream()
+    write_feather(Table.from_pandas(data, preserve_index=False), sink, compression="zstd")
+
+    logging.info(f"Extracted rate scales of {data.shape[0]} areas of '{data_version}'")
+
+    return sink.getvalue().to_pybytes()
+
+
+@lru_cache(maxsize=1)
+def read_rate_scales(data_version: str) -> DataFrame:
+    payload = read_artefact(DATA_PATH.format(data_version=data_version))
+
+    return read_table(BytesIO(payload)).to_pandas()
+
+
+def get_rate_scales(data_version: str, area_type: Union[str, None] = None) -> DataFrame:
+    """
+    Returns the latest rates and the percentiles of the rates, as
+    stored by ``prepare_rate_scales``.
+
+    Parameters
+    ----------
+    data_version: str
+        Version of the release data, as returned by
+        ``prefetch_release_data``.
+
+    area_type: Union[str, None]
+        Area type to include. All area types are included if ``None``.
+
+    Returns
+    -------
+    DataFrame
+        Columns ``area_type``, ``area_code``, ``rate``, and the
+        percentiles of the area type (``min``, ``p10``, ``p40``,
+        ``median``, ``p60``, ``p90``, ``max``), sorted by area.
+    """
+    data = read_rate_scales(data_version)
+
+    if area_type is None:
+        return data
+
+    return data.loc[data.area_type == area_type].reset_index(drop=True)
+
+
+def prepare_rate_scales(data_version: str) -> Dict[str, int]:
+    """
+    Materialises the rate scales of the release. This is the
+    only writer of the artefact.
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of shards to be rendered, by area type.
+    """
+    store_artefact(DATA_PATH.format(data_version=data_version), extract_rate_scales(data_version))
+
+    data = get_rate_scales(data_version)
+    counts = data.groupby("area_type").size()
+
+    return {
+        area_type: ceil(counts.get(area_type, 0) / AREAS_PER_TASK)
+        for area_type in SCALE_METRICS
+    }
+
+
+def get_layout(data: DataFrame, scale: ColourScale) -> DataFrame:
+    rate = data.rate.values
+
+    # Default axis range:
+    # [10th percentile, 90th percentile]
+    ax_min, ax_max = data.p10.values, data.p90.values
+
+    # If rate is greater than the 90th percentile,
+    # set axis extrema to [40th percentile, max rate].
+    high = data.p90.values <= rate
+
+    # If rate is smaller than the 10th percentile,
+    # set axis extrema to [0, 60th percentile].
+    low = ~high & (data.p10.values >= rate)
+
+    ax_min = where(high, data.p40.values, where(low, 0, ax_min))
+    ax_max = where(high, data["max"].values + 50, where(low, data.p60.values, ax_max))
+
+    # If axis extrema are between two succeeding ticks,
+    # do not set the predefined scale - i.e. revert to
+    # default (linearly spaced ticks).
+    show_ticks = (
+        scale.bins(ax_max, side="left") - scale.bins(ax_min, side="left") + (ax_min < ax_max)
+    ) > 1
+
+    # Position of "... average" label. Depends on axis
+    # extrema to prevent spillage from the sides - i.e.
+    # push the graph inwards.
+    label_position = where(data["median"].values > (ax_max - 70), "right", "left")
+
+    return data.assign(
+        ax_min=ax_min,
+        ax_max=ax_max,
+        show_ticks=show_ticks,
+        label_position=label_position
+    )
+
+
+def render_scale_graph(item, scale: ColourScale) -> BytesIO:
+    rate, median = item.rate, item.median
+    ax_min, ax_max = item.ax_min, item.ax_max
+
+    fig, ax = subplots(figsize=[5, 1.65])
+
+    ax.plot([median] * 2, [-.7, .94], c='w', lw=8)
+    ax.plot([median] * 2, [-.7, .93], c='k', lw=6)
+
+    ax.plot(rate, 2.75, marker=markers.CARETDOWNBASE, markersize=25, c='k', clip_on=False)
+    ax.annotate(
+        ("%.1f" if rate % 1 else "%d") % rate,
+        (rate, 2.85),
+        fontsize=24,
+        ha="center",
+        va='bottom',
+        fontweight='bold',
+        clip_on=False
+    )
+
+    if item.show_ticks:
+        ax.set_xticks(scale.ticks[1:])
+
+    ax.set_xlim([ax_min, ax_max])
+
+    ax.set_yticks([])
+    ax.set_ylim([-1, 3.5])
+
+    # Text offset to prevent overlap of text and
+    # median line. This must be relative as axis
+    # extrema and thus the length varies.
+    offset = (ax_max - ax_min) / 40
+
+    ax.annotate(
+        "England average" if item.area_type.lower() == "msoa" else "UK average",
+        (median + (offset if item.label_position == "left" else -offset), -.9),
+        fontsize=16,
+        ha=item.label_position,
+        va='bottom',
+        fontweight="bold",
+        clip_on=False
+    )
+
+    for start, end, colour in zip(scale.ticks[:-1], scale.ticks[1:], scale.colours):
+        ax.fill_betweenx([0, 1], start, end, color=colour)
+        ax.plot([start, start], [0, 1], c='w', lw=.8)
+
+    ax.spines['right'].set_visible(False)
+    ax.spines['top'].set_visible(False)
+    ax.spines['bottom'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    ax.xaxis.tick_top()
+
+    ax.spines['top'].set_position(('data', 1))
+    ax.set_xticklabels(ax.get_xticks(), fontsize=14)
+    ax.tick_params(axis='x', pad=2)
+
+    fig.tight_layout(pad=0.01)
+
+    img = BytesIO()
+    fig.savefig(
+        img,
+        format="jpg",
+        dpi=150,
+        pil_kwargs={'optimize': True, 'progressive': True}
+    )
+    img.seek(0)
+
+    close(fig)
+
+    return img
+
+
+def store_graph(data: BytesIO, path: str):
+    with StorageClient(
+        "publicdata",
+        path,
+        content_type="image/jpeg",
+        cache_control="max-age=60, must-revalidate",
+        content_language=None,
+        compressed=False
+    ) as client:
+        client.upload(data.read())
+
+    return True
+
+
+def generate_scale_graphs(data_version: str, area_type: str, shard: int,
+                          scale: ColourScale, path: str) -> int:
+    """
+    Renders and stores the scale graphs of a shard of the areas.
+
+    Parameters
+    ----------
+    data_version: str
+        Version of the release data, as passed to ``prepare_rate_scales``.
+
+    area_type: str
+        Area type of the shard.
+
+    shard: int
+        Shard number, as counted by ``prepare_rate_scales``.
+
+    scale: ColourScale
+        Colour scale of the graphs.
+
+    path: str
+        Storage path of the graphs. Formatted with the
+        ``area_type`` and ``area_code`` of every area.
+
+    Returns
+    -------
+    int
+        Number of graphs.
+    """
+    data = get_rate_scales(data_version, area_type)
+    data = data.iloc[shard * AREAS_PER_TASK: (shard + 1) * AREAS_PER_TASK]
+
+    for item in get_layout(data, scale).itertuples(index=False):
+        img = render_scale_graph(item, scale)
+        store_graph(img, path.format(area_type=item.area_type, area_code=item.area_code))
+
+    return data.shape[0]
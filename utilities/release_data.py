@@ -0,0 +1,400 @@
+#!/usr/bin python3
+
+"""
+Release-scoped materialisation of the data used by the despatch workers.
+
+The latest value and the recent history of every metric in
+``RELEASE_METRICS`` are extracted from the release partitions in one
+query, and stored as a compressed Arrow file keyed by the version of
+the data. Workers read their slices from the file instead of querying
+the database.
+
+The version is derived from the upserts recorded for the partitions
+of the release date, so it changes whenever any deployment (e.g. of
+MSOA data after the main release) writes into them. It is resolved
+once by the ``release_data`` activity, which also writes the file,
+and passed on to the workers by the orchestrator. Workers never
+create the file.
+
+Files are stored in blob storage, or in ``RELEASE_DATA_DIR`` when the
+variable is set (e.g. for local runs).
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from os import getenv
+from io import BytesIO
+from pathlib import Path
+from datetime import datetime
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, Union
+
+# 3rd party:
+from pandas import DataFrame
+from pyarrow import Table, BufferOutputStream
+from pyarrow.feather import write_feather, read_table
+from sqlalchemy import text
+from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
+
+# Internal:
+try:
+    from __app__.storage import StorageClient
+    from __app__.db_tables.covid19 import Session
+except ImportError:
+    from storage import StorageClient
+    from db_tables.covid19 import Session
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'RELEASE_METRICS',
+    'prefetch_release_data',
+    'get_release_data',
+    'get_latest_values',
+    'get_data_version',
+    'parse_timestamp',
+    'read_artefact',
+    'store_artefact'
+]
+
+
+# Metrics used by the despatch workers, and the JSON attributes
+# of their payloads.
+RELEASE_METRICS = {
+    "newCasesBySpecimenDateRollingRate": ["value"],
+    "newCasesBySpecimenDate": ["value", "rollingRate"],
+    "newCasesBySpecimenDateChange": ["value"],
+    "newCasesByPublishDate": ["value"],
+    "newCasesByPublishDateChange": ["value"],
+    "newDeaths28DaysByPublishDate": ["value"],
+    "newDeaths28DaysByPublishDateChange": ["value"],
+    "newDeaths28DaysByDeathDate": ["value"],
+    "newDeaths28DaysByDeathDateChange": ["value"],
+    "newDailyNsoDeathsByDeathDate": ["value"],
+    "newDailyNsoDeathsByDeathDateChange": ["value"],
+    "newAdmissions": ["value"],
+    "newAdmissionsChange": ["value"],
+    "newVirusTestsBySpecimenDate": ["value"],
+    "newVirusTestsBySpecimenDateChange": ["value"],
+    "cumPeopleVaccinatedSecondDoseByPublishDate": ["value"],
+}
+
+PARTITIONS = ["other", "utla", "ltla", "msoa"]
+
+# Length of the history included for every metric. The
+# latest value of each area is included regardless.
+HISTORY = "6 months"
+
+CATEGORICAL_COLUMNS = ["area_type", "area_code", "area_name", "metric", "attribute"]
+
+LOCAL_DATA_DIR = getenv("RELEASE_DATA_DIR")
+
+DATA_CONTAINER = "pipeline"
+DATA_PATH = "despatch/release_data/{data_version}.arrow"
+
+
+# Upserts recorded for the partitions, which identify the data therein.
+PARTITION_UPSERTS = """\
+SELECT rs.release_id, rs.partition_id, rs.inserted, rs.updated
+FROM covid19.release_partition_stats AS rs
+WHERE rs.partition_id = ANY((:partition_ids)::VARCHAR[])
+ORDER BY rs.release_id, rs.partition_id;\
+"""
+
+
+RELEASE_DATA = """\
+SELECT
+    ar.area_type,
+    ar.area_code,
+    ar.area_name,
+    mr.metric,
+    ts.attribute,
+    ts.date,
+    ts.value
+FROM (
+    SELECT
+        ts.area_id,
+        ts.metric_id,
+        ts.date,
+        params.attribute,
+        (ts.payload -> params.attribute)::FLOAT AS value,  -- JSON attribute
+        ROW_NUMBER() OVER (
+            PARTITION BY ts.area_id, ts.metric_id, params.attribute
+            ORDER BY ts.date DESC
+        ) AS recency
+    FROM covid19.time_series AS ts
+      JOIN covid19.metric_reference AS mr ON mr.id = ts.metric_id
+      JOIN UNNEST(
+            (:metrics)::VARCHAR[],
+            (:attributes)::VARCHAR[]
+      ) AS params(metric, attribute) ON params.metric = mr.metric
+    WHERE ts.partition_id = ANY((:partition_ids)::VARCHAR[])
+      AND (ts.payload ->> params.attribute) NOTNULL  -- JSON attribute
+) AS ts
+  JOIN covid19.area_reference   AS ar ON ar.id = ts.area_id
+  JOIN covid19.metric_reference AS mr ON mr.id = ts.metric_id
+WHERE ts.recency = 1
+   OR ts.date >= ((:release_date)::DATE - INTERVAL '{history}')
+ORDER BY mr.metric, ar.area_type, ar.area_code, ts.date DESC;\
+"""
+
+
+def execute_query(query: str, **params):
+    session = Session()
+    conn = session.connection()
+    try:
+        resp = conn.execute(text(query), **params)
+        raw_data = resp.fetchall()
+    except Exception as err:
+        session.rollback()
+        raise err
+    finally:
+        session.close()
+
+    return raw_data
+
+
+def get_partition_ids(release_date: datetime):
+    partition_date = f"{release_date:%Y_%-m_%-d}"
+
+    return [f"{partition_date}|{partition}" for partition in PARTITIONS]
+
+
+def get_data_version(release_date: datetime) -> str:
+    """
+    Version of the data in the partitions of the release date.
+    Must only be called once per orchestration, by the ``release_data``
+    activity, and passed on to the workers.
+    """
+    rows = execute_query(PARTITION_UPSERTS, partition_ids=get_partition_ids(release_date))
+
+    if not rows:
+        raise ValueError(f"No data have been deployed for '{release_date:%Y-%m-%d}'")
+
+    digest = blake2b(digest_size=8)
+    for row in rows:
+        digest.update(str.join("|", map(str, row)).encode() + b"\n")
+
+    return f"{release_date:%Y-%m-%d}-{digest.hexdigest()}"
+
+
+def extract_release_data(release_date: datetime) -> bytes:
+    metrics, attributes = zip(*(
+        (metric, attribute)
+        for metric, metric_attributes in RELEASE_METRICS.items()
+        for attribute in metric_attributes
+    ))
+
+    raw_data = execute_query(
+        RELEASE_DATA.format(history=HISTORY),
+        metrics=list(metrics),
+        attributes=list(attributes),
+        partition_ids=get_partition_ids(release_date),
+        release_date=f"{release_date:%Y-%m-%d}"
+    )
+
+    data = DataFrame(
+        raw_data,
+        columns=["area_type", "area_code", "area_name", "metric", "attribute", "date", "value"]
+    )
+    data = data.astype({col: "category" for col in CATEGORICAL_COLUMNS})
+
+    sink = BufferOutputStream()
+    write_feather(Table.from_pandas(data, preserve_index=False), sink, compression="zstd")
+
+    logging.info(f"Extracted {data.shape[0]} rows of release data for '{release_date:%Y-%m-%d}'")
+
+    return sink.getvalue().to_pybytes()
+
+
+def get_artefact_client(path: str) -> StorageClient:
+    return StorageClient(
+        container=DATA_CONTAINER,
+        path=path,
+        content_type="application/vnd.apache.arrow.file",
+        compressed=False,
+        content_language=None
+    )
+
+
+def read_artefact(path: str) -> bytes:
+    """
+    Loads an artefact of the release from storage.
+
+    Raises
+    ------
+    RuntimeError
+        If the artefact has not been stored.
+    """
+    if LOCAL_DATA_DIR:
+        local_path = Path(LOCAL_DATA_DIR, path)
+
+        if not local_path.exists():
+            raise RuntimeError(f"Release artefact not found: {local_path}")
+
+        return local_path.read_bytes()
+
+    with get_artefact_client(path) as cli:
+        try:
+            return cli.download().readall()
+        except ResourceNotFoundError:
+            raise RuntimeError(f"Release artefact not found: {path}")
+
+
+def artefact_exists(path: str) -> bool:
+    if LOCAL_DATA_DIR:
+        return Path(LOCAL_DATA_DIR, path).exists()
+
+    with get_artefact_client(path) as cli:
+        return cli.exists()
+
+
+def store_artefact(path: str, payload: bytes) -> bool:
+    """
+    Stores an artefact of the release, unless it already exists.
+    Artefacts are immutable, so an existing artefact is never
+    overwritten - e.g. when an activity is retried.
+
+    Returns
+    -------
+    bool
+        Whether the artefact was stored.
+    """
+    if LOCAL_DATA_DIR:
+        local_path = Path(LOCAL_DATA_DIR, path)
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with open(local_path, "xb") as fp:
+                fp.write(payload)
+        except FileExistsError:
+            return False
+
+        return True
+
+    with get_artefact_client(path) as cli:
+        try:
+            cli.upload(payload, overwrite=False)
+        except ResourceExistsError:
+            logging.info(f"Release artefact already exists: '{path}'")
+            return False
+
+    return True
+
+
+@lru_cache(maxsize=1)
+def load_release_data(data_version: str) -> DataFrame:
+    payload = read_artefact(DATA_PATH.format(data_version=data_version))
+
+    return read_table(BytesIO(payload)).to_pandas()
+
+
+def parse_timestamp(timestamp: Union[str, datetime]) -> datetime:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+def prefetch_release_data(payload) -> Dict[str, Any]:
+    """
+    Resolves the version of the release data and materialises them
+    ahead of the despatch workers. This is the only writer of the data.
+
+    Returns
+    -------
+    Dict[str, Any]
+        ``data_version`` and ``timestamp`` of the release, to be
+        passed on to the workers.
+    """
+    release_date = parse_timestamp(payload["timestamp"])
+    data_version = get_data_version(release_date)
+
+    path = DATA_PATH.format(data_version=data_version)
+
+    if not artefact_exists(path):
+        store_artefact(path, extract_release_data(release_date))
+
+    logging.info(f"Release data {release_date:%Y-%m-%d} stored as '{path}'")
+
+    return {
+        "data_version": data_version,
+        "timestamp": payload["timestamp"]
+    }
+
+
+def get_release_data(data_version: str, metrics: Iterable[str],
+                     area_types: Union[Iterable[str], None] = None,
+                     attribute: str = "value") -> DataFrame:
+    """
+    Returns the materialised values of ``metrics`` in the release.
+
+    Parameters
+    ----------
+    data_version: str
+        Version of the release data, as returned by ``prefetch_release_data``.
+
+    metrics: Iterable[str]
+        Metrics to include. Must be defined in ``RELEASE_METRICS``.
+
+    area_types: Union[Iterable[str], None]
+        Area types to include. All area types are included if ``None``.
+
+    attribute: str
+        JSON attribute of the payload. [Default: ``value``]
+
+    Returns
+    -------
+    DataFrame
+        Columns ``area_type``, ``area_code``, ``area_name``, ``metric``,
+        ``date`` and ``value``, sorted by metric, area and descending date.
+    """
+    metrics = list(metrics)
+
+    for metric in metrics:
+        if attribute not in RELEASE_METRICS.get(metric, []):
+            raise ValueError(f"Release data does not include '{metric}' ('{attribute}')")
+
+    data = load_release_data(data_version)
+
+    mask = data.metric.isin(metrics) & (data.attribute == attribute)
+
+    if area_types is not None:
+        mask &= data.area_type.isin(list(area_types))
+
+    return (
+        data
+        .loc[mask, ["area_type", "area_code", "area_name", "metric", "date", "value"]]
+        .astype({col: object for col in CATEGORICAL_COLUMNS if col != "attribute"})
+        .reset_index(drop=True)
+    )
+
+
+def get_latest_values(data_version: str, metrics: Iterable[str],
+                      area_types: Union[Iterable[str], None] = None,
+                      attribute: str = "value") -> DataFrame:
+    """
+    Returns the latest value of ``metrics`` for every area in the release.
+    See ``get_release_data`` for the parameters.
+    """
+    data = get_release_data(data_version, metrics, area_types, attribute)
+
+    return (
+        data
+        .drop_duplicates(subset=["area_type", "area_code", "metric"], keep="first")
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,267 @@
+#!/usr/bin python3
+
+"""
+Canonical dtypes for the data passed between the ETL stages.
+
+Area and metric dimensions are categoricals, dates are ``datetime64``
+(or optionally ``Int32`` day numbers since the epoch), and IDs and
+values are nullable numerics.
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import logging
+from os import getenv
+from typing import Dict, Iterable, Union
+
+# 3rd party:
+from pandas import DataFrame, Series, CategoricalDtype, Timestamp, to_datetime, to_timedelta
+from pandas.api.types import is_datetime64_any_dtype
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Header
+__author__ = "Pouria Hadjibagheri"
+__copyright__ = "Copyright (c) 2020, Public Health England"
+__license__ = "MIT"
+__version__ = "0.0.1"
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'CATEGORICAL_COLUMNS',
+    'DATE_COLUMNS',
+    'NUMERIC_COLUMNS',
+    'coerce_schema',
+    'validate_schema',
+    'to_day_numbers',
+    'from_day_numbers'
+]
+
+
+DEBUG = getenv("DEBUG", False)
+
+# Area and metric dimensions, in both the source (camel case)
+# and the database (snake case) naming conventions.
+CATEGORICAL_COLUMNS = (
+    "areaType",
+    "areaCode",
+    "areaName",
+    "area_type",
+    "area_code",
+    "area_name",
+    "metric",
+)
+
+DATE_COLUMNS = (
+    "date",
+)
+
+# Integral IDs and counts are ``Int32``. Fractional values are kept
+# in ``Float64``, as ``Float32`` values gain spurious digits once
+# they are serialised into JSON payloads (e.g. 12.3 -> 12.300000190734863).
+NUMERIC_COLUMNS = {
+    "area_id": "Int32",
+    "metric_id": "Int32",
+    "release_id": "Int32",
+    "cases": "Int32",
+    "deaths": "Int32",
+    "rollingSum": "Int32",
+    "rollingRate": "Float64",
+}
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# Dates are stored as "datetime64", or as "days" - i.e. ``Int32``
+# day numbers since the epoch, which are half the size.
+DATE_ENCODINGS = ("datetime64", "days")
+
+EPOCH = Timestamp("1970-01-01")
+
+
+def to_day_numbers(values: Series) -> Series:
+    if not is_datetime64_any_dtype(values.dtype):
+        values = to_datetime(values, format=DATE_FORMAT)
+
+    return (values - EPOCH).dt.days.astype("Int32")
+
+
+def from_day_numbers(values: Series) -> Series:
+    return EPOCH + to_timedelta(values.astype("float64"), unit="D")
+
+
+def is_canonical(df: DataFrame, column: str,
+                 dtype: Union[CategoricalDtype, None] = None,
+                 dates: str = "datetime64") -> bool:
+    if column in DATE_COLUMNS:
+        if dates == "days":
+            return df[column].dtype == "Int32"
+
+        return is_datetime64_any_dtype(df[column].dtype)
+
+    if column in NUMERIC_COLUMNS:
+        return df[column].dtype == NUMERIC_COLUMNS[column]
+
+    if dtype is not None:
+        return df[column].dtype == dtype
+
+    return isinstance(df[column].dtype, CategoricalDtype)
+
+
+def get_categorical_dtype(values, declared: Union[Iterable[str], None] = None,
+                          column: Union[str, None] = None) -> CategoricalDtype:
+    observed = set(values.dropna().unique())
+
+    if declared is None:
+        return CategoricalDtype(sorted(observed))
+
+    categories = set(declared)
+    undeclared = observed - categories
+
+    # Undeclared values are kept rather than being lost to NaN,
+    # but the dtype then differs from that of other chunks.
+    if undeclared:
+        logging.warning(f"Undeclared categories in '{column}': {sorted(undeclared)}")
+        categories |= undeclared
+
+    return CategoricalDtype(sorted(categories))
+
+
+def coerce_schema(df: DataFrame, columns: Union[Iterable[str], None] = None,
+                  categories: Union[Dict[str, Iterable[str]], None] = None,
+                  dates: str = "datetime64") -> DataFrame:
+    """
+    Coerces the columns of ``df`` to their canonical dtypes.
+
+    Dates become ``datetime64`` (or day numbers), numeric columns
+    take the dtype declared in ``NUMERIC_COLUMNS``, and every other
+    column becomes a categorical with sorted categories (so sorting
+    is unaffected). Columns that are absent or already canonical are
+    left as they are.
+
+    Categories of a column are taken from ``categories`` where they are
+    declared, so that the dtype is identical across chunks, and are
+    otherwise derived from the values of the column.
+
+    Parameters
+    ----------
+    df: DataFrame
+        Data, as ingested.
+
+    columns: Union[Iterable[str], None]
+        Columns to coerce. [Default: ``CATEGORICAL_COLUMNS``, ``DATE_COLUMNS``
+        and ``NUMERIC_COLUMNS``]
+
+    categories: Union[Dict[str, Iterable[str]], None]
+        Declared categories, by column. [Default: ``None``]
+
+    dates: str
+        Encoding of the dates - one of ``DATE_ENCODINGS``. [Default: ``datetime64``]
+
+    Returns
+    -------
+    DataFrame
+
+    Raises
+    ------
+    TypeError
+        If the values of a numeric column cannot be represented
+        by its declared dtype - e.g. fractions in ``Int32``.
+    """
+    if dates not in DATE_ENCODINGS:
+        raise ValueError(f"Invalid date encoding: '{dates}'")
+
+    if columns is None:
+        columns = (*CATEGORICAL_COLUMNS, *DATE_COLUMNS, *NUMERIC_COLUMNS)
+
+    columns = list(columns)
+
+    if categories is None:
+        categories = dict()
+
+    dtypes = {
+        col: get_categorical_dtype(df[col], declared, col)
+        for col, declared in categories.items()
+        if col in columns and col in df.columns and col not in DATE_COLUMNS
+    }
+
+    columns = [
+        col for col in columns
+        if col in df.columns and not is_canonical(df, col, dtypes.get(col), dates)
+    ]
+
+    if not columns:
+        return df
+
+    df = df.copy(deep=False)
+
+    for col in columns:
+        if col in DATE_COLUMNS and dates == "days":
+            df[col] = to_day_numbers(df[col])
+        elif col in DATE_COLUMNS:
+            df[col] = to_datetime(df[col], format=DATE_FORMAT)
+        elif col in NUMERIC_COLUMNS:
+            df[col] = df[col].astype(NUMERIC_COLUMNS[col])
+        else:
+            dtype = dtypes[col] if col in dtypes else get_categorical_dtype(df[col])
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+
+def validate_schema(df: DataFrame, stage: str,
+                    columns: Union[Iterable[str], None] = None,
+                    dates: str = "datetime64") -> DataFrame:
+    """
+    Verifies that the columns of ``df`` have their canonical
+    dtypes at a stage boundary. Only runs in debug mode, and may be used
+    with ``DataFrame.pipe``.
+
+    Parameters
+    ----------
+    df: DataFrame
+        Data at the end of the stage.
+
+    stage: str
+        Name of the stage, for the error message.
+
+    columns: Union[Iterable[str], None]
+        Columns to validate. [Default: ``CATEGORICAL_COLUMNS``, ``DATE_COLUMNS``
+        and ``NUMERIC_COLUMNS``]
+
+    dates: str
+        Encoding of the dates - one of ``DATE_ENCODINGS``. [Default: ``datetime64``]
+
+    Returns
+    -------
+    DataFrame
+        The same data, unchanged.
+
+    Raises
+    ------
+    TypeError
+        If any of the columns does not have its canonical dtype.
+    """
+    if not DEBUG:
+        return df
+
+    if columns is None:
+        columns = (*CATEGORICAL_COLUMNS, *DATE_COLUMNS, *NUMERIC_COLUMNS)
+
+    invalid = {
+        col: str(df[col].dtype)
+        for col in columns
+        if col in df.columns and not is_canonical(df, col, dates=dates)
+    }
+
+    if invalid:
+        logging.error(f"Invalid dtypes after '{stage}': {invalid}")
+        raise TypeError(f"Invalid dtypes after '{stage}': {invalid}")
+
+    return df
@@ -0,0 +1,201 @@
+import site
+import pathlib
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+from unittest.mock import patch
+
+from orjson import loads
+from azure.core.exceptions import ResourceNotFoundError
+
+from utilities import incremental
+from utilities.incremental import IncrementalAsset, MANIFEST_PATH, SECTION_PATH
+
+
+class MemoryStorage:
+    """
+    In-memory stand-in for ``StorageClient``.
+    """
+    def __init__(self):
+        self.blobs = dict()
+        self.uploads = list()
+        self.deletes = list()
+
+    def __call__(self, container, path, **kwargs):
+        return MemoryBlob(self, container, path)
+
+
+class MemoryBlob:
+    def __init__(self, storage: MemoryStorage, container: str, path: str):
+        self.storage = storage
+        self.key = (container, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return None
+
+    def upload(self, data):
+        self.storage.blobs[self.key] = data.encode() if isinstance(data, str) else data
+        self.storage.uploads.append(self.key)
+
+    def download(self):
+        if self.key not in self.storage.blobs:
+            raise ResourceNotFoundError(self.key)
+
+        return self
+
+    def readall(self):
+        return self.storage.blobs[self.key]
+
+    def delete(self):
+        if self.key not in self.storage.blobs:
+            raise ResourceNotFoundError(self.key)
+
+        del self.storage.blobs[self.key]
+        self.storage.deletes.append(self.key)
+
+
+MANIFEST_KEY = (incremental.MANIFEST_CONTAINER, MANIFEST_PATH.format(name="test"))
+
+
+def section_key(section):
+    return incremental.MANIFEST_CONTAINER, SECTION_PATH.format(name="test", section=section)
+
+
+class TestIncrementalAsset(unittest.TestCase):
+    def setUp(self):
+        self.storage = MemoryStorage()
+        patcher = patch.object(incremental, "StorageClient", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_asset(self, sections, outputs):
+        """
+        Runs the asset as the workers do: regenerates the sections
+        whose fingerprint has changed, and publishes the outputs.
+        """
+        asset = IncrementalAsset("test")
+        self.storage.uploads.clear()
+
+        for section, content in sections.items():
+            source = incremental.fingerprint(content)
+
+            if not asset.is_current(section, source):
+                asset.save_section(section, source, content, size=len(content))
+
+        published = {
+            path: asset.publish(path, content)
+            for path, content in outputs.items()
+        }
+
+        asset.commit()
+
+        return asset, published
+
+    def get_manifest(self):
+        return loads(self.storage.blobs[MANIFEST_KEY])
+
+    def test_first_run(self):
+        asset = IncrementalAsset("test")
+
+        self.assertDictEqual(asset.manifest, {"sections": dict(), "outputs": dict()})
+        self.assertFalse(asset.is_current("a", incremental.fingerprint("a")))
+        self.assertFalse(asset.is_published("a.xml"))
+
+        with self.assertRaises(KeyError):
+            asset.load_section("a")
+
+        asset, published = self.run_asset({"a": "content a"}, {"a.xml": "output a"})
+
+        self.assertDictEqual(published, {"a.xml": True})
+        self.assertEqual(asset.load_section("a"), "content a")
+        self.assertEqual(self.storage.blobs[("publicdata", "a.xml")], b"output a")
+
+        manifest = self.get_manifest()
+        self.assertEqual(manifest["sections"]["a"]["fingerprint"], incremental.fingerprint("content a"))
+        self.assertEqual(manifest["sections"]["a"]["size"], len("content a"))
+        self.assertIn("a.xml", manifest["outputs"])
+
+    def test_unchanged_entries_skipped(self):
+        sections = {"a": "content a", "b": "content b"}
+        outputs = {"a.xml": "output a", "b.xml": "output b"}
+
+        self.run_asset(sections, outputs)
+        manifest = self.get_manifest()
+
+        _, published = self.run_asset(sections, outputs)
+
+        self.assertDictEqual(published, {"a.xml": False, "b.xml": False})
+        # Neither the sections, the outputs, nor the manifest are uploaded.
+        self.assertListEqual(self.storage.uploads, list())
+        self.assertDictEqual(self.get_manifest(), manifest)
+
+        # Only the changed entries are uploaded.
+        _, published = self.run_asset({**sections, "b": "content b2"}, {**outputs, "b.xml": "output b2"})
+
+        self.assertDictEqual(published, {"a.xml": False, "b.xml": True})
+        self.assertListEqual(
+            self.storage.uploads,
+            [section_key("b"), ("publicdata", "b.xml"), MANIFEST_KEY]
+        )
+
+    def test_removed_entry(self):
+        self.run_asset(
+            {"a": "content a", "b": "content b"},
+            {"a.xml": "output a", "b.xml": "output b"}
+        )
+
+        self.run_asset({"a": "content a"}, {"a.xml": "output a"})
+
+        manifest = self.get_manifest()
+        self.assertListEqual(list(manifest["sections"]), ["a"])
+        self.assertListEqual(list(manifest["outputs"]), ["a.xml"])
+
+        # The content of the section and the published output are deleted.
+        self.assertListEqual(
+            sorted(self.storage.deletes),
+            sorted([section_key("b"), ("publicdata", "b.xml")])
+        )
+        self.assertNotIn(("publicdata", "b.xml"), self.storage.blobs)
+
+        # A removed entry is regenerated and published if it is used again.
+        _, published = self.run_asset(
+            {"a": "content a", "b": "content b"},
+            {"a.xml": "output a", "b.xml": "output b"}
+        )
+
+        self.assertDictEqual(published, {"a.xml": False, "b.xml": True})
+        self.assertIn(section_key("b"), self.storage.uploads)
+
+    def test_output_container(self):
+        asset = IncrementalAsset("test")
+        asset.publish("a.json", "output a", container="downloads")
+        asset.commit()
+
+        self.assertEqual(self.get_manifest()["outputs"]["a.json"]["container"], "downloads")
+
+        # Outputs are deleted from the container to which they were published.
+        self.run_asset(dict(), dict())
+        self.assertListEqual(self.storage.deletes, [("downloads", "a.json")])
+
+    def test_referenced_entries_kept(self):
+        self.run_asset({"a": "content a"}, {"a.xml": "output a"})
+
+        # Entries that are only checked remain in the manifest.
+        asset = IncrementalAsset("test")
+        asset.get_metadata("a")
+        asset.is_published("a.xml")
+        asset.prune()
+
+        self.assertFalse(asset._modified)
+        self.assertListEqual(list(asset.manifest["sections"]), ["a"])
+        self.assertListEqual(list(asset.manifest["outputs"]), ["a.xml"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import site
+import pathlib
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+import subprocess
+import sys
+from json import loads, dumps
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from pandas import DataFrame
+
+from utilities import profiler
+from utilities.profiler import StageProfile, summarise
+
+
+class TestStageProfile(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+
+        self.path = pathlib.Path(tmp_dir.name, "profile.jsonl")
+        patcher = patch.object(profiler, "PROFILE_PATH", str(self.path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_records(self):
+        with open(self.path) as fp:
+            return [loads(line) for line in fp]
+
+    def test_opencensus_imported_lazily(self):
+        # The module is loaded on its own, as the package imports other
+        # modules that may depend on opencensus.
+        code = (
+            "import sys, importlib.util\n"
+            f"spec = importlib.util.spec_from_file_location('profiler', {str(profiler.__file__)!r})\n"
+            "module = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(module)\n"
+            "print(any(name.startswith('opencensus') for name in sys.modules))\n"
+        )
+
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(output.stdout.strip(), "False")
+
+    def test_record(self):
+        data = DataFrame({"value": range(100)})
+
+        with StageProfile("stage", data) as profile:
+            profile.set_output(data.iloc[:10])
+
+        record, = self.get_records()
+
+        self.assertEqual(record["stage"], "stage")
+        self.assertTrue(record["success"])
+        self.assertEqual(record["rows_in"], 100)
+        self.assertEqual(record["rows_out"], 10)
+        self.assertGreaterEqual(record["wall_time"], 0)
+
+        # The absolute peak of the process, which covers at least
+        # the memory of the input.
+        if profiler.getrusage is not None:
+            self.assertEqual(record["peak_rss"], profiler.get_peak_rss())
+            self.assertGreater(record["peak_rss"], record["memory_in"])
+
+    def test_failed_stage(self):
+        with self.assertRaises(ValueError), StageProfile("stage"):
+            raise ValueError("failed")
+
+        record, = self.get_records()
+
+        self.assertFalse(record["success"])
+        self.assertIsNone(record["rows_in"])
+
+    def test_failed_export(self):
+        with patch.object(profiler, "get_metrics", side_effect=RuntimeError("exporter")):
+            with StageProfile("stage") as profile:
+                profile.set_output(DataFrame({"value": [1]}))
+
+        self.assertTrue(profile.success)
+
+    def test_summarise(self):
+        records = [
+            {"stage": "a", "success": True, "wall_time": 1.0, "cpu_time": 1.0,
+             "peak_rss": 100, "rows_in": 10, "rows_out": 10},
+            {"stage": "a", "success": False, "wall_time": 2.0, "cpu_time": 1.0,
+             "peak_rss": 300, "rows_in": 10, "rows_out": None},
+            {"stage": "b", "success": True, "wall_time": 1.0, "cpu_time": 0.5,
+             "peak_rss": 200, "rows_in": 5, "rows_out": 5},
+        ]
+
+        with open(self.path, "w") as fp:
+            fp.writelines(dumps(record) + "\n" for record in records)
+
+        summary = summarise(str(self.path))
+
+        self.assertListEqual(summary.index.tolist(), ["a", "b"])
+        self.assertListEqual(summary.calls.tolist(), [2, 1])
+        self.assertListEqual(summary.failures.tolist(), [1, 0])
+        self.assertListEqual(summary.peak_rss.tolist(), [300, 200])
+        self.assertAlmostEqual(summary.wall_share["a"], 0.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
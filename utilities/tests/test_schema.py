@@ -0,0 +1,98 @@
+import site
+import pathlib
+
+test_dir = pathlib.Path(__file__).resolve().parent
+root_path = test_dir.parent.parent
+site.addsitedir(root_path)
+
+import unittest
+from unittest.mock import patch
+
+from pandas import DataFrame, Series, NA, isna
+
+from utilities import schema
+from utilities.schema import coerce_schema, validate_schema, to_day_numbers, from_day_numbers
+
+
+class TestNumericSchema(unittest.TestCase):
+    def test_numerics_coerced(self):
+        df = DataFrame({
+            "area_id": [1, 2, 3],
+            "release_id": [10.0, 10.0, 10.0],
+            "cases": [1.0, None, 3.0],
+            "rollingRate": [1.5, 2.25, None],
+        })
+
+        result = coerce_schema(df)
+
+        self.assertEqual(result.area_id.dtype, "Int32")
+        self.assertEqual(result.release_id.dtype, "Int32")
+        self.assertEqual(result.cases.dtype, "Int32")
+        self.assertEqual(result.rollingRate.dtype, "Float64")
+
+        # Values are unchanged, and missing values are nullable.
+        self.assertEqual(result.cases.tolist()[::2], [1, 3])
+        self.assertIs(result.cases[1], NA)
+        self.assertEqual(result.rollingRate.tolist()[:2], [1.5, 2.25])
+
+        # The input is not modified.
+        self.assertEqual(df.area_id.dtype, "int64")
+
+    def test_lossy_numerics_rejected(self):
+        df = DataFrame({"rollingSum": [1.5, 2.0]})
+
+        with self.assertRaises(TypeError):
+            coerce_schema(df)
+
+    def test_canonical_frame_returned(self):
+        df = coerce_schema(DataFrame({"metric_id": [1, 2]}))
+
+        self.assertIs(coerce_schema(df), df)
+
+    def test_numerics_validated(self):
+        with patch.object(schema, "DEBUG", True):
+            with self.assertRaises(TypeError):
+                validate_schema(DataFrame({"area_id": [1, 2]}), stage="test")
+
+            df = coerce_schema(DataFrame({"area_id": [1, 2]}))
+            self.assertIs(validate_schema(df, stage="test"), df)
+
+
+class TestDayNumbers(unittest.TestCase):
+    def test_round_trip(self):
+        dates = Series(["1970-01-01", "2021-03-04", None])
+
+        days = to_day_numbers(dates)
+
+        self.assertEqual(days.dtype, "Int32")
+        self.assertEqual(days.tolist()[:2], [0, 18690])
+        self.assertIs(days[2], NA)
+
+        restored = from_day_numbers(days)
+        self.assertEqual(
+            restored.dt.strftime("%Y-%m-%d").tolist()[:2],
+            ["1970-01-01", "2021-03-04"]
+        )
+        self.assertTrue(isna(restored[2]))
+
+    def test_coerced_as_days(self):
+        df = DataFrame({"date": ["2021-03-04", "2021-03-05"]})
+
+        result = coerce_schema(df, dates="days")
+
+        self.assertEqual(result.date.dtype, "Int32")
+        self.assertEqual(result.date.tolist(), [18690, 18691])
+
+        with patch.object(schema, "DEBUG", True):
+            self.assertIs(validate_schema(result, stage="test", dates="days"), result)
+
+            with self.assertRaises(TypeError):
+                validate_schema(result, stage="test")
+
+    def test_invalid_encoding(self):
+        with self.assertRaises(ValueError):
+            coerce_schema(DataFrame({"date": ["2021-03-04"]}), dates="epoch")
+
+
+if __name__ == '__main__':
+    unittest.main()
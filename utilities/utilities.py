@@ -16,8 +16,10 @@ from functools import wraps
 import logging
 
 # 3rd party:
+from pandas import DataFrame
 
-# Internal: 
+# Internal:
+from .profiler import StageProfile
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Header
 __author__ = "Pouria Hadjibagheri"
@@ -37,8 +39,16 @@ def func_logger(process_name):
         def process_func(*args, **kwargs):
             logging.info(f"> Starting: {process_name}")
 
+            # Rows and memory are recorded for the first frame passed to the stage.
+            data = next(
+                (item for item in (*args, *kwargs.values()) if isinstance(item, DataFrame)),
+                None
+            )
+
             try:
-                result = func(*args, **kwargs)
+                with StageProfile(process_name, data) as profile:
+                    result = func(*args, **kwargs)
+                    profile.set_output(result)
             except Exception as e:
                 logging.error(f">> Exception occurred in {process_name}")
                 logging.exception(e)